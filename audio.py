@@ -0,0 +1,240 @@
+# Jackson: Voice-controlled Jacket
+# Audio sources for the microphone capture thread.  Besides the real ALSA
+# microphone there are file backed and synthetic sources so speech recognition
+# and the spectrum animation can be run and benchmarked without the jacket.
+# Every source has a sample_rate and period_size (samples per read) and a
+# read function that blocks until the next period of signed 16-bit mono
+# samples is ready, returning it as a bytes-like object (only valid until the
+# next read) or None/null when the source has run out of audio.
+# Author: Tony DiCola
+# License: MIT https://opensource.org/licenses/MIT
+import mmap
+import struct
+import time
+
+import numpy as np
+
+
+class AudioSource:
+    """Base class for audio sources."""
+
+    def __init__(self, sample_rate, period_size):
+        self.sample_rate = sample_rate
+        self.period_size = period_size
+        # Count of periods lost because the source wasn't read fast enough.
+        self.overruns = 0
+
+    def read(self):
+        """Block until the next period of samples is available and return it,
+        or None/null if the source is finished.
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """Release any resources held by the source."""
+        pass
+
+
+def periods(source):
+    """Generate a copy of every period of a source as bytes until it's
+    finished, then close it.  Useful with sources that aren't realtime.
+    """
+    try:
+        while True:
+            buf = source.read()
+            if buf is None:
+                break
+            yield bytes(buf)
+    finally:
+        source.close()
+
+
+class AlsaSource(AudioSource):
+
+    def __init__(self, device, sample_rate, period_size):
+        """Capture from the specified ALSA device (like 'plughw:1,0')."""
+        super().__init__(sample_rate, period_size)
+        # Imported here so the other sources work without pyalsaaudio.
+        import alsaaudio
+        # Open the microphone and configure it for mono recording with signed
+        # 16-bit samples.  Reads block until a period is available.
+        self._mic = alsaaudio.PCM(alsaaudio.PCM_CAPTURE,
+                                  alsaaudio.PCM_NORMAL,
+                                  device=device)
+        self._mic.setchannels(1)
+        self._mic.setrate(sample_rate)
+        self._mic.setformat(alsaaudio.PCM_FORMAT_S16_LE)
+        self._mic.setperiodsize(period_size)
+
+    def read(self):
+        while True:
+            length, buf = self._mic.read()
+            if length > 0:
+                return buf
+            if length < 0:
+                # Negative length is an ALSA error, usually an overrun because
+                # the capture thread didn't keep up.
+                self.overruns += 1
+
+    def close(self):
+        self._mic.close()
+
+
+class _Throttle:
+    # Sleep as needed to deliver samples no faster than real time.
+
+    def __init__(self, sample_rate):
+        self._sample_rate = float(sample_rate)
+        self._start = None
+        self._samples = 0
+
+    def wait(self, samples):
+        now = time.monotonic()
+        if self._start is None:
+            self._start = now
+        self._samples += samples
+        delay = self._start + self._samples/self._sample_rate - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+class FileSource(AudioSource):
+
+    def __init__(self, path, sample_rate=None, period_size=512, realtime=True,
+                 loop=False):
+        """Play back audio from a WAV file (16-bit mono PCM) or a raw file of
+        signed 16-bit little endian mono samples.  For a raw file the sample
+        rate must be specified.  The file is memory mapped and periods are
+        returned without copying.  If realtime is True reads are throttled to
+        the sample rate, otherwise they return as fast as they're called.  If
+        loop is True playback starts over at the end of the file.
+        """
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:4] == b'RIFF':
+            file_rate, start, end = _parse_wav(self._map)
+            sample_rate = sample_rate or file_rate
+            if sample_rate != file_rate:
+                raise ValueError('{0} is {1}hz, not {2}hz'.format(path, file_rate, sample_rate))
+        elif sample_rate is None:
+            raise ValueError('Sample rate must be specified for raw file {0}'.format(path))
+        else:
+            start, end = 0, len(self._map)
+        super().__init__(sample_rate, period_size)
+        self._data = memoryview(self._map)[start:end - (end - start) % 2]
+        self._position = 0
+        self._loop = loop
+        self._throttle = _Throttle(sample_rate) if realtime else None
+
+    @property
+    def duration_s(self):
+        """Length of the audio in seconds."""
+        return len(self._data) / 2.0 / self.sample_rate
+
+    def read(self):
+        size = 2*self.period_size
+        if self._position >= len(self._data):
+            if not self._loop or len(self._data) == 0:
+                return None
+            self._position = 0
+        buf = self._data[self._position:self._position+size]
+        self._position += len(buf)
+        if self._throttle is not None:
+            self._throttle.wait(len(buf) // 2)
+        return buf
+
+    def close(self):
+        try:
+            self._data.release()
+            self._map.close()
+        except BufferError:
+            # A period returned by read is still referenced, the map will be
+            # closed when it's garbage collected.
+            pass
+        self._file.close()
+
+
+def _parse_wav(data):
+    # Find the sample rate and the start and end offset of the sample data in
+    # a WAV file.  Only 16-bit mono PCM is supported.
+    if data[8:12] != b'WAVE':
+        raise ValueError('Not a WAV file')
+    offset = 12
+    sample_rate = None
+    while offset + 8 <= len(data):
+        chunk_id = data[offset:offset+4]
+        size, = struct.unpack('<I', data[offset+4:offset+8])
+        body = offset + 8
+        if chunk_id == b'fmt ':
+            fmt, channels, sample_rate, _, _, bits = struct.unpack('<HHIIHH', data[body:body+16])
+            if fmt != 1 or channels != 1 or bits != 16:
+                raise ValueError('Only 16-bit mono PCM WAV files are supported')
+        elif chunk_id == b'data':
+            if sample_rate is None:
+                raise ValueError('WAV file data chunk comes before fmt chunk')
+            return sample_rate, body, min(body + size, len(data))
+        offset = body + size + (size % 2)
+    raise ValueError('WAV file has no data chunk')
+
+
+class ToneSource(AudioSource):
+
+    def __init__(self, freq_hz, amplitude=0.5, sample_rate=16000,
+                 period_size=512, realtime=True, duration_s=None):
+        """Generate a sine wave tone of the specified frequency and amplitude
+        (0 to 1.0 of full scale), forever or for duration_s seconds.
+        """
+        super().__init__(sample_rate, period_size)
+        self._step = 2.0*np.pi*freq_hz/sample_rate
+        self._amplitude = amplitude*32767.0
+        self._generator = _Generator(self, realtime, duration_s)
+
+    def _generate(self, start, out):
+        phase = (start + np.arange(len(out))) * self._step
+        out[:] = self._amplitude * np.sin(phase)
+
+    def read(self):
+        return self._generator.read()
+
+
+class NoiseSource(AudioSource):
+
+    def __init__(self, amplitude=0.5, sample_rate=16000, period_size=512,
+                 realtime=True, duration_s=None, seed=None):
+        """Generate uniform white noise of the specified amplitude (0 to 1.0
+        of full scale), forever or for duration_s seconds.
+        """
+        super().__init__(sample_rate, period_size)
+        self._amplitude = amplitude*32767.0
+        self._random = np.random.RandomState(seed)
+        self._generator = _Generator(self, realtime, duration_s)
+
+    def _generate(self, start, out):
+        out[:] = self._random.uniform(-self._amplitude, self._amplitude, len(out))
+
+    def read(self):
+        return self._generator.read()
+
+
+class _Generator:
+    # Shared period buffer, duration and throttling for synthetic sources.
+
+    def __init__(self, source, realtime, duration_s):
+        self._source = source
+        self._buffer = np.zeros(source.period_size, dtype=np.int16)
+        self._samples = 0
+        self._total = None if duration_s is None else int(duration_s*source.sample_rate)
+        self._throttle = _Throttle(source.sample_rate) if realtime else None
+
+    def read(self):
+        count = len(self._buffer)
+        if self._total is not None:
+            count = min(count, self._total - self._samples)
+            if count <= 0:
+                return None
+        out = self._buffer[:count]
+        self._source._generate(self._samples, out)
+        self._samples += count
+        if self._throttle is not None:
+            self._throttle.wait(count)
+        return out.data
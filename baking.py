@@ -0,0 +1,132 @@
+# Jackson: Voice-controlled Jacket
+# Baked animations.  Animations like idle, pulse and knight rider repeat with
+# a period that only depends on Jackson's state, and color every pixel with
+# the same hue at some value (intensity).  Instead of computing the values of
+# every pixel every frame, one period of them is computed once into a table
+# of uint8 color table value indices, and a frame is just the current row of
+# the table looked up in the color table row of the current hue.  Hue changes
+# all the time so it isn't baked in, tables are only rebuilt when the state
+# the values depend on (like brightness or happiness) changes.  Tables are
+# kept in a cache that drops the least recently used ones past a memory limit.
+# Author: Tony DiCola
+# License: MIT https://opensource.org/licenses/MIT
+import collections
+import math
+
+import numpy as np
+
+
+class TableCache:
+
+    def __init__(self, max_bytes=1024*1024):
+        """Create a cache of baked tables that keeps at most max_bytes of
+        tables, dropping the least recently used ones.
+        """
+        self.max_bytes = max_bytes
+        self._tables = collections.OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.builds = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._tables)
+
+    def get(self, key, build):
+        """Return the table of a key, building it with the build function (of
+        no arguments) if it isn't cached.  The table is kept even if it's
+        bigger than the limit by itself, it's needed for the current frame.
+        """
+        table = self._tables.get(key)
+        if table is not None:
+            self._tables.move_to_end(key)
+            self.hits += 1
+            return table
+        table = build()
+        self.builds += 1
+        self._tables[key] = table
+        self.bytes += table.nbytes
+        while self.bytes > self.max_bytes and len(self._tables) > 1:
+            _, old = self._tables.popitem(last=False)
+            self.bytes -= old.nbytes
+            self.evictions += 1
+        return table
+
+    def clear(self):
+        """Drop every table."""
+        self._tables.clear()
+        self.bytes = 0
+
+    def report(self):
+        """Return a dict of the number of tables, their bytes and the hit,
+        build and eviction counts.
+        """
+        return {
+            'tables':    len(self._tables),
+            'bytes':     self.bytes,
+            'hits':      self.hits,
+            'builds':    self.builds,
+            'evictions': self.evictions
+        }
+
+
+def _value_indices(colors, values):
+    # Color table value indices of an array of values (0 to 1.0), rounded and
+    # clamped exactly like color.HueValueTable.lookup.
+    indices = np.floor(np.asarray(values) * (colors.values - 1) + 0.5).astype(np.int64)
+    dtype = np.uint8 if colors.values <= 256 else np.uint16
+    return np.clip(indices, 0, colors.values - 1).astype(dtype)
+
+
+def _hue_index(colors, hue):
+    return int(math.floor(hue * (colors.hues / 360.0) + 0.5)) % colors.hues
+
+
+class Baked:
+
+    def __init__(self, name, values, hue, period, key, colors, rate_hz, cache):
+        """Create a baked animation.  values is a function of time (seconds)
+        and a state.State that returns the array of pixel values (0 to 1.0),
+        colored with the hue (degrees) returned by the hue function of the
+        state.  period is a function of the state that returns the seconds
+        after which the values repeat, and key returns a hashable value of the
+        parts of the state the values and period depend on.  One period of
+        values is sampled at rate_hz into a table looked up in colors (a
+        color.HueValueTable).  Tables are kept in cache (a TableCache) under
+        the name and key, animations with the same name must have the same
+        values function.
+        """
+        self.name = name
+        self._values = values
+        self._hue = hue
+        self._period = period
+        self._key = key
+        self._colors = colors
+        self._rate_hz = rate_hz
+        self._cache = cache
+
+    def table(self, state):
+        """Return the (samples, N) table of value indices for a state."""
+        return self._cache.get((self.name, self._key(state)),
+                               lambda: self._build(state))
+
+    def _build(self, state):
+        period = self._period(state)
+        samples = max(1, int(round(period * self._rate_hz)))
+        return np.stack([_value_indices(self._colors, self._values(k*period/samples, state))
+                         for k in range(samples)])
+
+    def __call__(self, ft, state):
+        table = self.table(state)
+        period = self._period(state)
+        i = int(math.floor((ft.t % period) / period * len(table) + 0.5)) % len(table)
+        return self._colors.table[_hue_index(self._colors, self._hue(state))][table[i]]
+
+
+def live(values, hue, colors):
+    """Return the animation of a values and hue function (see Baked) that
+    computes the values every frame, for when baking is turned off.
+    """
+    def _live(ft, state):
+        return colors.lookup(hue(state), values(ft.t, state))
+    return _live
@@ -0,0 +1,25 @@
+# Jackson: Voice-controlled Jacket
+# Report the memory footprint, quantization error and build time of the
+# precomputed hue/value color table at different resolutions.  Use this to
+# pick config.COLOR_TABLE_HUES and config.COLOR_TABLE_VALUES.
+# Usage: python3 benchmarks/color_table.py
+# Author: Tony DiCola
+# License: MIT https://opensource.org/licenses/MIT
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import color
+
+
+RESOLUTIONS = [(90, 64), (180, 128), (360, 128), (360, 256), (720, 256)]
+
+
+if __name__ == '__main__':
+    for hues, values in RESOLUTIONS:
+        start = time.perf_counter()
+        table = color.HueValueTable(hues, values)
+        elapsed = time.perf_counter() - start
+        print('{0} (built in {1:.1f} ms)'.format(table.report(), elapsed*1000.0))
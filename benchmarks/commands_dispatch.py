@@ -0,0 +1,91 @@
+# Jackson: Voice-controlled Jacket
+# Benchmark of command dispatch over random utterances of commands.gram.
+# Measures dispatch throughput and checks every utterance is routed to the
+# action its grammar tags say it should be.  The indexed dispatcher is compared
+# with the original dispatcher (string replace of junk words and a linear
+# scan of starts with commands).
+# Usage: python3 benchmarks/commands_dispatch.py [utterance count] [seed]
+# Author: Tony DiCola
+# License: MIT https://opensource.org/licenses/MIT
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import commands
+import config
+import grammar
+
+
+class LinearDispatcher:
+    """Copy of the original dispatcher, for comparison."""
+
+    def __init__(self, junk=[]):
+        self._exact_commands = {}
+        self._starts_with_commands = {}
+        self._junk = junk
+
+    def register_starts_with(self, command, callback, *args, **kwargs):
+        self._starts_with_commands[tuple(command.split())] = (callback, args, kwargs)
+
+    def dispatch(self, command):
+        for junk in self._junk:
+            command = command.replace(junk, '')
+        cleaned = tuple(command.strip().split())
+        callback, args, kwargs = self._exact_commands.get(cleaned, (None, None, None))
+        if callback is None:
+            for prefix, val in self._starts_with_commands.items():
+                callback, args, kwargs = val
+                if prefix == tuple(cleaned[:len(prefix)]):
+                    break
+        if callback is not None:
+            callback(cleaned, *args, **kwargs)
+
+
+class Recorder:
+    """Callbacks that remember the last action dispatched."""
+
+    def __init__(self):
+        self.last = None
+
+    def callback(self, key):
+        def _callback(command, value):
+            self.last = (key, value)
+        return _callback
+
+
+def measure(name, dispatcher, recorder, utterances):
+    correct = 0
+    start = time.perf_counter()
+    for text, expected in utterances:
+        recorder.last = None
+        dispatcher.dispatch(text)
+        correct += recorder.last == expected
+    elapsed = time.perf_counter() - start
+    print('{0:>7}: {1:8.0f} commands/s, {2:6.2f} us/command, {3}/{4} routed correctly'.format(
+        name, len(utterances)/elapsed, elapsed*1e6/len(utterances), correct, len(utterances)))
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    rng = random.Random(int(sys.argv[2]) if len(sys.argv) > 2 else 0)
+    gram = grammar.load(config.GRAMMAR_MODEL)
+    keys = ['animation', 'hue', 'brightness', 'brightness_step']
+    index = grammar.build_index(gram, 'command', keys, junk_rule='junk')
+    # Expected action of every utterance from the index of junk free commands.
+    junk = commands.Dispatcher(junk=index.junk)
+    utterances = []
+    for i in range(count):
+        text = ' '.join(gram.sample('command', rng))
+        utterances.append((text, index.get(' '.join(junk.clean(text)))))
+    print('{0} utterances, {1} distinct commands'.format(count, len(index)))
+    recorder = Recorder()
+    indexed = commands.Dispatcher(junk=index.junk)
+    indexed.register_index(index, {key: recorder.callback(key) for key in keys})
+    measure('indexed', indexed, recorder, utterances)
+    linear = LinearDispatcher(junk=index.junk)
+    for command, (key, value) in index.actions.items():
+        linear.register_starts_with(command, recorder.callback(key), value)
+    measure('linear', linear, recorder, utterances)
@@ -0,0 +1,83 @@
+# Jackson: Voice-controlled Jacket
+# Benchmark of command end of utterance detection over recorded utterances.
+# Every recording (16-bit mono WAV at the configured sample rate, with the
+# speaker saying a command after the wake word) is decoded twice, once with
+# the original fixed minimum/maximum listen times and once with the adaptive
+# endpointer, and the time listening ended (in seconds of audio) and the
+# recognized command are compared.  Needs Pocketsphinx.
+# Usage: python3 benchmarks/endpointing.py recording.wav [recording.wav ...]
+# Author: Tony DiCola
+# License: MIT https://opensource.org/licenses/MIT
+import os
+import statistics
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import audio
+import commands
+import config
+import endpoint
+import grammar
+import speech
+import tracing
+
+
+class FileMicrophone:
+    """Microphone stand-in that plays a recording as fast as it's read and
+    then silence.
+    """
+
+    def __init__(self, sample_rate, period_size):
+        self.sample_rate = sample_rate
+        self.period_size = period_size
+        self._silence = bytes(2*period_size)
+        self._source = None
+
+    def play(self, path):
+        if self._source is not None:
+            self._source.close()
+        self._source = audio.FileSource(path, self.sample_rate, self.period_size,
+                                        realtime=False)
+
+    def read(self, timeout=None):
+        buf = self._source.read()
+        return self._silence if buf is None else bytes(buf)
+
+
+def listen(recognizer, mic, path, endpointer):
+    # Decode a recording and return the recognized command, why listening
+    # ended and when (in seconds of audio).
+    mic.play(path)
+    trace = tracing.Tracer().start('command')
+    command, _ = recognizer.listen_command(trace, endpointer)
+    return command, trace.attributes['endpoint'], trace.attributes['endpoint_s']
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print('Usage: python3 benchmarks/endpointing.py recording.wav [recording.wav ...]')
+        sys.exit(1)
+    index = grammar.load_index(config.GRAMMAR_MODEL, 'command',
+        ['animation', 'hue', 'brightness', 'brightness_step'],
+        junk_rule='junk', cache_dir=config.CACHE_DIR)
+    dispatcher = commands.Dispatcher(junk=index.junk)
+    is_complete = lambda command: index.is_complete(' '.join(dispatcher.clean(command)))
+    mic = FileMicrophone(config.SAMPLE_RATE_HZ, config.MIC_PERIOD_SIZE)
+    recognizer = speech.SpeechRecognizer(mic, is_complete=is_complete)
+    saved = []
+    same = 0
+    for path in sys.argv[1:]:
+        fixed = listen(recognizer, mic, path,
+                       endpoint.fixed(config.COMMAND_MIN_S, config.COMMAND_MAX_S))
+        adaptive = listen(recognizer, mic, path, endpoint.Endpointer(
+            no_speech_s=config.COMMAND_MIN_S, max_s=config.COMMAND_MAX_S,
+            silence_s=config.COMMAND_SILENCE_S, is_complete=is_complete))
+        saved.append(fixed[2] - adaptive[2])
+        same += fixed[0] == adaptive[0]
+        print('{0}: fixed {1:.2f}s ({2}) {3!r}, adaptive {4:.2f}s ({5}) {6!r}, saved {7:.2f}s'.format(
+            os.path.basename(path), fixed[2], fixed[1], fixed[0],
+            adaptive[2], adaptive[1], adaptive[0], saved[-1]))
+    print('{0} recordings: mean {1:.2f}s, median {2:.2f}s, max {3:.2f}s latency removed, '
+          '{4}/{0} same command recognized'.format(len(saved), statistics.mean(saved),
+          statistics.median(saved), max(saved), same))
@@ -0,0 +1,287 @@
+# Jackson: Voice-controlled Jacket
+# Benchmark of speech recognition throughput.  Labeled recordings are fed to
+# the speech recognizer as fast as it decodes them, in keyword spotting mode
+# and grammar command mode, for every combination of microphone period size,
+# Pocketsphinx FFT size and sample rate.  Reports the real-time factor (time
+# spent decoding divided by the length of the audio, it has to be under 1.0
+# to keep up with the microphone), percentiles of the time to process each
+# period, the memory high-water mark and accuracy against the labels, then
+# recommends the cheapest configuration that keeps up and is about as
+# accurate as the best one.  Every configuration runs in a fresh process so
+# their memory use is measured separately.
+# Recordings are 16-bit mono WAV files, resampled to each sample rate tested.
+# Keyword recordings are labeled like the tuning tool's (see tuning.py), and
+# command recordings have the spoken command in a text file with the same
+# name (like brighter.wav and brighter.txt).  Sample rates other than 16khz
+# need a matching acoustic model (--acoustic-model).  Needs Pocketsphinx.
+# Usage: python3 benchmarks/recognition.py --keywords wake.wav ... --commands brighter.wav ...
+# Author: Tony DiCola
+# License: MIT https://opensource.org/licenses/MIT
+import argparse
+import collections
+import csv
+import math
+import multiprocessing
+import os
+import resource
+import sys
+import time
+import wave
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import config
+import tuning
+
+
+# Results of one mode of one configuration.  Times are in seconds, latencies
+# in milliseconds.
+Result = collections.namedtuple('Result', ['mode', 'sample_rate', 'period_size',
+    'nfft', 'audio_s', 'rtf', 'cpu_rtf', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms',
+    'period_ms', 'max_rss_mb', 'accuracy', 'errors', 'startup_s'])
+
+
+def load(path, sample_rate):
+    """Return the samples of a 16-bit mono WAV file as an int16 array,
+    resampled (by linear interpolation) to the specified sample rate.
+    """
+    with wave.open(path) as infile:
+        file_rate = infile.getframerate()
+        samples = np.frombuffer(infile.readframes(infile.getnframes()), dtype=np.int16)
+    if file_rate == sample_rate:
+        return samples
+    times = np.arange(int(len(samples) * sample_rate / file_rate)) / float(sample_rate)
+    return np.interp(times, np.arange(len(samples)) / float(file_rate),
+                     samples).astype(np.int16)
+
+
+def periods(samples, period_size):
+    """Return a list of the periods of samples as bytes, like the microphone
+    reads them.  The last partial period is dropped.
+    """
+    return [samples[i:i+period_size].tobytes()
+            for i in range(0, len(samples) - period_size + 1, period_size)]
+
+
+def percentile(values, percent):
+    """Return a percentile (0 to 100) of a list of values, or 0 if it's
+    empty.
+    """
+    return float(np.percentile(values, percent)) if len(values) else 0.0
+
+
+class _TimedMicrophone:
+    # Microphone stand-in that returns periods as fast as they're read and
+    # times the processing of each one (from returning it to the next read).
+
+    def __init__(self, latencies):
+        self._periods = []
+        self._latencies = latencies
+        self._returned = None
+
+    def play(self, periods):
+        self._periods = list(reversed(periods))
+        self._returned = None
+
+    def read(self, timeout=None):
+        now = time.perf_counter()
+        if self._returned is not None:
+            self._latencies.append(now - self._returned)
+        buf = self._periods.pop() if self._periods else None
+        self._returned = time.perf_counter()
+        return buf
+
+
+def _timed(buffers, latencies):
+    # Generate buffers, timing how long the consumer spends on each one.
+    for buf in buffers:
+        start = time.perf_counter()
+        yield buf
+        latencies.append(time.perf_counter() - start)
+
+
+def _spot(recognizer, recordings):
+    # Spot keywords in every recording, returning the number of labeled
+    # keywords found (missed and false alarm keywords are errors) out of the
+    # number labeled.
+    latencies = []
+    found = expected = errors = 0
+    for labels, buffers in recordings:
+        heard = collections.Counter(k for k, _ in recognizer.spot_keywords(
+            _timed(buffers, latencies)))
+        labeled = collections.Counter(k for k, _ in labels)
+        for keyword in set(heard) | set(labeled):
+            found += min(heard[keyword], labeled[keyword])
+            errors += abs(heard[keyword] - labeled[keyword])
+        expected += len(labels)
+    return latencies, found, expected, errors
+
+
+def _recognize(recognizer, recordings, index, dispatcher):
+    # Recognize the command in every recording, returning the number that
+    # mean the same action as their label out of the number labeled.
+    import endpoint
+    latencies = []
+    found = expected = errors = 0
+    mic = _TimedMicrophone(latencies)
+    recognizer._mic = mic
+    action = lambda command: index.get(' '.join(dispatcher.clean(command or '')))
+    for labels, buffers in recordings:
+        mic.play(buffers)
+        # Decode the whole recording, however early the command ends.
+        seconds = sum(len(b) for b in buffers) / 2.0 / config.SAMPLE_RATE_HZ
+        command, _ = recognizer.listen_command(endpointer=endpoint.Endpointer(
+            no_speech_s=math.inf, max_s=seconds, silence_s=math.inf))
+        expected += 1
+        label = labels[0] if labels else None
+        if label is None:
+            correct = command is None
+        else:
+            correct = command is not None and action(command) == action(label) and \
+                (action(label) is not None or command == label)
+        if correct:
+            found += 1
+        else:
+            errors += 1
+    return latencies, found, expected, errors
+
+
+def _load_command(path):
+    # Return a list of the command spoken in a recording from its text file,
+    # or an empty list if it has no text file (it's noise).
+    path = os.path.splitext(path)[0] + '.txt'
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf8') as infile:
+        return [line.strip() for line in infile if line.strip()][:1]
+
+
+def run(mode, sample_rate, period_size, nfft, paths, acoustic_model=None):
+    """Benchmark one mode ('keyword' or 'command') of one configuration on a
+    list of recordings and return a Result.  Meant to run in its own process,
+    it changes config.py's settings.
+    """
+    config.SAMPLE_RATE_HZ = sample_rate
+    config.MIC_PERIOD_SIZE = period_size
+    config.POCKETSPHINX_NFFT = nfft
+    config.POCKETSPHINX_DEBUG = False
+    if acoustic_model:
+        config.ACOUSTIC_MODEL = acoustic_model
+    import commands
+    import grammar
+    import speech
+    start = time.monotonic()
+    recognizer = speech.SpeechRecognizer(None)
+    startup_s = time.monotonic() - start
+    load_labels = (lambda p: tuning.load_labels(p) or []) if mode == 'keyword' else _load_command
+    recordings = [(load_labels(p), periods(load(p, sample_rate), period_size)) for p in paths]
+    audio_s = sum(len(b) for _, buffers in recordings for b in buffers) / 2.0 / sample_rate
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    if mode == 'keyword':
+        latencies, found, expected, errors = _spot(recognizer, recordings)
+    else:
+        index = grammar.load_index(config.GRAMMAR_MODEL, 'command',
+            ['animation', 'hue', 'brightness', 'brightness_step'],
+            junk_rule='junk', cache_dir=config.CACHE_DIR)
+        latencies, found, expected, errors = _recognize(recognizer, recordings, index,
+            commands.Dispatcher(junk=index.junk))
+    wall_s = time.perf_counter() - wall_start
+    cpu_s = time.process_time() - cpu_start
+    latencies_ms = [1000.0*l for l in latencies]
+    # Maximum resident set size is in kilobytes on Linux.
+    max_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+    return Result(mode, sample_rate, period_size, nfft, audio_s,
+                  wall_s / audio_s if audio_s else 0.0,
+                  cpu_s / audio_s if audio_s else 0.0,
+                  percentile(latencies_ms, 50), percentile(latencies_ms, 95),
+                  percentile(latencies_ms, 99), max(latencies_ms, default=0.0),
+                  1000.0*period_size/sample_rate, max_rss_mb,
+                  found / float(expected) if expected else 1.0, errors, startup_s)
+
+
+def _run(job):
+    return run(*job)
+
+
+def recommend(results, max_rtf=1.0, accuracy_tolerance=0.02):
+    """Return the (sample rate, period size, nfft) configuration with the
+    least total CPU time over its modes that keeps up in real time (a
+    real-time factor at most max_rtf) in every mode, and is within
+    accuracy_tolerance of the most accurate configuration in every mode, or
+    None/null if none does.
+    """
+    best = collections.defaultdict(float)
+    for r in results:
+        best[r.mode] = max(best[r.mode], r.accuracy)
+    configurations = collections.defaultdict(list)
+    for r in results:
+        configurations[(r.sample_rate, r.period_size, r.nfft)].append(r)
+    candidates = [(sum(r.cpu_rtf for r in rs), key)
+                  for key, rs in configurations.items()
+                  if all(r.rtf <= max_rtf and r.accuracy >= best[r.mode] - accuracy_tolerance
+                         for r in rs)]
+    return min(candidates)[1] if candidates else None
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Benchmark speech recognition throughput.')
+    parser.add_argument('--keywords', nargs='+', default=[],
+                        help='keyword recordings (labels in .txt files)')
+    parser.add_argument('--commands', nargs='+', default=[],
+                        help='command recordings (commands in .txt files)')
+    parser.add_argument('--period-sizes', nargs='+', type=int, default=[256, 512, 1024, 2048],
+                        help='microphone period sizes in samples')
+    parser.add_argument('--nfft', nargs='+', type=int, default=[512, 1024, 2048],
+                        help='Pocketsphinx FFT sizes')
+    parser.add_argument('--sample-rates', nargs='+', type=int, default=[config.SAMPLE_RATE_HZ],
+                        help='sample rates in hz')
+    parser.add_argument('--acoustic-model', help='acoustic model for the sample rates')
+    parser.add_argument('--max-rtf', type=float, default=1.0,
+                        help='highest real-time factor that keeps up')
+    parser.add_argument('--accuracy-tolerance', type=float, default=0.02,
+                        help='accuracy allowed below the best configuration')
+    parser.add_argument('--csv', help='CSV file of every result')
+    args = parser.parse_args(args)
+    if not args.keywords and not args.commands:
+        parser.error('specify --keywords and/or --commands recordings')
+    modes = [m for m, paths in (('keyword', args.keywords), ('command', args.commands)) if paths]
+    jobs = [(mode, rate, period_size, nfft, args.keywords if mode == 'keyword' else args.commands,
+             args.acoustic_model)
+            for rate in args.sample_rates for period_size in args.period_sizes
+            for nfft in args.nfft for mode in modes]
+    # A new process for every job so the memory high-water mark is its own.
+    context = multiprocessing.get_context('spawn')
+    results = []
+    print('{0:8} {1:>6} {2:>6} {3:>5} {4:>6} {5:>6} {6:>7} {7:>7} {8:>7} {9:>7} {10:>7} {11:>6} {12:>6}'.format(
+        'mode', 'rate', 'period', 'nfft', 'rtf', 'cpu', 'p50ms', 'p95ms', 'p99ms', 'maxms',
+        'budget', 'rssMB', 'acc'))
+    with context.Pool(1, maxtasksperchild=1) as pool:
+        for job in jobs:
+            try:
+                r = pool.apply(_run, (job,))
+            except Exception as e:
+                # Like an FFT too small for the sample rate's frame size.
+                print('{0} {1}hz period {2} nfft {3} failed: {4}'.format(*(job[:4] + (e,))))
+                continue
+            results.append(r)
+            print('{0.mode:8} {0.sample_rate:6d} {0.period_size:6d} {0.nfft:5d} {0.rtf:6.3f} '
+                  '{0.cpu_rtf:6.3f} {0.p50_ms:7.2f} {0.p95_ms:7.2f} {0.p99_ms:7.2f} '
+                  '{0.max_ms:7.2f} {0.period_ms:7.2f} {0.max_rss_mb:6.1f} {0.accuracy:6.1%}'.format(r))
+    if args.csv:
+        with open(args.csv, 'w', newline='') as outfile:
+            writer = csv.writer(outfile)
+            writer.writerow(Result._fields)
+            writer.writerows(results)
+    best = recommend(results, args.max_rtf, args.accuracy_tolerance)
+    if best is None:
+        print('No configuration keeps up in real time.')
+    else:
+        print('Cheapest configuration that keeps up: SAMPLE_RATE_HZ = {0}, '
+              'MIC_PERIOD_SIZE = {1}, POCKETSPHINX_NFFT = {2}'.format(*best))
+
+
+if __name__ == '__main__':
+    main()
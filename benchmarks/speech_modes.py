@@ -0,0 +1,78 @@
+# Jackson: Voice-controlled Jacket
+# Benchmark of speech recognition in a thread versus a worker process (see
+# SPEECH_PROCESS in config.py).  A recording is played back in real time as
+# the microphone of a Jackson with stand-in lights (see headless.py), which
+# spots keywords, handles them and renders its animation layers like it does
+# on the jacket.  Reports the frame interval jitter of the render loop and the
+# end to end latency of each keyword, from the decoding of the audio it was
+# heard in to the first frame shown after handling it (the first_frame mark
+# of its latency trace).  Wake words include listening for a command.  The
+# recording should contain some keywords.  Needs Pocketsphinx, and Python 3.8+
+# for process mode.
+# Usage: python3 benchmarks/speech_modes.py recording.wav [seconds]
+# Author: Tony DiCola
+# License: MIT https://opensource.org/licenses/MIT
+import collections
+import os
+import sys
+import threading
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import audio
+import config
+import headless
+import jackson
+import microphone
+import segments
+
+
+def run(mode, path, seconds):
+    config.SPEECH_PROCESS = mode == 'process'
+    config.TRACE_ENABLED = True
+    config.TRACE_CAPACITY = 10000
+    mic = microphone.Microphone(audio.FileSource(path, config.SAMPLE_RATE_HZ,
+                                                 config.MIC_PERIOD_SIZE, loop=True))
+    lights = headless.NullLights(segments.total(segments.from_config()))
+    j = jackson.Jackson(lights, mic)
+    thread = threading.Thread(target=j._listen_speech)
+    thread.daemon = True
+    thread.start()
+    # Render and show frames like the animation thread, recording when each
+    # frame starts.
+    starts = []
+    def render(ft):
+        starts.append(ft.t)
+        return j._render_frame(ft)
+    j._frame_scheduler.run(render, j._show_frame,
+                           count=int(seconds*config.FRAME_RATE_HZ))
+    jitter = np.abs(np.diff(starts) - 1.0/config.FRAME_RATE_HZ) * 1000.0
+    # Latency from the start of decoding the audio a keyword was heard in to
+    # the first frame shown after handling it, by keyword.
+    latency = collections.defaultdict(list)
+    for trace in j.tracer.traces:
+        spans = dict((name, (start, end)) for name, start, end in trace.spans)
+        if 'keyword' in spans and 'first_frame' in spans:
+            latency[trace.attributes.get('keyword')].append(
+                (spans['first_frame'][1] - spans['keyword'][0]) * 1000.0)
+    print('{0:>7}: jitter p50 {1:.2f}ms p99 {2:.2f}ms max {3:.2f}ms'.format(mode,
+          np.percentile(jitter, 50), np.percentile(jitter, 99), jitter.max()))
+    for keyword, times in sorted(latency.items()):
+        print('         {0}: {1} keywords to first frame p50 {2:.2f}ms max {3:.2f}ms'.format(
+              keyword, len(times), np.percentile(times, 50), max(times)))
+    if not latency:
+        print('         no keywords handled')
+    print('         {0}'.format(j.frame_stats.summary()))
+    if mode == 'process':
+        j._speech.close()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print('Usage: python3 benchmarks/speech_modes.py recording.wav [seconds]')
+        sys.exit(1)
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 30.0
+    for mode in ('thread', 'process'):
+        run(mode, sys.argv[1], seconds)
@@ -0,0 +1,129 @@
+# Jackson: Voice-controlled Jacket
+# Benchmark of lock traffic in Jackson's render path.  Renders every animation
+# headless (see headless.py) with counting locks in Jackson's state store and
+# animation compositor, alone and with another thread changing the hue as
+# fast as it can (the hue flow changes it every frame).  Each animation is
+# rendered two ways: reading the state through lock protected properties once
+# per pixel (how the render loop used to read happiness, brightness and hue)
+# as a baseline, and reading one immutable snapshot per frame (how Jackson
+# reads it now).  Every run takes a fixed time so the writer thread overlaps
+# rendering.  Reports the locks the render thread takes per frame, the time
+# per frame and the hue changes per frame.
+# Usage: python3 benchmarks/state_locks.py [pixel count] [seconds per run]
+# Author: Tony DiCola
+# License: MIT https://opensource.org/licenses/MIT
+import collections
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import headless
+import state
+
+
+# Switch threads often so the writer thread runs while frames render.
+SWITCH_INTERVAL_S = 0.0001
+
+
+class CountingLock:
+    """Re-entrant lock that counts how many times each thread acquires it."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.acquisitions = collections.Counter()
+
+    def __enter__(self):
+        self._lock.acquire()
+        self.acquisitions[threading.get_ident()] += 1
+        return self
+
+    def __exit__(self, *args):
+        self._lock.release()
+
+
+class LockedStateStore(state.StateStore):
+    """State store whose snapshot is read under its lock, like Jackson's lock
+    protected state properties before state snapshots.
+    """
+
+    @property
+    def snapshot(self):
+        with self._lock:
+            return self._state
+
+
+def instrument(jackson, store_class):
+    # Swap counting locks into a state store (keeping the current state) and
+    # the compositor, and return them.
+    state_lock = CountingLock()
+    jackson._state = store_class(jackson._state.snapshot, lock=state_lock)
+    compositor_lock = CountingLock()
+    jackson._compositor._lock = compositor_lock
+    return state_lock, compositor_lock
+
+
+def render_locked(jackson, ft):
+    # Read happiness, brightness and hue through the lock for every pixel
+    # like the old per-pixel generators did, then render the frame.
+    store = jackson._state
+    for i in range(len(jackson._lights)):
+        store.snapshot.happiness_freq
+        store.snapshot.brightness_hsv
+        store.snapshot.hue
+    return jackson._compositor.render(ft, store.snapshot)
+
+
+# State store and render function (None/null for Jackson's render path, one
+# snapshot per frame) of each way of rendering.
+RENDERERS = collections.OrderedDict([
+    ('locked',   (LockedStateStore, render_locked)),
+    ('snapshot', (state.StateStore, None))
+])
+
+
+def measure(name, n, seconds, mode, writer):
+    renderer = headless.Renderer(n, seed=0, record=False)
+    renderer.play(name)
+    jackson = renderer.jackson
+    store_class, render = RENDERERS[mode]
+    state_lock, compositor_lock = instrument(jackson, store_class)
+    if render is not None:
+        jackson._render_frame = lambda ft: render(jackson, ft)
+    stop = threading.Event()
+    def change_hue():
+        while not stop.is_set():
+            jackson.hue += 1.0
+    thread = threading.Thread(target=change_hue)
+    if writer:
+        thread.start()
+    frames = 0
+    start = time.perf_counter()
+    end = start + seconds
+    while time.perf_counter() < end:
+        renderer.step()
+        frames += 1
+    elapsed = time.perf_counter() - start
+    stop.set()
+    if writer:
+        thread.join()
+    me = threading.get_ident()
+    hue_changes = sum(c for t, c in state_lock.acquisitions.items() if t != me)
+    print('{0:>12} {1:>8} {2:>6}: {3:7.2f} state + {4:4.2f} compositor locks/frame, '
+          '{5:7.3f} ms/frame, {6:6.2f} hue changes/frame'.format(
+        name, mode, 'writer' if writer else 'alone', state_lock.acquisitions[me]/frames,
+        compositor_lock.acquisitions[me]/frames, elapsed*1000.0/frames,
+        hue_changes/frames))
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 150
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+    print('{0} pixels, {1} seconds per run'.format(n, seconds))
+    sys.setswitchinterval(SWITCH_INTERVAL_S)
+    for name in sorted(headless.ANIMATIONS):
+        for mode in RENDERERS:
+            for writer in (False, True):
+                measure(name, n, seconds, mode, writer)
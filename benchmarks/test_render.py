@@ -0,0 +1,37 @@
+# Jackson: Voice-controlled Jacket
+# Benchmark suite of headless animation rendering (see headless.py), the time
+# to render and show one frame of every animation at 26, 150 and 600 lights.
+# Frames per second are reported in each benchmark's extra info.  Needs the
+# pytest-benchmark plugin, and is skipped without it.
+# Usage: python3 -m pytest benchmarks/test_render.py [--benchmark-json=render.json]
+# Author: Tony DiCola
+# License: MIT https://opensource.org/licenses/MIT
+import os
+import sys
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import config
+import headless
+
+
+LED_COUNTS = [26, 150, 600]
+
+
+@pytest.fixture(autouse=True)
+def no_cache(monkeypatch):
+    # Don't cache the grammar index in the working directory.
+    monkeypatch.setattr(config, 'CACHE_DIR', None)
+
+
+@pytest.mark.parametrize('n', LED_COUNTS)
+@pytest.mark.parametrize('name', sorted(headless.ANIMATIONS))
+def test_render(benchmark, name, n):
+    renderer = headless.Renderer(n, seed=0, record=False)
+    renderer.play(name)
+    benchmark(renderer.step)
+    benchmark.extra_info['frames_per_s'] = 1.0 / benchmark.stats.stats.mean
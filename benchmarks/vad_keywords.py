@@ -0,0 +1,65 @@
+# Jackson: Voice-controlled Jacket
+# Benchmark of the voice activity gate in front of keyword spotting.  Every
+# recording (16-bit mono WAV at the configured sample rate) is run through
+# keyword spotting with and without the gate, reporting the decoding CPU time
+# saved and the recall of keywords: the share of expected keywords still
+# found with the gate.  Expected keywords are read from a text file next to
+# the recording (recording.txt, one keyword per line) if there is one,
+# otherwise the keywords found without the gate are expected.  Needs
+# Pocketsphinx.
+# Usage: python3 benchmarks/vad_keywords.py recording.wav [recording.wav ...]
+# Author: Tony DiCola
+# License: MIT https://opensource.org/licenses/MIT
+import collections
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import audio
+import config
+import speech
+import tuning
+import vad
+
+
+def spot(recognizer, path):
+    # Return the keywords found in a recording and the decoding CPU seconds.
+    before = recognizer.keyword_stats()['decode_cpu_s']
+    keywords = [k for k, _ in recognizer.spot_keywords(audio.periods(audio.FileSource(
+        path, config.SAMPLE_RATE_HZ, config.MIC_PERIOD_SIZE, realtime=False)))]
+    return keywords, recognizer.keyword_stats()['decode_cpu_s'] - before
+
+
+def found(expected, keywords):
+    # Count of expected keywords that were found.
+    return sum((collections.Counter(expected) & collections.Counter(keywords)).values())
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print('Usage: python3 benchmarks/vad_keywords.py recording.wav [recording.wav ...]')
+        sys.exit(1)
+    ungated = speech.SpeechRecognizer(None)
+    config.VAD_ENABLED = True
+    gate = vad.from_config(config.SAMPLE_RATE_HZ)
+    gated = speech.SpeechRecognizer(None, vad=gate)
+    totals = collections.Counter()
+    for path in sys.argv[1:]:
+        keywords, cpu = spot(ungated, path)
+        gated_keywords, gated_cpu = spot(gated, path)
+        expected = tuning.load_labels(path)
+        if expected is None:
+            expected = keywords
+        totals.update(expected=len(expected), found=found(expected, keywords),
+                      gated_found=found(expected, gated_keywords))
+        totals['cpu'] += cpu
+        totals['gated_cpu'] += gated_cpu
+        print('{0}: ungated {1} keywords {2:.2f}s CPU, gated {3} keywords {4:.2f}s CPU'.format(
+            os.path.basename(path), len(keywords), cpu, len(gated_keywords), gated_cpu))
+    expected = max(totals['expected'], 1)
+    print('Decoded {0:.0%} of the audio, CPU {1:.2f}s -> {2:.2f}s ({3:.0%} saved)'.format(
+        gate.passed_fraction, totals['cpu'], totals['gated_cpu'],
+        1.0 - totals['gated_cpu'] / totals['cpu'] if totals['cpu'] else 0.0))
+    print('Recall: ungated {0:.1%}, gated {1:.1%} of {2} expected keywords'.format(
+        totals['found'] / expected, totals['gated_found'] / expected, totals['expected']))
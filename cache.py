@@ -0,0 +1,112 @@
+# Jackson: Voice-controlled Jacket
+# On disk cache for things that are slow to build at startup (like the
+# grammar's command table).  Entries are keyed by a hash of everything they're
+# built from so a changed input is rebuilt instead of read stale.
+# Author: Tony DiCola
+# License: MIT https://opensource.org/licenses/MIT
+import glob
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+
+
+logger = logging.getLogger(__name__)
+
+
+def digest(*parts):
+    """Return a hex SHA-256 digest of the specified parts, which can be bytes,
+    strings or paths of files (as a str prefixed with 'file:') whose contents
+    are hashed.
+    """
+    sha = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str) and part.startswith('file:'):
+            with open(part[5:], 'rb') as infile:
+                for block in iter(lambda: infile.read(65536), b''):
+                    sha.update(block)
+        elif isinstance(part, str):
+            sha.update(part.encode('utf8'))
+        else:
+            sha.update(part)
+        # Separate parts so ('ab', 'c') and ('a', 'bc') differ.
+        sha.update(b'\0')
+    return sha.hexdigest()
+
+
+def path(cache_dir, name, key, extension='.pickle'):
+    """Return the path of a cache entry with the specified name and key."""
+    return os.path.join(cache_dir, '{0}-{1}{2}'.format(name, key[:16], extension))
+
+
+def write_atomic(filename, data):
+    """Write bytes to a file so readers see either the old or the complete new
+    file, never a partial one.
+    """
+    directory = os.path.dirname(filename) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, temp = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as outfile:
+            outfile.write(data)
+        os.replace(temp, filename)
+    except BaseException:
+        os.unlink(temp)
+        raise
+
+
+def remove_stale(cache_dir, name, keep, extension='.pickle'):
+    """Remove every entry with the specified name except the keep path."""
+    for stale in glob.glob(os.path.join(cache_dir, name + '-*' + extension)):
+        if stale != keep:
+            try:
+                os.unlink(stale)
+            except OSError:
+                pass
+
+
+def load(cache_dir, name, key, build):
+    """Return the cached value with the specified name and key, or call build
+    to create (and cache) it if there's no entry for the key.  A cache_dir of
+    None disables the cache.  Unreadable entries are rebuilt and failures to
+    write the cache are logged but otherwise ignored.
+    """
+    if cache_dir is None:
+        return build()
+    filename = path(cache_dir, name, key)
+    try:
+        with open(filename, 'rb') as infile:
+            entry_key, value = pickle.load(infile)
+        if entry_key == key:
+            logger.debug('Loaded {0} from cache {1}'.format(name, filename))
+            return value
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning('Ignoring unreadable cache {0}: {1}'.format(filename, e))
+    value = build()
+    try:
+        write_atomic(filename, pickle.dumps((key, value), pickle.HIGHEST_PROTOCOL))
+        remove_stale(cache_dir, name, filename)
+    except OSError as e:
+        logger.warning('Failed to write cache {0}: {1}'.format(filename, e))
+    return value
+
+
+def load_file(cache_dir, name, key, build, extension):
+    """Return the path of a cached file with the specified name and key,
+    calling build to create its contents (bytes or a string) if there's no
+    file for the key.  For things like models that can only be loaded from a
+    file.
+    """
+    filename = path(cache_dir, name, key, extension)
+    if os.path.exists(filename):
+        logger.debug('Using cached {0} {1}'.format(name, filename))
+        return filename
+    data = build()
+    if isinstance(data, str):
+        data = data.encode('utf8')
+    write_atomic(filename, data)
+    remove_stale(cache_dir, name, filename, extension)
+    return filename
@@ -0,0 +1,38 @@
+# Jackson: Voice-controlled Jacket
+# Animation clocks.  Animations are functions of a FrameTime (and Jackson's
+# state) that return a frame, and a Timeline gives each animation on the
+# stack its own virtual time that only advances while it's rendered.
+# Author: Tony DiCola
+# License: MIT https://opensource.org/licenses/MIT
+import collections
+
+
+# Time passed to an animation for a frame: t is the animation's time in
+# seconds and dt is the seconds elapsed since the previous frame.
+FrameTime = collections.namedtuple('FrameTime', ['t', 'dt'])
+
+
+class Timeline:
+    """Wrap an animation with its own virtual clock.  The clock starts at
+    zero and advances by the frame delta every time the timeline is rendered,
+    so it's paused while another animation is on top of it.  A timeline is
+    itself an animation (call it with a FrameTime and state) and can be nested
+    inside other animations, only the delta of the frame time is used.
+    """
+
+    def __init__(self, animation, t=0.0):
+        self.animation = animation
+        self.t = t
+
+    def __call__(self, frame_time, state=None):
+        self.t += frame_time.dt
+        return self.animation(FrameTime(self.t, frame_time.dt), state)
+
+
+def frame_times(rate_hz, count, t=0.0):
+    """Generate count FrameTimes spaced at rate_hz starting from time t, for
+    rendering animations offline faster (or slower) than real time.
+    """
+    dt = 1.0 / rate_hz
+    for i in range(count):
+        yield FrameTime(t + i*dt, 0.0 if i == 0 else dt)
@@ -2,8 +2,11 @@
 # Color utility functions.
 # Author: Tony DiCola
 # License: MIT https://opensource.org/licenses/MIT
+import functools
 import math
 
+import numpy as np
+
 import utils
 
 
@@ -11,6 +14,8 @@ import utils
 gamma8 = bytearray(256)
 for i in range(len(gamma8)):
     gamma8[i] = int(math.pow(i/255.0, 2.8)*255.0+0.5) & 0xFF
+# Same table as a NumPy array for gamma correcting whole frames at once.
+gamma8_lut = np.frombuffer(gamma8, dtype=np.uint8)
 
 def compose(red, green, blue):
     """Generate a 24-bit RGB color value from the provided red, green, blue
@@ -69,3 +74,133 @@ def hsv_to_rgb(h, s, v):
         r, g, b = v, p, q
     return compose(gamma8[int(r * 255)], gamma8[int(g * 255)],
                    gamma8[int(b * 255)])
+
+
+# Array versions of the functions above.  These operate on NumPy arrays of
+# colors (i.e. a whole frame of pixels) at once and return exactly the same
+# values as calling the scalar function on every element.
+def compose_array(red, green, blue):
+    """Array version of compose.  Returns a uint32 array of 24-bit RGB colors
+    from arrays (or scalars) of red, green, blue component byte values.
+    """
+    red = np.asarray(red).astype(np.uint32) & 0xFF
+    green = np.asarray(green).astype(np.uint32) & 0xFF
+    blue = np.asarray(blue).astype(np.uint32) & 0xFF
+    return (red << 16) | (green << 8) | blue
+
+def decompose_array(colors):
+    """Array version of decompose.  Returns a 3-tuple of uint8 arrays (red,
+    green, blue) from an array of 24-bit RGB colors.
+    """
+    colors = np.asarray(colors).astype(np.uint32)
+    return (((colors >> 16) & 0xFF).astype(np.uint8),
+            ((colors >> 8) & 0xFF).astype(np.uint8),
+            (colors & 0xFF).astype(np.uint8))
+
+def gamma_array(values):
+    """Gamma correct an array of byte values (0-255) with the gamma8 table."""
+    return np.take(gamma8_lut, values)
+
+def lerp_array(x, x0, x1, c0, c1):
+    """Array version of lerp.  The colors c0, c1 and value x can be arrays or
+    scalars (they are broadcast together) and a uint32 array of 24-bit colors
+    is returned.
+    """
+    r0, g0, b0 = decompose_array(c0)
+    r1, g1, b1 = decompose_array(c1)
+    return compose_array(_lerp_byte(x, x0, x1, r0, r1),
+                         _lerp_byte(x, x0, x1, g0, g1),
+                         _lerp_byte(x, x0, x1, b0, b1))
+
+def _lerp_byte(x, x0, x1, y0, y1):
+    # Interpolate byte components, truncating and clamping like lerp.
+    y = utils.lerp(x, x0, x1, y0.astype(np.int64), y1.astype(np.int64))
+    return np.clip(np.asarray(y).astype(np.int64), 0, 255)
+
+def hsv_to_rgb_array(h, s, v):
+    """Array version of hsv_to_rgb.  Hue, saturation and value can be arrays
+    or scalars (they are broadcast together) and a uint32 array of 24-bit
+    gamma correct RGB colors is returned.
+    """
+    h, s, v = np.broadcast_arrays(np.asarray(h, dtype=np.float64),
+                                  np.asarray(s, dtype=np.float64),
+                                  np.asarray(v, dtype=np.float64))
+    # Same math as hsv_to_rgb, but every sector of the hue wheel is
+    # computed for every pixel and then picked out with a mask.
+    h = h / 60.0
+    i = np.floor(h)
+    f = h - i
+    p = v * (1.0 - s)
+    q = v * (1.0 - s * f)
+    t = v * (1.0 - s * (1.0 - f))
+    sectors = [i == 0, i == 1, i == 2, i == 3, i == 4]
+    r = np.select(sectors, [v, q, p, p, t], default=v)
+    g = np.select(sectors, [t, v, v, q, p], default=p)
+    b = np.select(sectors, [p, p, t, v, v], default=q)
+    rgb = compose_array(gamma_array(_to_byte(r)), gamma_array(_to_byte(g)),
+                        gamma_array(_to_byte(b)))
+    # Zero saturation is gray and (like hsv_to_rgb) isn't gamma corrected.
+    gray = _to_byte(v)
+    return np.where(s == 0, compose_array(gray, gray, gray), rgb)
+
+def _to_byte(x):
+    # Scale a 0 to 1.0 intensity to a byte, truncating like int(x * 255).
+    return np.clip((x * 255).astype(np.int64), 0, 255)
+
+
+class HueValueTable:
+    """Precomputed table of fully saturated (saturation = 1.0) HSV colors,
+    quantized to a number of hues around the color wheel and a number of
+    value/intensity levels.  Looking up a color is a single array index
+    instead of the HSV math and three gamma lookups.
+    """
+
+    def __init__(self, hues=360, values=256):
+        self.hues = hues
+        self.values = values
+        h = np.arange(hues) * (360.0 / hues)
+        v = np.arange(values) / (values - 1.0)
+        self.table = hsv_to_rgb_array(h[:, np.newaxis], 1.0, v[np.newaxis, :])
+
+    @property
+    def nbytes(self):
+        """Memory used by the table in bytes."""
+        return self.table.nbytes
+
+    def lookup(self, h, v):
+        """Return the 24-bit color (or uint32 array of colors if h or v are
+        arrays) for hue h in degrees and value v from 0 to 1.0.  Hue wraps
+        around the color wheel and value is clamped.
+        """
+        hi = np.floor(np.asarray(h) * (self.hues / 360.0) + 0.5).astype(np.int64)
+        vi = np.floor(np.asarray(v) * (self.values - 1) + 0.5).astype(np.int64)
+        return self.table[hi % self.hues, np.clip(vi, 0, self.values - 1)]
+
+    def error(self):
+        """Measure the quantization error of the table against hsv_to_rgb.
+        Colors are compared halfway between table entries (the worst case)
+        and a 2-tuple of the max and mean absolute error of a color component
+        (0-255) is returned.
+        """
+        h = (np.arange(2 * self.hues) + 0.5) * (180.0 / self.hues)
+        v = (np.arange(2 * self.values - 1) + 0.5) / (2 * (self.values - 1))
+        h, v = h[:, np.newaxis], v[np.newaxis, :]
+        exact = np.stack(decompose_array(hsv_to_rgb_array(h, 1.0, v)))
+        table = np.stack(decompose_array(self.lookup(h, v)))
+        diff = np.abs(exact.astype(np.int16) - table.astype(np.int16))
+        return int(diff.max()), float(diff.mean())
+
+    def report(self):
+        """Return a short human readable summary of the table resolution,
+        memory footprint and quantization error.
+        """
+        max_error, mean_error = self.error()
+        return '{0} hues x {1} values: {2:.1f} KB, max error {3}, mean error {4:.3f}'.format(
+            self.hues, self.values, self.nbytes / 1024.0, max_error, mean_error)
+
+@functools.lru_cache(maxsize=None)
+def hsv_table(hues=360, values=256):
+    """Return the shared HueValueTable for this resolution, building it the
+    first time it's requested.
+    """
+    return HueValueTable(hues, values)
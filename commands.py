@@ -1,6 +1,8 @@
 # Jackson: Voice-controlled Jacket
 # Command dispatcher that parses commands from raw speech text and invokes
-# callback functions.
+# callback functions.  Exact commands are found with one dict lookup of their
+# words and starts with commands are stored in a trie of words so dispatch is
+# at most a single walk over the words of the command.
 # Author: Tony DiCola
 # License: MIT https://opensource.org/licenses/MIT
 import logging
@@ -9,18 +11,36 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+class _Node:
+    # Trie node with child nodes by word, and the value (like a callback) of
+    # the words up to here.
+    __slots__ = ('children', 'value')
+
+    def __init__(self):
+        self.children = {}
+        self.value = None
+
+    def insert(self, words):
+        node = self
+        for word in words:
+            node = node.children.setdefault(word, _Node())
+        return node
+
+
 class Dispatcher:
 
     def __init__(self, junk=[]):
         """Create an instance of the command dispatcher.  Optionally specify
-        a list of ignored/junk words which will be filtered from input
-        commands.
+        a list of ignored/junk words (or phrases of several words) which will
+        be filtered from input commands.
         """
-        # Store a mapping of exact and starts with command strings to
-        # associated callback functions.
+        # Exact commands by their tuple of words, and tries of the starts with
+        # commands and of the junk phrases.
         self._exact_commands = {}
-        self._starts_with_commands = {}
-        self._junk = junk
+        self._starts_with_commands = _Node()
+        self._junk = _Node()
+        for phrase in junk:
+            self._junk.insert(phrase.split()).value = True
 
     def register(self, command, callback, *args, **kwargs):
         """Associate the specified list/tuple of command strings with the
@@ -35,8 +55,44 @@ class Dispatcher:
         provided callback.  If the start of a command matches this list (minus
         any ignored/junk words) then the provided callback is invoked with
         the entire command string and then any extra specified args and kwargs.
+        The longest matching start wins if several match.
         """
-        self._starts_with_commands[tuple(command.split())] = (callback, args, kwargs)
+        self._starts_with_commands.insert(command.split()).value = (callback, args, kwargs)
+
+    def register_index(self, index, callbacks):
+        """Register every command of a grammar.Index (the dispatcher's junk
+        should be the index's junk).  When a command is heard the callback for
+        its action's key in the callbacks dict is invoked with the command and
+        the action's value.  Raises ValueError if an action has no callback.
+        """
+        for command, (key, value) in index.actions.items():
+            if key not in callbacks:
+                raise ValueError('No callback for {0} of command {1!r}'.format(key, command))
+            self.register(command, callbacks[key], value)
+
+    def clean(self, command):
+        """Split a raw speech command string into a tuple of words with any
+        junk words removed.  Junk is only matched on whole words.
+        """
+        words = command.split()
+        cleaned = []
+        i = 0
+        while i < len(words):
+            # Find the longest junk phrase starting at this word.
+            node = self._junk
+            end = None
+            for j in range(i, len(words)):
+                node = node.children.get(words[j])
+                if node is None:
+                    break
+                if node.value:
+                    end = j + 1
+            if end is None:
+                cleaned.append(words[i])
+                i += 1
+            else:
+                i = end
+        return tuple(cleaned)
 
     def dispatch(self, command):
         """Process the specified raw speech command string and invoke any
@@ -46,20 +102,20 @@ class Dispatcher:
         # Ignore empty/null command.
         if command is None:
             return
-        # Remove junk words.
-        for junk in self._junk:
-            command = command.replace(junk, '')
-        cleaned = tuple(command.strip().split())
+        cleaned = self.clean(command)
         logger.debug('Cleaned: {0}'.format(cleaned))
-        # First look for an exact command match and call its callback.
-        callback, args, kwargs = self._exact_commands.get(cleaned, (None, None, None))
-        # Failed to find an exact command, now look for a command that starts
-        # with this command string and call its callback.
-        if callback is None:
-            for prefix, val in self._starts_with_commands.items():
-                callback, args, kwargs = val
-                if prefix == tuple(cleaned[:len(prefix)]):
+        # Look for an exact command match, then walk the trie of starts with
+        # commands for the longest registered start of the command.
+        match = self._exact_commands.get(cleaned)
+        if match is None:
+            node = self._starts_with_commands
+            match = node.value
+            for word in cleaned:
+                node = node.children.get(word)
+                if node is None:
                     break
+                match = node.value or match
         # Invoke the callback if one was found.
-        if callback is not None:
+        if match is not None:
+            callback, args, kwargs = match
             callback(cleaned, *args, **kwargs)
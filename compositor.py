@@ -0,0 +1,310 @@
+# Jackson: Voice-controlled Jacket
+# Animation compositor.  Animations are layers in a flat list (bottom to top)
+# that are blended together every frame, instead of wrapping animations in
+# other animations to fade between them.  Each layer has a blend mode and an
+# opacity envelope (fade in, hold, fade out) that also sets its lifetime, and
+# whole frames are blended at once with array math.  Only the layers from the
+# topmost fully opaque one up are rendered (and advance their time, layers
+# under them are paused), so the cost of a frame depends on the few layers
+# that can be seen and not on how many were pushed.  The
+# layers are bounded: pushing an animation of the same kind as a layer
+# replaces it, layers hidden for good under an opaque layer that never ends
+# are dropped, and past a maximum the oldest layers are dropped.
+# Author: Tony DiCola
+# License: MIT https://opensource.org/licenses/MIT
+import math
+import sys
+import threading
+
+import numpy as np
+
+import clock
+import frames
+
+
+# Blend modes of a layer with the layers below it.
+NORMAL   = 'normal'    # Replace the colors below.
+ADD      = 'add'       # Add to the colors below (saturating).
+MULTIPLY = 'multiply'  # Multiply with the colors below (darken).
+MAX      = 'max'       # Brightest of the colors (lighten).
+
+# Blend functions of a mode, from float32 arrays of the color bytes below and
+# of the layer to the blended color bytes (before opacity is applied).
+_BLEND = {
+    NORMAL:   lambda below, above: above,
+    ADD:      lambda below, above: np.minimum(below + above, 255.0),
+    MULTIPLY: lambda below, above: below * above * (1.0/255.0),
+    MAX:      np.maximum
+}
+
+
+class Envelope:
+
+    def __init__(self, delay_s=0.0, fade_in_s=0.0, hold_s=math.inf,
+                 fade_out_s=0.0, opacity=1.0):
+        """Create an opacity envelope: invisible for delay_s seconds, then
+        fading in to the specified opacity (0 to 1.0) over fade_in_s seconds,
+        holding for hold_s seconds (forever by default) and fading out over
+        fade_out_s seconds.
+        """
+        self.delay_s = delay_s
+        self.fade_in_s = fade_in_s
+        self.hold_s = hold_s
+        self.fade_out_s = fade_out_s
+        self.opacity = opacity
+
+    @property
+    def end_s(self):
+        """Time the envelope is finished (infinite if it holds forever)."""
+        return self.delay_s + self.fade_in_s + self.hold_s + self.fade_out_s
+
+    def __call__(self, t):
+        """Return the opacity (0 to 1.0) at time t in seconds."""
+        t -= self.delay_s
+        if t < 0.0:
+            return 0.0
+        if t < self.fade_in_s:
+            return self.opacity * t / self.fade_in_s
+        t -= self.fade_in_s + self.hold_s
+        if t < 0.0:
+            return self.opacity
+        if t < self.fade_out_s:
+            return self.opacity * (1.0 - t / self.fade_out_s)
+        return 0.0
+
+
+class Layer:
+
+    def __init__(self, animation, blend=NORMAL, envelope=None, kind=None):
+        """Create a layer that renders an animation (see jackson.py), blended
+        with the layers below by a blend mode and an Envelope (fully opaque
+        forever by default).  The layer has its own time that starts at zero
+        when it's pushed and only advances while the layer isn't hidden under
+        an opaque layer above it, so a covered layer is paused and resumes
+        where it left off.  It's finished when its envelope ends or the
+        animation returns None/null.  The optional kind names the animation
+        (like 'idle') for coalescing, see Compositor.push.
+        """
+        if blend not in _BLEND:
+            raise ValueError('Unknown blend mode {0}'.format(blend))
+        self.animation = animation
+        self.blend = blend
+        self.envelope = envelope if envelope is not None else Envelope()
+        self.kind = kind
+        self.t = 0.0
+        self.finished = False
+
+    @property
+    def opacity(self):
+        """Current opacity of the layer (0 to 1.0)."""
+        return self.envelope(self.t)
+
+    @property
+    def expired(self):
+        """True if the layer is finished and can be dropped."""
+        return self.finished or self.t >= self.envelope.end_s
+
+    @property
+    def covers(self):
+        """True if the layer hides everything below it from now on: a fully
+        opaque normal layer that never ends.  An animation with an envelope
+        that never ends is expected to never finish by itself.
+        """
+        envelope = self.envelope
+        return self.blend == NORMAL and not self.finished and \
+            envelope.end_s == math.inf and envelope.opacity >= 1.0 and \
+            self.t >= envelope.delay_s + envelope.fade_in_s
+
+    def fade_out(self, seconds):
+        """Fade the layer out from its current opacity over the specified
+        seconds, from now.  A layer that will be faded out should be pushed
+        with an envelope that ends, or it hides (and drops) the layers below.
+        """
+        self.envelope = Envelope(hold_s=self.t, fade_out_s=seconds,
+                                 opacity=self.opacity)
+
+
+class Compositor:
+
+    def __init__(self, n, max_layers=8):
+        """Create a compositor of frames of n pixels with no layers, that
+        keeps at most max_layers layers.
+        """
+        self.n = n
+        self.max_layers = max_layers
+        # Layers are replaced as a whole tuple so the render thread can read
+        # them without locking while other threads push layers.
+        self._layers = ()
+        self._lock = threading.Lock()
+        # Counts of layers pushed, replaced by a push of the same kind,
+        # dropped because they were hidden or over the maximum, and expired,
+        # and the most layers there have been.
+        self.pushed = 0
+        self.coalesced = 0
+        self.evicted = 0
+        self.expired = 0
+        self.max_depth = 0
+
+    def __len__(self):
+        return len(self._layers)
+
+    @property
+    def layers(self):
+        """Tuple of the layers, bottom to top."""
+        return self._layers
+
+    def push(self, animation, blend=NORMAL, envelope=None, kind=None):
+        """Push an animation on top of the layers (see Layer) and return its
+        Layer.  If a kind is specified any layers of the same kind are
+        removed, the new one replaces them.
+        """
+        layer = Layer(animation, blend, envelope, kind)
+        with self._lock:
+            layers = self._layers
+            if kind is not None:
+                kept = tuple(l for l in layers if l.kind != kind)
+                self.coalesced += len(layers) - len(kept)
+                layers = kept
+            self._layers = self._bound(layers + (layer,))
+            self.pushed += 1
+            self.max_depth = max(self.max_depth, len(self._layers))
+        return layer
+
+    def _bound(self, layers):
+        # Drop the layers below the topmost layer that covers them, then the
+        # oldest layers that will end (or the bottom layer if none will) until
+        # there are at most max_layers.  Called with the lock held.
+        count = len(layers)
+        for i in range(len(layers) - 1, 0, -1):
+            if layers[i].covers:
+                layers = layers[i:]
+                break
+        while len(layers) > self.max_layers:
+            oldest = next((i for i, l in enumerate(layers[:-1])
+                           if l.envelope.end_s != math.inf), 0)
+            layers = layers[:oldest] + layers[oldest+1:]
+        self.evicted += count - len(layers)
+        return layers
+
+    def remove(self, layer):
+        """Remove a layer right away, if it's still there."""
+        self._drop(lambda l: l is layer)
+
+    def clear(self):
+        """Remove every layer."""
+        with self._lock:
+            self._layers = ()
+
+    def _drop(self, condition):
+        with self._lock:
+            self._layers = tuple(l for l in self._layers if not condition(l))
+
+    def _prune(self):
+        # Drop expired layers and layers hidden for good.
+        with self._lock:
+            layers = tuple(l for l in self._layers if not l.expired)
+            self.expired += len(self._layers) - len(layers)
+            self._layers = self._bound(layers)
+
+    def report(self):
+        """Return a dict of the number of layers (depth) and their kinds
+        from bottom to top, an estimate of the bytes of memory they hold, and
+        the push, coalesce, evict and expire counts.
+        """
+        layers = self._layers
+        return {
+            'depth':     len(layers),
+            'max_depth': self.max_depth,
+            'kinds':     [l.kind for l in layers],
+            'bytes':     sum(_memory(l.animation) for l in layers),
+            'pushed':    self.pushed,
+            'coalesced': self.coalesced,
+            'evicted':   self.evicted,
+            'expired':   self.expired
+        }
+
+    def render(self, ft, state):
+        """Advance the time of the layers that aren't hidden by the frame's
+        delta, drop the layers that have expired and return the blended frame
+        of the visible layers as an (N,) uint32 array, or None/null if there
+        are no layers.
+        """
+        layers = self._layers
+        frame, finished, hidden = self._compose(layers, ft.dt, state)
+        if finished or hidden or any(l.expired for l in layers):
+            self._prune()
+        return frame
+
+    def _compose(self, layers, dt, state):
+        # Walk down from the top rendering each layer until the first fully
+        # opaque one, nothing below it can be seen (or advances).  A layer
+        # that finishes is skipped so the layers below it show through in the
+        # same frame, and every animation is rendered at most once.  Layers
+        # below one that covers them for good are dropped.
+        rendered = []
+        finished = False
+        hidden = False
+        for i in range(len(layers) - 1, -1, -1):
+            layer = layers[i]
+            if layer.expired:
+                continue
+            layer.t += dt
+            opacity = layer.opacity
+            if opacity <= 0.0:
+                continue
+            pixels = layer.animation(clock.FrameTime(layer.t, dt), state)
+            if pixels is None:
+                layer.finished = finished = True
+                continue
+            rendered.append((layer, opacity, pixels))
+            if opacity >= 1.0 and layer.blend == NORMAL:
+                hidden = i > 0 and layer.covers
+                break
+        if not rendered:
+            showing = any(not l.expired for l in layers)
+            return (np.zeros(self.n, dtype=np.uint32) if showing else None), finished, hidden
+        # Blend up from the bottom.  Colors are blended as bytes (a uint32
+        # frame viewed as 4 bytes per pixel, every byte is blended the same
+        # way so byte order doesn't matter).
+        frame = None
+        below = None
+        for layer, opacity, pixels in reversed(rendered):
+            pixels = np.ascontiguousarray(frames.pack(pixels), dtype=np.uint32)
+            if below is None and frame is None and opacity >= 1.0 and layer.blend == NORMAL:
+                # An opaque bottom layer is used as-is.
+                frame = pixels
+                continue
+            if below is None:
+                below = np.zeros(4*self.n, dtype=np.float32) if frame is None else \
+                    frame.view(np.uint8).astype(np.float32)
+            above = pixels.view(np.uint8).astype(np.float32)
+            blended = _BLEND[layer.blend](below, above)
+            if opacity >= 1.0:
+                below = blended
+            else:
+                below += (blended - below) * opacity
+        if below is None:
+            return frame, finished, hidden
+        return np.clip(below, 0.0, 255.0).astype(np.uint8).view(np.uint32), finished, hidden
+
+
+def _memory(animation):
+    # Estimate the bytes held by an animation function: the function and
+    # the values its closure holds (arrays by their data size), recursing
+    # into closures of functions it holds.
+    seen = set()
+    def size(value, depth):
+        if id(value) in seen or depth > 4:
+            return 0
+        seen.add(id(value))
+        if isinstance(value, np.ndarray):
+            return value.nbytes + sys.getsizeof(value) if value.base is None else \
+                sys.getsizeof(value)
+        total = sys.getsizeof(value)
+        for cell in getattr(value, '__closure__', None) or ():
+            try:
+                total += size(cell.cell_contents, depth + 1)
+            except ValueError:
+                pass  # Empty cell.
+        return total
+    return size(animation, 0)
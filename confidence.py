@@ -0,0 +1,131 @@
+# Jackson: Voice-controlled Jacket
+# Confidence scoring of recognized keywords and commands.  Pocketsphinx always
+# returns its best guess, even for crowd noise, so keywords and commands are
+# only acted on if their confidence (0 to 1.0) is above a threshold that can
+# be set per keyword or command.  Rolling statistics of the accepted and
+# rejected confidences show how the thresholds are working.
+# Author: Tony DiCola
+# License: MIT https://opensource.org/licenses/MIT
+import collections
+import math
+import threading
+
+
+def nbest_posterior(scores):
+    """Return the posterior probability of the first of a list of N-best
+    hypothesis scores (natural log likelihoods, best first), the share of the
+    total likelihood of the N-best list it has.  A single hypothesis has a
+    posterior of 1.0.
+    """
+    if not scores:
+        return 0.0
+    best = scores[0]
+    return 1.0 / sum(math.exp(min(score - best, 0.0)) for score in scores)
+
+
+def per_frame(score, frames):
+    """Return a natural log likelihood score normalized to a per frame
+    likelihood (0 to 1.0), so long and short utterances can be compared.
+    """
+    return math.exp(min(score / max(frames, 1), 0.0))
+
+
+def keyword_confidence(decoder, keyword):
+    """Return the confidence (0 to 1.0) of a keyword just spotted by a
+    Pocketsphinx decoder in keyword spotting mode, or None/null if the
+    decoder has no segment for it.  Keyword spotting always reports a best
+    score of 0, so the score of the keyword's latest segment (how much more
+    likely the keyword is than the phone loop) normalized per frame is used.
+    """
+    segments = [seg for seg in decoder.seg() if seg.word.strip() == keyword]
+    if not segments:
+        return None
+    seg = segments[-1]
+    return per_frame(decoder.get_logmath().log_to_ln(seg.prob),
+                     seg.end_frame - seg.start_frame + 1)
+
+
+class Thresholds:
+
+    def __init__(self, default=0.0, overrides={}):
+        """Create minimum confidence thresholds with a default and a dict of
+        overrides by name.
+        """
+        self.default = default
+        self.overrides = dict(overrides)
+
+    def get(self, *names):
+        """Return the threshold of the first name that has an override, or
+        the default.
+        """
+        for name in names:
+            if name in self.overrides:
+                return self.overrides[name]
+        return self.default
+
+
+class ScoreStats:
+
+    def __init__(self, window=200):
+        """Create rolling statistics of the last window scored utterances."""
+        self._scores = collections.deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, name, confidence, accepted):
+        """Record the confidence of an utterance and if it was accepted."""
+        with self._lock:
+            self._scores.append((name, confidence, accepted))
+
+    def summary(self):
+        """Return a dict of accepted and rejected counts, the rejected rate
+        and mean, min and max accepted and rejected confidence, overall and by
+        name.
+        """
+        with self._lock:
+            scores = list(self._scores)
+        by_name = collections.defaultdict(list)
+        for name, confidence, accepted in scores:
+            by_name[name].append((confidence, accepted))
+        return {
+            'total':   _summarize([(c, a) for _, c, a in scores]),
+            'by_name': {name: _summarize(s) for name, s in sorted(by_name.items())}
+        }
+
+
+def _summarize(scores):
+    rejected_count = sum(1 for _, a in scores if not a)
+    result = {
+        'accepted':      len(scores) - rejected_count,
+        'rejected':      rejected_count,
+        'rejected_rate': rejected_count / len(scores) if scores else 0.0
+    }
+    accepted = [c for c, a in scores if a and c is not None]
+    rejected = [c for c, a in scores if not a and c is not None]
+    for kind, values in (('accepted', accepted), ('rejected', rejected)):
+        if values:
+            result[kind + '_mean'] = sum(values) / len(values)
+            result[kind + '_min'] = min(values)
+            result[kind + '_max'] = max(values)
+    return result
+
+
+class Gate:
+
+    def __init__(self, thresholds, stats=None):
+        """Create a gate that accepts utterances whose confidence is at least
+        the threshold for them, recording every decision in stats (a
+        ScoreStats).
+        """
+        self.thresholds = thresholds
+        self.stats = stats if stats is not None else ScoreStats()
+
+    def accept(self, confidence, *names):
+        """Return True if the confidence is at or above the threshold of the
+        first name with an override (see Thresholds.get).  The decision is
+        recorded under the first name.  A confidence of None/null (not
+        scored) is always rejected.
+        """
+        accepted = confidence is not None and \
+            confidence >= self.thresholds.get(*names)
+        self.stats.record(names[0] if names else None, confidence, accepted)
+        return accepted
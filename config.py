@@ -11,9 +11,16 @@ DEVICE             = 'plughw:1,0'   # ALSA device to use for mic input.  Be sure
                                     # sample rate below (most USB audio
                                     # adapters don't see to support 16khz).
 SAMPLE_RATE_HZ     = 16000          # Sample rate for the mic (16khz preferred)
+MIC_PERIOD_SIZE    = 512            # Samples read from ALSA at a time.
+MIC_BUFFER_S       = 2.0            # Seconds of audio kept in the capture
+                                    # ring buffer.
 
 # NeoPixel LED configuration:
-import _rpi_ws281x as ws
+try:
+    import _rpi_ws281x as ws
+except ImportError:
+    ws = None  # Allows config to be imported (by tests, benchmarks and file
+               # audio sources) on machines without the NeoPixel library.
 LED_COUNT          = 26      # Number of LED pixels.
 LED_PIN            = 18      # GPIO pin connected to the pixels (18 uses PWM!).
 LED_FREQ_HZ        = 800000  # LED signal frequency in hertz (usually 800khz)
@@ -21,25 +28,106 @@ LED_DMA            = 10      # DMA channel to use for generating signal (try 10)
 LED_BRIGHTNESS     = 255     # Set to 0 for darkest and 255 for brightest
 LED_INVERT         = False   # True to invert the signal (when using NPN transistor level shift)
 LED_CHANNEL        = 0       # Set to '1' for GPIOs 13, 19, 41, 45 or 53
-LED_TYPE           = ws.WS2811_STRIP_GRB  # Strip type, see rpi_ws281x library.
+LED_TYPE           = ws and ws.WS2811_STRIP_GRB  # Strip type, see rpi_ws281x library.
+LED_SEGMENTS       = None    # Several strips as one, or None for one strip of
+                             # LED_COUNT pixels with the settings above.  A
+                             # list of dicts of each strip's count and optional
+                             # name, pin, channel, dma, freq_hz, invert,
+                             # brightness and strip_type (default the settings
+                             # above).  Strips on the two channels of a DMA
+                             # are shown together, strips on different DMAs
+                             # are shown at the same time.  For example:
+                             # [dict(name='left', count=20, pin=18, channel=0),
+                             #  dict(name='right', count=20, pin=13, channel=1),
+                             #  dict(name='back', count=60, pin=21, dma=11)]
+                             # Avoid DMA 5, it can corrupt the SD card.  Only
+                             # one DMA can use the PWM pins (and the PCM pins,
+                             # and the SPI pins).
 
 # Animation configuration:
+FRAME_RATE_HZ      = 60.0  # Target LED animation frame rate.
+FRAME_STATS_LOG_S  = 60.0  # Log frame time stats this often (seconds), or None
+                           # to disable.
 FLOW_HUE_PERIOD_S  = 45.0  # Idle flow animation complete hue cycle period (sec)
 ANIMATION_DURATION = 10.0  # Number of seconds animations like wink will play.
+ANIMATION_MAX_LAYERS = 8   # Most animation layers kept, older ones past
+                           # this are dropped.
+BAKE_ANIMATIONS    = True  # Precompute a period of periodic animations (like
+                           # idle) instead of computing every frame.
+BAKE_CACHE_BYTES   = 1024*1024  # Memory kept for baked animation tables.
+COLOR_TABLE_HUES   = 360   # Hue resolution of the precomputed color table.
+COLOR_TABLE_VALUES = 256   # Value/intensity resolution of the color table.
+                           # Run benchmarks/color_table.py to see the memory
+                           # and accuracy of different table resolutions.
+SPECTRUM_MIN_HZ    = 100.0   # Frequency range shown by the spectrum animation,
+SPECTRUM_MAX_HZ    = 4000.0  # split into log spaced bands (one per LED).
+SPECTRUM_SMOOTHING = 0.6     # Fraction of the previous band level kept every
+                             # audio block (0 = no smoothing).
+SPECTRUM_RANGE_DB  = 40.0    # Levels this far below the loudest are dark.
+SPECTRUM_DECAY_DB_S = 6.0    # Auto gain: how fast (dB/sec) the loudest level
+                             # decays so quieter audio is turned up.
 
 # Pocketphinx speech recognition config:
 ACOUSTIC_MODEL     = '/usr/local/share/pocketsphinx/model/en-us/en-us'
 DICTIONARY_MODEL   = '/usr/local/share/pocketsphinx/model/en-us/cmudict-en-us.dict'
 LANGUAGE_MODEL     = '/usr/local/share/pocketsphinx/model/en-us/en-us.lm.bin'
 POCKETSPHINX_DEBUG = True # Bool to enable/disable pocketsphinx debug output.
+POCKETSPHINX_NFFT  = 2048  # FFT size of the decoder's feature extraction.  Must
+                           # be bumped up when using fast sample rates (16khz or
+                           # more).  Compare settings with
+                           # benchmarks/recognition.py.
 
 # Speech command configuration:
 GRAMMAR_MODEL      = './commands.gram'  # JSGF grammar for Pocketsphinx
+CACHE_DIR          = './cache'  # Cache of things built at startup, like the
+                                # grammar's command table (None to disable).
+SPEECH_PROCESS     = False  # Run speech recognition in its own process (needs
+                            # Python 3.8+) so decoding can't stall the LED
+                            # animation.  Compare the two with
+                            # benchmarks/speech_modes.py.
 COMMAND_MIN_S      = 2.0  # Min time to wait for a command to start (seconds).
 COMMAND_MAX_S      = 5.0  # Max time to record voice for a command (seconds).
-# Junk words that will be ignored by command processing.  This MUST match the
-# grammar <junk> rule list!
-GRAMMAR_JUNK       = set(['please', 'thank you', 'thanks', 'the', 'your', 'to'])
+COMMAND_SILENCE_S  = 0.2  # Stop listening this long after speech ends (on top
+                          # of Pocketsphinx's own end of speech delay).
+COMMAND_EARLY_RETURN = True  # Stop listening as soon as a complete command
+                             # is heard.  Run benchmarks/endpointing.py to see
+                             # the latency this and COMMAND_SILENCE_S save.
+# Junk words, color hues and brightness levels of commands are all defined in
+# the grammar (see the tags in commands.gram).
+
+# Voice activity gate configuration.
+# Keyword spotting skips decoding audio that's quieter than speech.  Run
+# benchmarks/vad_keywords.py on recordings to see the CPU saved and keywords
+# missed with different settings.
+VAD_ENABLED        = True
+VAD_MARGIN_DB      = 10.0  # Speech is this much louder than background noise.
+VAD_PREROLL_S      = 0.3   # Audio before speech that's decoded too, so the
+                           # start of keywords isn't clipped.
+VAD_HANGOVER_S     = 0.5   # Audio after speech that's decoded too.
+
+# Confidence configuration.
+# Recognized keywords and commands are ignored if their confidence (0 to 1.0)
+# is below a minimum.  Minimums can be set for individual keywords, and for
+# commands (without junk words, like 'set color blue') or actions (like 'hue').
+KEYWORD_MIN_CONFIDENCE = 0.0
+KEYWORD_CONFIDENCE = {
+    # 'yo jackson': 0.2
+}
+COMMAND_MIN_CONFIDENCE = 0.0
+COMMAND_CONFIDENCE = {
+    # 'hue': 0.5,
+    # 'show me spectrum': 0.6
+}
+COMMAND_NBEST      = 5    # Distinct hypotheses compared for command confidence.
+CONFIDENCE_STATS_WINDOW = 200  # Recent keywords and commands kept in the
+                               # accepted/rejected confidence statistics.
+
+# Latency tracing configuration:
+TRACE_ENABLED      = False  # Trace the latency of each stage of voice commands,
+                            # from keyword detection to the first frame shown.
+TRACE_CAPACITY     = 100    # Number of the most recent traces kept.
+TRACE_FILE         = './traces.jsonl'  # Traces are appended to this file as
+                                       # JSON lines on SIGUSR1.
 
 # Keyword configuration.
 # These are wake, happy, and sad keywords that will be continuously detected
@@ -60,30 +148,7 @@ SAD_WORDS = {
     'depression': '1e-05',
     'anger':      '1e-05'
 }
-
-# Mapping of color hue strings/names to their value (in degrees).
-COLOR_HUES = {
-    'red':         0.0,
-    'orange':     30.0,
-    'yellow':     60.0,
-    'green':     120.0,
-    'turquoise': 150.0,
-    'cyan':      180.0,
-    'blue':      210.0,
-    'violet':    240.0,
-    'purple':    270.0,
-    'magenta':   300.0,
-    'scarlet':   330.0
-}
-
-# Mapping of brightness strings to their value (0...3, off to full bright).
-BRIGHTNESS_VALUES = {
-    'zero':   0,
-    'one':    1,
-    'two':    2,
-    'three':  3,
-    'low':    1,
-    'medium': 2,
-    'high':   3,
-    'max':    3
-}
+# Thresholds recommended by the keyword tuning tool (python3 tuning.py, run it
+# with --help for details) are loaded from this file, if it exists, and
+# replace the thresholds above.
+KEYWORD_THRESHOLDS_FILE = './keyword_thresholds.json'
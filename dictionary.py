@@ -0,0 +1,49 @@
+# Jackson: Voice-controlled Jacket
+# Pronunciation dictionary pruning.  Pocketsphinx parses its whole dictionary
+# (over 130,000 words for cmudict-en-us.dict) on every start even though
+# Jackson only ever listens for a few dozen words, so the dictionary is cut
+# down to just the words of the grammar and keywords and cached on disk.
+# Author: Tony DiCola
+# License: MIT https://opensource.org/licenses/MIT
+import cache
+
+
+def _word(line):
+    # Return the word a dictionary line is for.  Alternate pronunciations are
+    # numbered like 'word(2)'.
+    word = line.split(None, 1)[0] if line.strip() else ''
+    return word.split('(', 1)[0].lower()
+
+
+def prune(lines, words):
+    """Return a 2-tuple of the dictionary lines (including alternate
+    pronunciations) for the specified set of lowercase words, and the sorted
+    list of words that weren't found.
+    """
+    pruned = [line for line in lines if _word(line) in words]
+    found = set(_word(line) for line in pruned)
+    return pruned, sorted(set(words) - found)
+
+
+def phrase_words(phrases):
+    """Return the set of lowercase words in an iterable of phrases."""
+    return set(word.lower() for phrase in phrases for word in phrase.split())
+
+
+def load_pruned(path, words, cache_dir):
+    """Return a 2-tuple of the path of a copy of the dictionary file at path
+    with only the specified words, cached in cache_dir keyed by a hash of the
+    dictionary and words, and the list of words missing from the dictionary
+    (which can't be recognized).
+    """
+    words = set(words)
+    key = cache.digest('dict-1', 'file:' + path, ' '.join(sorted(words)))
+    def build():
+        with open(path, encoding='utf8') as infile:
+            pruned, _ = prune(infile, words)
+        return ''.join(line if line.endswith('\n') else line + '\n' for line in pruned)
+    pruned_path = cache.load_file(cache_dir, 'dictionary', key, build, '.dict')
+    # Checking the small pruned file for missing words is cheap.
+    with open(pruned_path, encoding='utf8') as infile:
+        _, missing = prune(infile, words)
+    return pruned_path, missing
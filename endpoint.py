@@ -0,0 +1,68 @@
+# Jackson: Voice-controlled Jacket
+# End of utterance detection for command listening.  Decides when to stop
+# listening for a command from how long it's been listening, the decoder's
+# in speech flag and its partial hypothesis, so a short command like
+# "brighter" is acted on as soon as it's been said instead of after a fixed
+# minimum listen time.
+# Author: Tony DiCola
+# License: MIT https://opensource.org/licenses/MIT
+
+
+class Endpointer:
+
+    def __init__(self, no_speech_s=2.0, max_s=5.0, silence_s=0.2, min_s=0.0,
+                 is_complete=None):
+        """Create an endpointer for one utterance.  Listening ends:
+        - no_speech_s seconds after it starts if no speech was heard.
+        - silence_s seconds after speech turns to silence.
+        - as soon as the partial hypothesis is a complete command, if an
+          is_complete function (of a hypothesis string) is specified.
+        - max_s seconds after it starts at the latest.
+        Listening never ends before min_s seconds (other than at max_s).
+        """
+        self.no_speech_s = no_speech_s
+        self.max_s = max_s
+        self.silence_s = silence_s
+        self.min_s = min_s
+        self._is_complete = is_complete
+        self._heard = False
+        self._silence_start = None
+        self._last_hypothesis = None
+
+    def update(self, elapsed_s, in_speech, hypothesis=None):
+        """Update with the seconds of audio heard so far, whether the decoder
+        is in speech, and its partial hypothesis (or None/null).  Returns why
+        the utterance is finished ('complete', 'silence', 'no_speech' or
+        'max') or None/null to keep listening.
+        """
+        if in_speech:
+            self._heard = True
+            self._silence_start = None
+        elif self._heard and self._silence_start is None:
+            # Speech to silence transition.
+            self._silence_start = elapsed_s
+        if elapsed_s >= self.max_s:
+            return 'max'
+        if elapsed_s < self.min_s:
+            return None
+        if hypothesis and self._is_complete is not None and \
+           hypothesis != self._last_hypothesis:
+            # Only check a hypothesis once, it's the same answer every time.
+            self._last_hypothesis = hypothesis
+            if self._is_complete(hypothesis):
+                return 'complete'
+        if self._silence_start is not None and \
+           elapsed_s - self._silence_start >= self.silence_s:
+            return 'silence'
+        if not self._heard and elapsed_s >= self.no_speech_s:
+            return 'no_speech'
+        return None
+
+
+def fixed(no_speech_s, max_s):
+    """Return an endpointer that works like Jackson's original command
+    listening: stop at no_speech_s seconds once there's no speech, or at
+    max_s seconds.  Used to compare with adaptive endpointing.
+    """
+    return Endpointer(no_speech_s=no_speech_s, max_s=max_s, silence_s=0.0,
+                      min_s=no_speech_s)
@@ -0,0 +1,44 @@
+# Jackson: Voice-controlled Jacket
+# Frame helpers.  Animations render a whole frame of pixels at a time as a
+# NumPy array instead of yielding one pixel color per call.  A frame is either
+# an (N,) array of 24-bit RGB colors or an (N,3) uint8 array of red, green,
+# blue component bytes.
+# Author: Tony DiCola
+# License: MIT https://opensource.org/licenses/MIT
+import numpy as np
+
+import color
+
+
+def pack(frame):
+    """Convert a frame into an (N,) uint32 array of 24-bit RGB colors.  The
+    frame can be an (N,) array of 24-bit colors or an (N,3) array of red,
+    green, blue component bytes.  A uint32 frame is returned as-is (no copy).
+    """
+    frame = np.asarray(frame)
+    if frame.ndim == 2:
+        if frame.shape[1] != 3:
+            raise ValueError('Expected an (N,3) frame, got shape {0}'.format(frame.shape))
+        return color.compose_array(frame[:, 0], frame[:, 1], frame[:, 2])
+    if frame.ndim != 1:
+        raise ValueError('Expected an (N,) or (N,3) frame, got shape {0}'.format(frame.shape))
+    if frame.dtype == np.uint32:
+        return frame
+    return frame.astype(np.uint32) & 0xFFFFFF
+
+def from_pixels(pixels, n):
+    """Adapt an old style per-pixel animation generator (one that yields a
+    single 24-bit color every time it's called) into an animation that
+    returns (N,) uint32 frames of n pixels.  The frame time and state are
+    ignored and the animation finishes (returns None) when the pixel
+    generator stops.
+    """
+    def _from_pixels(frame_time, state):
+        frame = np.zeros(n, dtype=np.uint32)
+        try:
+            for i in range(n):
+                frame[i] = next(pixels)
+        except StopIteration:
+            return None
+        return frame
+    return _from_pixels
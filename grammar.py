@@ -0,0 +1,360 @@
+# Jackson: Voice-controlled Jacket
+# JSGF grammar parser and compiler.  Parses the command grammar (commands.gram)
+# that Pocketsphinx recognizes into an AST, validates it, and compiles it into
+# an index of every command to its action so the command dispatcher is built
+# from the same rules instead of a hand maintained copy of them.  Compiled
+# indexes are cached on disk keyed by the grammar file's hash.
+# Supports the subset of JSGF used by Jackson: rules, alternatives, groups,
+# optional items, rule references and tags (like {hue=0}) which are used to
+# attach an action to the words of a command.
+# Author: Tony DiCola
+# License: MIT https://opensource.org/licenses/MIT
+import collections
+import itertools
+import random
+import re
+
+import cache
+
+
+# Grammar AST nodes.
+Word = collections.namedtuple('Word', ['text'])
+Ref = collections.namedtuple('Ref', ['name'])
+Sequence = collections.namedtuple('Sequence', ['items'])
+Alternatives = collections.namedtuple('Alternatives', ['items'])
+Optional = collections.namedtuple('Optional', ['item'])
+Tagged = collections.namedtuple('Tagged', ['item', 'tags'])
+
+
+class GrammarError(Exception):
+    """Error raised when a grammar can't be parsed or expanded."""
+    pass
+
+
+_TOKEN = re.compile(r'''
+    (?P<space>\s+)
+  | (?P<comment>/\*.*?\*/|//[^\n]*)
+  | (?P<ref><[^<>\s]+>)
+  | (?P<tag>\{[^{}]*\})
+  | (?P<weight>/[0-9.]+/)
+  | (?P<punct>[()\[\]|;=*+])
+  | (?P<word>[^\s()\[\]|;=*+<>{}/]+)
+''', re.VERBOSE | re.DOTALL)
+
+
+def _tokenize(text):
+    # Split grammar text into a list of (kind, value) tokens, skipping white
+    # space, comments and weights.
+    tokens = []
+    position = 0
+    while position < len(text):
+        match = _TOKEN.match(text, position)
+        if match is None:
+            line = text.count('\n', 0, position) + 1
+            raise GrammarError('Unexpected {0!r} on line {1}'.format(
+                text[position:position+10], line))
+        kind = match.lastgroup
+        if kind not in ('space', 'comment', 'weight'):
+            tokens.append((kind, match.group(kind)))
+        position = match.end()
+    return tokens
+
+
+def _parse_tag(text):
+    # Convert a {key=value} tag into a (key, value) tuple, with numeric values
+    # converted to numbers.  A tag without a value is (text, None).
+    key, _, value = text[1:-1].strip().partition('=')
+    key = key.strip()
+    if not _:
+        return (key, None)
+    value = value.strip()
+    for convert in (int, float):
+        try:
+            return (key, convert(value))
+        except ValueError:
+            pass
+    return (key, value)
+
+
+class _Parser:
+
+    def __init__(self, tokens):
+        self._tokens = tokens
+        self._position = 0
+
+    def peek(self):
+        if self._position < len(self._tokens):
+            return self._tokens[self._position]
+        return (None, None)
+
+    def take(self, kind=None, value=None):
+        token = self.peek()
+        if token[0] is None or (kind and token[0] != kind) or \
+           (value and token[1] != value):
+            raise GrammarError('Expected {0} but found {1!r}'.format(
+                value or kind, token[1]))
+        self._position += 1
+        return token[1]
+
+    def alternatives(self):
+        items = [self.sequence()]
+        while self.peek() == ('punct', '|'):
+            self.take()
+            items.append(self.sequence())
+        return items[0] if len(items) == 1 else Alternatives(tuple(items))
+
+    def sequence(self):
+        items = []
+        while self.peek()[0] in ('word', 'ref') or self.peek()[1] in ('(', '['):
+            items.append(self.item())
+        if not items:
+            raise GrammarError('Expected a word, rule or group but found {0!r}'.format(self.peek()[1]))
+        return items[0] if len(items) == 1 else Sequence(tuple(items))
+
+    def item(self):
+        kind, value = self.peek()
+        if kind == 'word':
+            node = Word(self.take())
+        elif kind == 'ref':
+            node = Ref(self.take()[1:-1])
+        elif value == '(':
+            self.take()
+            node = self.alternatives()
+            self.take('punct', ')')
+        else:
+            self.take('punct', '[')
+            node = Optional(self.alternatives())
+            self.take('punct', ']')
+        if self.peek()[1] in ('*', '+'):
+            raise GrammarError('Repeat operators (* and +) are not supported')
+        tags = []
+        while self.peek()[0] == 'tag':
+            tags.append(_parse_tag(self.take()))
+        return Tagged(node, tuple(tags)) if tags else node
+
+
+class Grammar:
+
+    def __init__(self, name, rules, public):
+        """Create a grammar with the specified name, dict of rule name to AST
+        and list of public rule names.  Use parse or load to create one.
+        """
+        self.name = name
+        self.rules = rules
+        self.public = public
+
+    def validate(self):
+        """Check every rule reference is defined, no rule is recursive and
+        every rule is used by a public rule.  Raises GrammarError describing
+        the first problem found.
+        """
+        used = set()
+        def visit(name, stack):
+            if name not in self.rules:
+                raise GrammarError('Reference to undefined rule <{0}> in <{1}>'.format(
+                    name, stack[-1]))
+            if name in stack:
+                raise GrammarError('Rule <{0}> is recursive'.format(name))
+            used.add(name)
+            for ref in _refs(self.rules[name]):
+                visit(ref, stack + (name,))
+        for name in self.public:
+            visit(name, ())
+        unused = sorted(set(self.rules) - used)
+        if unused:
+            raise GrammarError('Rule <{0}> is never used'.format(unused[0]))
+
+    def words(self):
+        """Return the set of every word used by the grammar."""
+        return set(word for node in self.rules.values() for word in _words(node))
+
+    def expand(self, rule, skip=()):
+        """Generate every utterance of the specified rule as a 2-tuple of the
+        tuple of words and a dict of tags attached to those words.  Rules
+        named in skip are treated as if they matched nothing (for example to
+        leave out filler words).
+        """
+        for words, tags in self._expand(Ref(rule), frozenset(skip), ()):
+            yield words, dict(tags)
+
+    def _expand(self, node, skip, stack):
+        # Generate (words, tags) tuples for the AST node.
+        if isinstance(node, Word):
+            yield (node.text,), ()
+        elif isinstance(node, Ref):
+            if node.name in skip:
+                yield (), ()
+                return
+            if node.name not in self.rules:
+                raise GrammarError('Reference to undefined rule <{0}>'.format(node.name))
+            if node.name in stack:
+                raise GrammarError('Rule <{0}> is recursive'.format(node.name))
+            yield from self._expand(self.rules[node.name], skip, stack + (node.name,))
+        elif isinstance(node, Sequence):
+            parts = [list(self._expand(item, skip, stack)) for item in node.items]
+            for combination in itertools.product(*parts):
+                yield (tuple(w for words, _ in combination for w in words),
+                       tuple(t for _, tags in combination for t in tags))
+        elif isinstance(node, Alternatives):
+            for item in node.items:
+                yield from self._expand(item, skip, stack)
+        elif isinstance(node, Optional):
+            yield (), ()
+            for words, tags in self._expand(node.item, skip, stack):
+                # Don't repeat the empty utterance (if the item was skipped).
+                if words or tags:
+                    yield words, tags
+        elif isinstance(node, Tagged):
+            for words, tags in self._expand(node.item, skip, stack):
+                yield words, tags + node.tags
+
+    def phrases(self, rule):
+        """Return a list of every utterance of the rule as a string."""
+        return [' '.join(words) for words, _ in self.expand(rule)]
+
+    def sample(self, rule, rng=random):
+        """Return a random utterance of the rule as a tuple of words."""
+        return tuple(self._sample(Ref(rule), rng))
+
+    def _sample(self, node, rng):
+        if isinstance(node, Word):
+            yield node.text
+        elif isinstance(node, Ref):
+            yield from self._sample(self.rules[node.name], rng)
+        elif isinstance(node, Sequence):
+            for item in node.items:
+                yield from self._sample(item, rng)
+        elif isinstance(node, Alternatives):
+            yield from self._sample(rng.choice(node.items), rng)
+        elif isinstance(node, Optional):
+            if rng.random() < 0.5:
+                yield from self._sample(node.item, rng)
+        elif isinstance(node, Tagged):
+            yield from self._sample(node.item, rng)
+
+
+def _refs(node):
+    # Generate the names of rules referenced by an AST node.
+    if isinstance(node, Ref):
+        yield node.name
+    elif isinstance(node, (Sequence, Alternatives)):
+        for item in node.items:
+            yield from _refs(item)
+    elif isinstance(node, (Optional, Tagged)):
+        yield from _refs(node.item)
+
+
+def _words(node):
+    # Generate the words of an AST node.
+    if isinstance(node, Word):
+        yield node.text
+    elif isinstance(node, (Sequence, Alternatives)):
+        for item in node.items:
+            yield from _words(item)
+    elif isinstance(node, (Optional, Tagged)):
+        yield from _words(node.item)
+
+
+class Index:
+
+    def __init__(self, actions, junk):
+        """Create an index from a dict of command (a string of words without
+        junk) to its action, a 2-tuple of tag key and value, and the list of
+        junk phrases left out of the commands.  Use build_index or load_index
+        to create one.
+        """
+        self.actions = actions
+        self.junk = junk
+        # Commands that are the start of a longer command.
+        self.prefixes = set()
+        for command in actions:
+            words = command.split()
+            for i in range(1, len(words)):
+                self.prefixes.add(' '.join(words[:i]))
+
+    def __len__(self):
+        return len(self.actions)
+
+    def get(self, command):
+        """Return the action of a command (without junk words), or None/null
+        if it isn't in the grammar.
+        """
+        return self.actions.get(command)
+
+    def is_complete(self, command):
+        """Return True if a command (without junk words) is in the grammar
+        and nothing more could be said to make it a different command.
+        """
+        return command in self.actions and command not in self.prefixes
+
+
+def build_index(grammar, rule, keys, junk_rule=None):
+    """Validate a grammar and compile every command of the specified rule
+    into an Index.  Each command must have a tag for exactly one of keys (like
+    {hue=0}), which is its action.  Words of the junk_rule are left out of the
+    commands.  Raises GrammarError if the grammar is invalid, a command has no
+    action or the same command has different actions.
+    """
+    grammar.validate()
+    skip = () if junk_rule is None else (junk_rule,)
+    junk = [] if junk_rule is None else grammar.phrases(junk_rule)
+    junk_words = set(word for phrase in junk for word in phrase.split())
+    actions = {}
+    for words, tags in grammar.expand(rule, skip):
+        command = ' '.join(words)
+        found = [key for key in keys if key in tags]
+        if len(found) != 1:
+            raise GrammarError('Command {0!r} needs exactly one tag of: {1}'.format(
+                command, ', '.join(sorted(keys))))
+        action = (found[0], tags[found[0]])
+        if actions.get(command, action) != action:
+            raise GrammarError('Command {0!r} is ambiguous, it is both {1} and {2}'.format(
+                command, actions[command], action))
+        if junk_words.intersection(words):
+            # Junk is removed before lookup so this command could never match.
+            raise GrammarError('Command {0!r} contains junk words'.format(command))
+        actions[command] = action
+    return Index(actions, junk)
+
+
+def load_index(path, rule, keys, junk_rule=None, cache_dir=None):
+    """Load a JSGF grammar file and build an Index of the specified rule (see
+    build_index).  If cache_dir is specified the index is cached there, keyed
+    by a hash of the grammar file and arguments, so it's only rebuilt when the
+    grammar changes.
+    """
+    key = cache.digest('index-2', 'file:' + path, rule, repr(sorted(keys)),
+                       repr(junk_rule))
+    return cache.load(cache_dir, 'grammar-index', key,
+                      lambda: build_index(load(path), rule, keys, junk_rule))
+
+
+def parse(text):
+    """Parse JSGF grammar text and return a Grammar."""
+    # Drop the #JSGF header line, it's the only line that isn't a statement.
+    text = re.sub(r'^\s*#JSGF[^;]*;', '', text)
+    parser = _Parser(_tokenize(text))
+    parser.take('word', 'grammar')
+    name = parser.take('word')
+    parser.take('punct', ';')
+    rules = {}
+    public = []
+    while parser.peek()[0] is not None:
+        is_public = parser.peek() == ('word', 'public')
+        if is_public:
+            parser.take()
+        rule = parser.take('ref')[1:-1]
+        if rule in rules:
+            raise GrammarError('Rule <{0}> is defined more than once'.format(rule))
+        parser.take('punct', '=')
+        rules[rule] = parser.alternatives()
+        parser.take('punct', ';')
+        if is_public:
+            public.append(rule)
+    return Grammar(name, rules, public)
+
+
+def load(path):
+    """Load and parse a JSGF grammar file."""
+    with open(path, encoding='utf8') as infile:
+        return parse(infile.read())
@@ -0,0 +1,267 @@
+# Jackson: Voice-controlled Jacket
+# Headless rendering of Jackson's animations, without the LEDs, microphone or
+# speech recognition.  Jackson runs with stand-ins for the hardware and a
+# virtual clock, so any animation can be rendered faster than real time to a
+# NumPy array of frames (or a .npy file) to look at, compare or benchmark.
+# The spectrum animation is fed generated noise (or any audio source).
+# Usage: python3 headless.py animation seconds [--leds N] [--output frames.npy]
+# Author: Tony DiCola
+# License: MIT https://opensource.org/licenses/MIT
+import argparse
+import random
+import time
+
+import numpy as np
+
+import audio
+import clock
+import config
+import frames
+import jackson
+import segments
+import state
+
+
+# Functions that create each animation of a Jackson instance.
+ANIMATIONS = {
+    'idle':         lambda j: j._idle_animation(),
+    'sparkle':      lambda j: j._sparkle_animation(),
+    'knight_rider': lambda j: j._knight_rider_animation(),
+    'spectrum':     lambda j: j._spectrum_animation(),
+    'pulse':        lambda j: j._listen_animation,
+    'wink':         lambda j: j._wink_animation()
+}
+
+# Animations that show the audio from the microphone.
+AUDIO_ANIMATIONS = {'spectrum'}
+
+
+class NullLights:
+    """Lights stand-in (see lights.Lights) that shows frames nowhere and
+    counts them.
+    """
+
+    def __init__(self, n):
+        self.n = n
+        self.shown = 0
+
+    def __len__(self):
+        return self.n
+
+    def fill(self, color):
+        pass
+
+    def set_pixel(self, i, color):
+        pass
+
+    def show(self):
+        self.shown += 1
+
+    def write_frame(self, buffer):
+        """Check and count a frame like lights.Lights.write_frame (every
+        frame counts as shown).
+        """
+        self._check(buffer)
+        self.shown += 1
+        return True
+
+    def _check(self, buffer):
+        if isinstance(buffer, np.ndarray):
+            frame = frames.pack(buffer)
+        else:
+            frame = np.frombuffer(buffer, dtype=np.uint32)
+        if len(frame) != len(self):
+            raise ValueError('Expected a frame of {0} pixels, got {1}'.format(len(self), len(frame)))
+        return frame
+
+
+class RecordingLights(NullLights):
+    """Lights stand-in that keeps a copy of every frame written."""
+
+    def __init__(self, n):
+        super().__init__(n)
+        self._frames = []
+
+    def write_frame(self, buffer):
+        self._frames.append(self._check(buffer).copy())
+        self.shown += 1
+        return True
+
+    @property
+    def frames(self):
+        """(frames, N) uint32 array of the frames written, oldest first."""
+        if not self._frames:
+            return np.zeros((0, self.n), dtype=np.uint32)
+        return np.stack(self._frames)
+
+    def clear(self):
+        """Forget the frames written."""
+        self._frames = []
+
+
+class NullMicrophone:
+    """Microphone stand-in (see microphone.Microphone) that never hears
+    anything.
+    """
+
+    def __init__(self, sample_rate=config.SAMPLE_RATE_HZ, period_size=config.MIC_PERIOD_SIZE):
+        self.sample_rate = sample_rate
+        self.period_size = period_size
+
+    def read(self, timeout=None):
+        return None
+
+
+class NullSpeech:
+    """Speech recognizer stand-in (see speech.SpeechRecognizer) that never
+    recognizes anything.
+    """
+
+    def __init__(self):
+        self.startup_times = {}
+
+    def listen_keyword(self, trace=None):
+        return None, None
+
+    def listen_command(self, trace=None, endpointer=None):
+        return None, None
+
+    def keyword_stats(self):
+        return {}
+
+
+class VirtualClock:
+    """Frame clock that advances a fixed frame period every tick instead of
+    following the wall clock.  It can also stand in for the clock and sleep
+    functions of a scheduler.FrameScheduler.
+    """
+
+    def __init__(self, rate_hz, t=0.0):
+        self.dt = 1.0 / rate_hz
+        self.t = t
+
+    def __call__(self):
+        return self.t
+
+    def sleep(self, seconds):
+        self.t += seconds
+
+    def tick(self):
+        """Advance one frame and return its clock.FrameTime."""
+        self.t += self.dt
+        return clock.FrameTime(self.t, self.dt)
+
+
+class Renderer:
+
+    def __init__(self, n=None, rate_hz=config.FRAME_RATE_HZ,
+                 state=None, source=None, seed=None, record=True):
+        """Create a headless Jackson with n lights (by default as many as
+        the configured LED segments have) that renders frames at
+        rate_hz frames per second of virtual time and records them (unless
+        record is False, to benchmark rendering).  The initial state.State
+        can be specified.  Audio animations are fed from an audio source (by
+        default white noise).  If a seed is specified random animations (like
+        sparkle and wink) are the same every time.
+        """
+        if seed is not None:
+            random.seed(seed)
+            np.random.seed(seed)
+        if n is None:
+            n = segments.total(segments.from_config())
+        self.lights = RecordingLights(n) if record else NullLights(n)
+        self.jackson = jackson.Jackson(self.lights, NullMicrophone(), NullSpeech())
+        if state is not None:
+            self.jackson._state.update(**state._asdict())
+        self.clock = VirtualClock(rate_hz)
+        analyzer = self.jackson._spectrum_analyzer
+        self._analyzer = analyzer
+        self._source = source if source is not None else \
+            audio.NoiseSource(sample_rate=analyzer.sample_rate,
+                              period_size=analyzer.block_size, realtime=False,
+                              seed=seed)
+        self._samples_due = 0.0
+        self._feed = False
+
+    def play(self, name):
+        """Replace the animation layers with the named animation (see
+        ANIMATIONS).
+        """
+        self.jackson._compositor.clear()
+        self.jackson._compositor.push(ANIMATIONS[name](self.jackson), kind=name)
+        self._feed = name in AUDIO_ANIMATIONS
+
+    def step(self):
+        """Render and show one frame, returning it (or None/null if there was
+        nothing to show).
+        """
+        ft = self.clock.tick()
+        if self._feed:
+            self._analyze(ft.dt)
+        frame = self.jackson._render_frame(ft)
+        if frame is not None:
+            self.jackson._show_frame(frame)
+        return frame
+
+    def _analyze(self, dt):
+        # Analyze the audio that would have been heard during the frame.
+        self._samples_due += dt * self._analyzer.sample_rate
+        while self._samples_due >= self._analyzer.block_size:
+            buf = self._source.read()
+            if buf is None:
+                break
+            self._analyzer.process(np.frombuffer(buf, dtype=np.int16))
+            self._samples_due -= self._analyzer.block_size
+
+    def render(self, seconds, path=None):
+        """Render seconds of virtual time and return the (frames, N) uint32
+        array of frames shown, also saved to a .npy file if a path is
+        specified.
+        """
+        self.lights.clear()
+        for i in range(int(round(seconds / self.clock.dt))):
+            self.step()
+        result = self.lights.frames
+        if path is not None:
+            np.save(path, result)
+        return result
+
+
+def render(name, seconds, n=None, rate_hz=config.FRAME_RATE_HZ,
+           state=None, seed=None, path=None):
+    """Render seconds of the named animation (see ANIMATIONS) on n lights
+    and return the (frames, N) uint32 array of frames, also saved to a .npy
+    file if a path is specified.
+    """
+    renderer = Renderer(n, rate_hz, state=state, seed=seed)
+    renderer.play(name)
+    return renderer.render(seconds, path)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Render an animation without the hardware.')
+    parser.add_argument('animation', choices=sorted(ANIMATIONS))
+    parser.add_argument('seconds', type=float, help='seconds of animation')
+    parser.add_argument('--leds', type=int, help='number of lights (default all segments)')
+    parser.add_argument('--rate', type=float, default=config.FRAME_RATE_HZ,
+                        help='frames per second')
+    parser.add_argument('--happiness', type=int, default=0, help='happiness (-3 to 3)')
+    parser.add_argument('--brightness', type=int, default=2, help='brightness (0 to 3)')
+    parser.add_argument('--hue', type=float, default=0.0, help='hue in degrees')
+    parser.add_argument('--seed', type=int, help='random seed')
+    parser.add_argument('--output', help='.npy file of the frames')
+    args = parser.parse_args(args)
+    renderer = Renderer(args.leds, args.rate, seed=args.seed,
+                        state=state.State(happiness=args.happiness,
+                                          brightness=args.brightness, hue=args.hue))
+    renderer.play(args.animation)
+    start = time.perf_counter()
+    result = renderer.render(args.seconds, args.output)
+    elapsed = time.perf_counter() - start
+    print('{0}: {1} frames of {2} lights in {3:.3f}s, {4:.0f} frames/s'.format(
+        args.animation, len(result), len(renderer.lights), elapsed,
+        len(result) / elapsed if elapsed > 0 else 0.0))
+
+
+if __name__ == '__main__':
+    main()
@@ -2,43 +2,110 @@
 # Main logic.
 # Author: Tony DiCola
 # License: MIT https://opensource.org/licenses/MIT
-import collections
 import logging
 import math
-import numbers
 import random
-import time
+import signal
 import threading
+import time
 
 import numpy as np
 
+import baking
 import color
 import commands
+import compositor
+import confidence
 import config
-import lights
-import microphone
-import speech
+import frames
+import grammar
+import scheduler
+import spectrum
+import speechworker
+import state
+import tracing
 import utils
+import vad
 
 
 logger = logging.getLogger(__name__)
 
+# Tags of commands in the grammar (commands.gram) for the actions they perform.
+COMMAND_ACTIONS = ['animation', 'hue', 'brightness', 'brightness_step']
+
 
 class Jackson:
 
-    def __init__(self):
-        self._microphone = microphone.Microphone()
-        self._speech = speech.SpeechRecognizer(self._microphone)
-        self._lights = lights.Lights()
+    def __init__(self, lights=None, microphone=None, speech=None):
+        """Create Jackson with the specified lights, microphone and speech
+        recognizer, or by default the hardware ones configured in config.py.
+        Stand-ins (like the ones in headless.py) run Jackson without the LED,
+        audio and speech recognition libraries.
+        """
+        self._start_time = time.monotonic()
+        # Compile the commands of Jackson's grammar (commands.gram) first so a
+        # mistake in the grammar stops startup before anything else is set up.
+        # Every command in the grammar is tagged with the action it performs.
+        self._command_index = grammar.load_index(config.GRAMMAR_MODEL, 'command',
+            COMMAND_ACTIONS, junk_rule='junk', cache_dir=config.CACHE_DIR)
+        # The hardware modules are imported only when they're used so Jackson
+        # can be imported without their libraries.
+        if microphone is None:
+            from microphone import Microphone
+            microphone = Microphone()
+        self._microphone = microphone
+        if speech is None and config.SPEECH_PROCESS:
+            speech = speechworker.SpeechProcess(self._microphone, COMMAND_ACTIONS)
+        elif speech is None:
+            from speech import SpeechRecognizer
+            speech = SpeechRecognizer(self._microphone,
+                is_complete=self._is_complete_command,
+                vad=vad.from_config(self._microphone.sample_rate))
+        self._speech = speech
+        if lights is None:
+            from lights import Lights
+            lights = Lights()
+        self._lights = lights
+        self._spectrum_analyzer = spectrum.SpectrumAnalyzer(len(self._lights),
+            self._microphone.sample_rate,
+            block_size=self._microphone.period_size,
+            min_hz=config.SPECTRUM_MIN_HZ,
+            max_hz=config.SPECTRUM_MAX_HZ,
+            smoothing=config.SPECTRUM_SMOOTHING,
+            range_db=config.SPECTRUM_RANGE_DB,
+            peak_decay_db_s=config.SPECTRUM_DECAY_DB_S)
         self._keywords = commands.Dispatcher()
-        self._commands = commands.Dispatcher(junk=config.GRAMMAR_JUNK)
-        self._happiness = 0  # Value that goes from -3 to 3
-        self._brightness = 2 # Value that goes from 0 to 3
-        self._hue = 0.0
-        self._animations = collections.deque()
-        self._push_animation(self._idle_animation())
+        self._commands = commands.Dispatcher(junk=self._command_index.junk)
+        self._state = state.StateStore(state.State(happiness=0, brightness=2,
+                                                   hue=0.0))
+        # Precomputed hue/value color table used by animations (everything is
+        # rendered at full saturation).
+        self._colors = color.hsv_table(config.COLOR_TABLE_HUES,
+                                       config.COLOR_TABLE_VALUES)
+        # Tables of periodic animations baked for the current state.
+        self._bake_cache = baking.TableCache(config.BAKE_CACHE_BYTES) \
+            if config.BAKE_ANIMATIONS else None
+        # Animations are layers of a compositor, idle at the bottom.
+        self._compositor = compositor.Compositor(len(self._lights),
+                                                 config.ANIMATION_MAX_LAYERS)
+        self._push_animation(self._idle_animation(), 'idle')
         self._listen_animation = self._create_pulse_animation(80.0, 2.0)
-        self._state_lock = threading.RLock()
+        self._frame_scheduler = scheduler.FrameScheduler(config.FRAME_RATE_HZ,
+            log_interval_s=config.FRAME_STATS_LOG_S)
+        # Latency traces of voice commands.  The trace of the keyword being
+        # handled is finished by the animation thread when it shows the next
+        # frame.
+        self._tracer = tracing.Tracer(config.TRACE_CAPACITY,
+                                      enabled=config.TRACE_ENABLED)
+        self._trace = tracing.NULL_TRACE
+        self._pending_trace = None
+        # Keywords and commands below their minimum confidence are ignored.
+        self._keyword_gate = confidence.Gate(
+            confidence.Thresholds(config.KEYWORD_MIN_CONFIDENCE, config.KEYWORD_CONFIDENCE),
+            confidence.ScoreStats(config.CONFIDENCE_STATS_WINDOW))
+        self._command_gate = confidence.Gate(
+            confidence.Thresholds(config.COMMAND_MIN_CONFIDENCE, config.COMMAND_CONFIDENCE),
+            confidence.ScoreStats(config.CONFIDENCE_STATS_WINDOW))
         # Configure the keywords and their associated callbacks.
         for w in config.WAKE_WORDS:
             self._keywords.register(w, self._wake)
@@ -46,343 +113,353 @@ class Jackson:
             self._keywords.register(w, self._increment_happiness, 1)
         for w in config.SAD_WORDS:
             self._keywords.register(w, self._increment_happiness, -1)
-        # Configure the command parsing based on Jackson's grammar (from
-        # commands.gram).  Right now this is all manual configuration and
-        # care must be taken to ensure the logic below and commands.gram
-        # are kept up to date.
-        self._commands.register('wink', self._wink)
-        self._commands.register('spectrum', self._spectrum)
-        self._commands.register('sparkle', self._sparkle)
-        self._commands.register('knight rider', self._knight_rider)
-        self._commands.register('brighter', self._increment_brightness, 1)
-        self._commands.register('dimmer', self._increment_brightness, -1)
-        self._commands.register_starts_with('show me', self._change_animation)
-        self._commands.register_starts_with('light up', self._change_color)
-        self._commands.register_starts_with('change', self._change)
-        self._commands.register_starts_with('set', self._change)
-        self._commands.register_starts_with('update', self._change)
-        self._commands.register_starts_with('modify', self._change)
-        self._commands.register_starts_with('make', self._change)
+        # Configure the command parsing from the grammar's actions.
+        self._commands.register_index(self._command_index, {
+            'animation':       self._change_animation,
+            'hue':             self._change_color,
+            'brightness':      self._change_brightness,
+            'brightness_step': self._increment_brightness
+        })
 
     # Animation control helpers:
-    def _push_animation(self, animation, duration=None):
-        # Push an animation (generator that returns pixel values) onto the
-        # animation stack, assigning it an optional duration to run.
-        if duration is None:
-            self._animations.appendleft(animation)
-        else:
-            self._animations.appendleft(self._animate_duration(duration, animation))
-
-    def _pop_animation(self):
-        # Pop the current animation off the animation stack and return it.
-        try:
-            return self._animations.popleft()
-        except IndexError:
-            return None
-
-    # Properties that define Jackon's state:
+    def _push_animation(self, animation, kind, hold_s=math.inf, fade_out_s=0.0,
+                        delay_s=0.0, blend=compositor.NORMAL):
+        # Push an animation (function of frame time that returns frames of
+        # pixel values) as the top layer of the compositor, shown for hold_s
+        # seconds (forever by default) after an optional delay and then faded
+        # out over fade_out_s seconds to the layers below.  It replaces any
+        # layer of the same kind.  Returns the layer.
+        layer = self._compositor.push(animation, blend, compositor.Envelope(
+            delay_s=delay_s, hold_s=hold_s, fade_out_s=fade_out_s), kind)
+        logger.debug('Animation layers: {0}'.format(self._compositor.report()))
+        return layer
+
+    # Properties that define Jackon's state.  The state is kept as an
+    # immutable snapshot (see state.py) so the render loop can read all of it
+    # at once without locking.
     @property
     def happiness(self):
         """Jackson's happiness, a value clamped to the range -3 to 3
         (inclusive).  The higher the happiness the faster animations run.
         """
-        with self._state_lock:
-            return self._happiness
+        return self._state.snapshot.happiness
 
     @happiness.setter
     def happiness(self, val):
-        with self._state_lock:
-            if val is None:
-                self._happiness = 0
-            else:
-                self._happiness = utils.clamp(int(val), -3, 3)
-            logger.debug('Happiness: {0}'.format(self._happiness))
+        if val is None:
+            val = 0
+        current = self._state.update(happiness=utils.clamp(int(val), -3, 3))
+        logger.debug('Happiness: {0}'.format(current.happiness))
 
     @property
     def happiness_freq(self):
         """Express happiness as a frequency value for animations."""
-        return utils.lerp(self.happiness, -3.0, 3.0, 1.0/4.0, 2.0)
+        return self._state.snapshot.happiness_freq
 
     @property
     def brightness(self):
         """Jackson's LED brightness, a value clamped to the range 0 to 3 with
         0 being off and 3 being full bright.  The default/starting value is 2.
         """
-        with self._state_lock:
-            return self._brightness
+        return self._state.snapshot.brightness
 
     @brightness.setter
     def brightness(self, val):
-        with self._state_lock:
-            if val is None:
-                self._brightness = 0
-            elif isinstance(val, numbers.Number):
-                self._brightness = utils.clamp(int(val), 0, 3)
-            else:
-                self._brightness = config.BRIGHTNESS_VALUES.get(val, self._brightness)
-            logger.debug('Brightness: {0}'.format(self._brightness))
+        if val is None:
+            val = 0
+        current = self._state.update(brightness=utils.clamp(int(val), 0, 3))
+        logger.debug('Brightness: {0}'.format(current.brightness))
 
     @property
     def brightness_hsv(self):
         """Express brightness as a HSV value (0 to 1.0)."""
-        return utils.lerp(self.brightness, 0.0, 3.0, 0.0, 1.0)
+        return self._state.snapshot.brightness_hsv
 
     @property
     def hue(self):
         """Jackson's current hue for animations.  This will change over time
         depending on Jackson's happiness.
         """
-        with self._state_lock:
-            return self._hue
+        return self._state.snapshot.hue
 
     @hue.setter
     def hue(self, val):
-        with self._state_lock:
-            if val is None:
-                self._hue = 0
-            elif isinstance(val, numbers.Number):
-                self._hue = math.fmod(val, 360.0)
-            else:
-                self._hue = config.COLOR_HUES.get(val, self._hue)
+        if val is None:
+            val = 0
+        self._state.update(hue=math.fmod(val, 360.0))
+
+    def _is_complete_command(self, command):
+        # True if a (partial) command hypothesis is a whole command.
+        return self._command_index.is_complete(' '.join(self._commands.clean(command)))
 
     # Keyword callbacks:
     def _wake(self, command):
-        # Green/yellow pulse while listening.
-        self._push_animation(self._listen_animation)
-        command, score = self._speech.listen_command()
-        self._pop_animation()
-        self._push_animation(self._animate_between(0.0, 1.0,
-                             self._listen_animation,
-                             self._idle_animation()))
-        logger.debug('Detected keyword: {0} [score: {1}]'.format(command, score))
-        # TODO: Add score threshold?
-        self._commands.dispatch(command)
+        # Green/yellow pulse while listening, faded out afterwards.  It's held
+        # no longer than listening can take, so (unlike a layer that's held
+        # forever) the layers below it are kept.
+        listening = self._push_animation(self._listen_animation, 'listen',
+                                         hold_s=config.COMMAND_MAX_S + 1.0)
+        command, score = self._speech.listen_command(self._trace)
+        listening.fade_out(1.0)
+        logger.debug('Detected command: {0} [confidence: {1}]'.format(command, score))
+        self._trace.set(command=command, command_confidence=score)
+        if command is None:
+            return
+        # Ignore commands that were probably noise.  Thresholds can be set for
+        # the command or its action (like 'hue').
+        cleaned = ' '.join(self._commands.clean(command))
+        action = self._command_index.get(cleaned)
+        if not self._command_gate.accept(score, cleaned, action and action[0]):
+            logger.debug('Rejected command: {0} [confidence: {1}]'.format(command, score))
+            self._trace.set(rejected=True)
+            return
+        with self._trace.span('dispatch'):
+            self._commands.dispatch(command)
 
     def _increment_happiness(self, command, val):
         self.happiness += val
-        if val > 0:
-            current = self._animations[0]
-            self._push_animation(self._animate_between(0.5, 1.5,
-                self._create_pulse_animation(350.0, 1.0),
-                current))
-        else:
-            current = self._animations[0]
-            self._push_animation(self._animate_between(0.5, 1.5,
-                self._create_pulse_animation(240.0, 1.0),
-                current))
+        # Flash a pink (happy) or blue (sad) pulse over the current animation.
+        hue = 350.0 if val > 0 else 240.0
+        self._push_animation(self._create_pulse_animation(hue, 1.0), 'mood',
+                             hold_s=0.5, fade_out_s=1.5)
 
     # Command callbacks:
     def _wink(self, command):
         logger.debug('Wink animation')
-        # TODO: This is ugly that the animations use a global clock and listen
-        # needs to have a longer duration as its clock ticks during wink.
-        self._push_animation(self._listen_animation, duration=1.25)
-        self._push_animation(self._wink_animation(), duration=0.75)
+        # Listen resumes for a moment once the wink is done.
+        self._push_animation(self._listen_animation, 'listen', hold_s=0.5,
+                             delay_s=0.75)
+        self._push_animation(self._wink_animation(), 'wink', hold_s=0.75)
 
     def _spectrum(self, command):
         logger.debug('Spectrum animation')
-        self._push_animation(self._animate_between(config.ANIMATION_DURATION,
-            1.0,
-            self._spectrum_animation(),
-            self._idle_animation()))
+        self._push_animation(self._spectrum_animation(), 'spectrum',
+                             hold_s=config.ANIMATION_DURATION, fade_out_s=1.0)
 
     def _sparkle(self, command):
         logger.debug('Sparkle animation')
-        self._push_animation(self._animate_between(config.ANIMATION_DURATION,
-            1.0,
-            self._sparkle_animation(),
-            self._idle_animation()))
+        self._push_animation(self._sparkle_animation(), 'sparkle',
+                             hold_s=config.ANIMATION_DURATION, fade_out_s=1.0)
 
     def _knight_rider(self, command):
         logger.debug('Knight Rider animation')
-        self._push_animation(self._animate_between(config.ANIMATION_DURATION, 1.0,
-            self._knight_rider_animation(), self._idle_animation()))
+        self._push_animation(self._knight_rider_animation(), 'knight_rider',
+                             hold_s=config.ANIMATION_DURATION, fade_out_s=1.0)
 
     def _increment_brightness(self, command, val):
         self.brightness += val
 
-    def _change(self, command):
-        logger.debug('Change command: {0}'.format(command))
-        if len(command) < 2:
-            return
-        state = command[1]
-        if state == 'color':
-            self._change_color(command)
-        elif state == 'brightness':
-            self.brightness = command[2]
+    def _change_brightness(self, command, val):
+        logger.debug('Change brightness')
+        self.brightness = val
 
-    def _change_color(self, command):
+    def _change_color(self, command, hue):
         logger.debug('Change color')
-        if len(command) < 3:
-            return
-        self.hue = command[2]
+        self.hue = hue
         # Snap straight to animating at this new hue and stop any fade out.
-        self._push_animation(self._idle_animation())
+        self._push_animation(self._idle_animation(), 'idle')
 
-    def _change_animation(self, command):
+    def _change_animation(self, command, name):
         logger.debug('Change animation')
-        if len(command) < 3:
-            return
-        self._commands.dispatch(' '.join(command[2:]))
-
-    # Basic animation functions.  These are generator functions that yield a
-    # pixel color every time they are called.
+        animations = {
+            'wink':         self._wink,
+            'sparkle':      self._sparkle,
+            'knight_rider': self._knight_rider,
+            'spectrum':     self._spectrum
+        }
+        animations[name](command)
+
+    # Basic animation functions.  These create animations, functions that
+    # take a clock.FrameTime and state.State snapshot and return a whole frame
+    # of pixel colors (see frames.py), or None once the animation is finished.
+    # Old style generators that yield one pixel color per call can be adapted
+    # with frames.from_pixels.  Periodic animations (see _periodic) are made
+    # from value functions instead, which take the time in seconds and a
+    # state.State snapshot and return the pixel values (0 to 1.0) of one hue.
     def _idle_animation(self):
         n = len(self._lights)
-        while True:
-            t = time.time()
-            max_val = self.brightness_hsv
+        phases = np.linspace(0.0, 2.0*math.pi, n)
+        def _idle_values(t, state):
+            max_val = state.brightness_hsv
             min_val = 0.5 * max_val
-            for i in range(n):
-                phase = i/(n-1)*2.0*math.pi
-                x = math.sin(2.0*math.pi*self.happiness_freq*t + phase)
-                value = utils.lerp(x, -1.0, 1.0, max_val, min_val)
-                yield color.hsv_to_rgb(self.hue, 1.0, value)
+            x = np.sin(2.0*math.pi*state.happiness_freq*t + phases)
+            return utils.lerp(x, -1.0, 1.0, max_val, min_val)
+        return self._periodic('idle', _idle_values, lambda state: state.hue,
+                              lambda state: 1.0/state.happiness_freq,
+                              lambda state: (state.happiness, state.brightness))
 
     def _sparkle_animation(self):
         n = len(self._lights)
-        phases = [random.uniform(0, 2.0*math.pi) for _ in range(n)]
+        phases = np.random.uniform(0, 2.0*math.pi, n)
         f = self.happiness_freq
-        frequencies = [random.uniform(f/2.0, 2.0*f) for _ in range(n)]
-        while True:
-            t = time.time()
-            for i in range(n):
-                x = math.sin(2.0*math.pi*frequencies[i]*t + phases[i])
-                hue = utils.lerp(x, -1.0, 1.0, 0.0, 360.0)
-                x = math.sin(2.0*math.pi*frequencies[-(i+1)]*t + phases[-(i+1)])
-                value = utils.lerp(x, -1.0, 1.0, 0, self.brightness_hsv)
-                yield color.hsv_to_rgb(hue, 1.0, value)
+        frequencies = np.random.uniform(f/2.0, 2.0*f, n)
+        def _sparkle(ft, state):
+            x = np.sin(2.0*math.pi*frequencies*ft.t + phases)
+            hues = utils.lerp(x, -1.0, 1.0, 0.0, 360.0)
+            x = np.sin(2.0*math.pi*frequencies[::-1]*ft.t + phases[::-1])
+            values = utils.lerp(x, -1.0, 1.0, 0, state.brightness_hsv)
+            return self._colors.lookup(hues, values)
+        return _sparkle
 
     def _knight_rider_animation(self):
         n = len(self._lights)
-        while True:
-            t = time.time()
-            f = self.happiness_freq
+        def _knight_rider_values(t, state):
+            f = state.happiness_freq
             x0 = math.sin(2.0*math.pi*f*t)
             x1 = math.sin(2.0*math.pi*f*t - math.pi*(1/n))
             i0 = int(utils.lerp(x0, -1.0, 1.0, 0, n))
             i1 = int(utils.lerp(x1, -1.0, 1.0, 0, n))
-            for i in range(n):
-                if i == i0:
-                    yield color.hsv_to_rgb(self.hue, 1.0, self.brightness_hsv)
-                elif i == i1:
-                    yield color.hsv_to_rgb(self.hue, 1.0, self.brightness_hsv/2)
-                else:
-                    yield 0
+            brightness = state.brightness_hsv
+            values = np.zeros(n)
+            if 0 <= i1 < n:
+                values[i1] = brightness/2
+            if 0 <= i0 < n:
+                values[i0] = brightness
+            return values
+        return self._periodic('knight_rider', _knight_rider_values, lambda state: state.hue,
+                              lambda state: 1.0/state.happiness_freq,
+                              lambda state: (state.happiness, state.brightness))
 
     def _spectrum_animation(self):
         n = len(self._lights)
-        while True:
-            # Run a FFT on the incoming audio to break it into frequency
-            # buckets. Interpolate those as the intensity of hues across the
-            # pixels.
-            audio = self._microphone.last_read
-            if audio is None or len(audio) < 4*n:
-                continue
-            audio = np.frombuffer(audio[:4*n], dtype='int16')
-            freqs = 10*np.log10(np.abs(np.fft.rfft(audio)))
-            if len(freqs) < (n+1):
-                continue
-            max_power = 30.0  #TODO: Auto tune this value?
-            max_value = self.brightness_hsv
-            for i in range(n):
-                hue = utils.lerp(i, 0, n, 0.0, 360.0)
-                value = utils.lerp(freqs[i+1], 0, max_power, 0, max_value)
-                value = utils.clamp(value, 0, max_value)
-                yield color.hsv_to_rgb(hue, 1.0, value)
+        hues = utils.lerp(np.arange(n), 0, n, 0.0, 360.0)
+        def _spectrum(ft, state):
+            # Show the intensity of each frequency band of the incoming audio
+            # (from low to high) as the brightness of hues across the pixels.
+            values = self._spectrum_analyzer.bands * state.brightness_hsv
+            return self._colors.lookup(hues, values)
+        return _spectrum
 
     def _wink_animation(self):
         left_on = random.random() >= 0.5
         n = len(self._lights)
         half = n // 2
-        while True:
-            t = time.time()
-            for i in range(n):
-                color = next(self._listen_animation)
-                if left_on and i < half:
-                    yield color
-                elif not left_on and i >= half:
-                    yield color
-                else:
-                    yield 0
-
-    # Animation creators.  These functions create animation generators that
-    # are customized with special behavior or functionality.
-    def _animate_duration(self, duration_s, animation):
-        end = time.time() + duration_s
-        def _animate_duration_inner():
-            while time.time() < end:
-                yield next(animation)
-            raise StopIteration
-        return _animate_duration_inner()
-
-    def _animate_between(self, first_duration, fade_duration, first, second):
-        start = time.time()
-        fade_start = start + first_duration
-        end = fade_start + fade_duration
-        n = len(self._lights)
-        def _animate_between_inner():
-            t = time.time()
-            while t < fade_start:
-                for i in range(n):
-                    yield next(first)
-                t = time.time()
-            while t < end:
-                for i in range(n):
-                    yield color.lerp(t, fade_start, end, next(first), next(second))
-                t = time.time()
-            raise StopIteration
-        return _animate_between_inner()
+        mask = np.arange(n) < half
+        if not left_on:
+            mask = ~mask
+        def _wink(ft, state):
+            return np.where(mask, frames.pack(self._listen_animation(ft, state)), 0)
+        return _wink
+
+    # Animation creators.  These functions create animations that are
+    # customized with special behavior or functionality.
+    def _periodic(self, name, values, hue, period, key):
+        # Create an animation that colors the pixel values (0 to 1.0) returned
+        # by values (a function of time and state) with one hue, and repeats
+        # every period seconds.  Unless baking is turned off one period of it
+        # is precomputed into a table for the parts of the state it depends on
+        # (see baking.py).
+        if self._bake_cache is None:
+            return baking.live(values, hue, self._colors)
+        return baking.Baked(name, values, hue, period, key, self._colors,
+                            config.FRAME_RATE_HZ, self._bake_cache)
 
     def _create_pulse_animation(self, hue, freq_hz):
-        def _pulse_animation():
-            while True:
-                n = len(self._lights)
-                t = time.time()
-                x = math.sin(2.0*math.pi*freq_hz*t)
-                max_val = self.brightness_hsv
-                min_val = 0.75 * max_val
-                value = utils.lerp(x, -1.0, 1.0, max_val, min_val)
-                for i in range(n):
-                    yield color.hsv_to_rgb(hue, 1.0, value)
-        return _pulse_animation()
+        n = len(self._lights)
+        def _pulse_values(t, state):
+            x = math.sin(2.0*math.pi*freq_hz*t)
+            max_val = state.brightness_hsv
+            min_val = 0.75 * max_val
+            return np.full(n, utils.lerp(x, -1.0, 1.0, max_val, min_val))
+        return self._periodic('pulse {0}'.format(freq_hz), _pulse_values,
+                              lambda state: hue, lambda state: 1.0/freq_hz,
+                              lambda state: state.brightness)
 
     # Background thread to process speech keywords and commands.
     def _listen_speech(self):
+        logger.info('Listening for keywords {0:.3f}s after start'.format(
+            time.monotonic() - self._start_time))
         while True:
-            keyword = self._speech.listen_keyword()
+            self._trace = self._tracer.start('keyword')
+            keyword, score = self._speech.listen_keyword(self._trace)
+            self._trace.set(keyword=keyword, keyword_confidence=score)
+            # Ignore keywords that were probably noise, so noise doesn't start
+            # listening for a command.
+            if not self._keyword_gate.accept(score, keyword):
+                logger.debug('Rejected keyword: {0} [confidence: {1}]'.format(keyword, score))
+                self._trace.set(rejected=True)
+                self._trace.finish()
+                continue
+            # Keyword stats are a round trip to the speech worker process, so
+            # only get them if they'll be logged.
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug('Detected keyword: {0} [confidence: {1}] {2}'.format(keyword, score,
+                    self._speech.keyword_stats()))
             self._keywords.dispatch(keyword)
+            if self._trace.enabled:
+                self._pending_trace = self._trace
+
+    @property
+    def confidence_stats(self):
+        """Rolling statistics of the confidence of accepted and rejected
+        keywords and commands (see confidence.ScoreStats.summary).
+        """
+        return {
+            'keyword': self._keyword_gate.stats.summary(),
+            'command': self._command_gate.stats.summary()
+        }
+
+    @property
+    def tracer(self):
+        """Latency traces (tracing.Tracer) of keywords and commands, from
+        keyword detection to the first frame shown after handling them.
+        """
+        return self._tracer
+
+    @property
+    def animation_stats(self):
+        """Depth, memory and counts of the animation layers (see
+        compositor.Compositor.report), and of the baked animation tables
+        under 'baked' (see baking.TableCache.report) if baking is on.
+        """
+        stats = self._compositor.report()
+        if self._bake_cache is not None:
+            stats['baked'] = self._bake_cache.report()
+        return stats
+
+    @property
+    def frame_stats(self):
+        """Rolling frame time statistics (scheduler.FrameStats) of the LED
+        animation thread.
+        """
+        return self._frame_scheduler.stats
 
     # Background thread to drive LED animations.
     def _animate_lights(self):
-        period = 1/60.0
-        n = len(self._lights)
-        while True:
-            try:
-                if self._animations:
-                    animation = self._animations[0]
-                    for i in range(n):
-                        self._lights.set_pixel(i, next(animation))
-                    self._lights.show()
-                time.sleep(period)
-            except StopIteration:
-                self._pop_animation()
+        self._frame_scheduler.run(self._render_frame, self._show_frame)
+
+    def _show_frame(self, frame):
+        # Push a frame to the LEDs and finish the pending trace, if any, once
+        # it's shown.
+        self._lights.write_frame(frame)
+        trace = self._pending_trace
+        if trace is not None:
+            self._pending_trace = None
+            trace.mark('first_frame')
+            trace.finish()
+
+    def _render_frame(self, ft):
+        # Render the next frame of the animation layers, dropping finished
+        # layers.  Returns None if there's nothing to show.  The state is read
+        # once for the whole frame.
+        return self._compositor.render(ft, self._state.snapshot)
 
     # Foreground thread to drive state changes over time.
     def _cycle_hue(self):
-        period = 1/60.0
-        last = time.time()
         hue_velocity = 360.0 / config.FLOW_HUE_PERIOD_S
-        while True:
+        for ft in scheduler.FrameScheduler(config.FRAME_RATE_HZ).ticks():
             # Increment the hue based on the current speed.
-            now = time.time()
-            delta = now - last
-            last = now
-            self.hue += hue_velocity*delta
-            time.sleep(period)
+            self.hue += hue_velocity*ft.dt
 
     def main(self):
         logging.basicConfig(level=logging.DEBUG)
+        logger.debug('Color table: {0}'.format(self._colors.report()))
+        logger.info('Speech recognizer startup: {0}'.format(', '.join(
+            '{0} {1:.3f}s'.format(k, v) for k, v in self._speech.startup_times.items())))
+        self._spectrum_analyzer.start(self._microphone)
+        # Dump latency traces with: sudo kill -USR1 <pid>
+        signal.signal(signal.SIGUSR1,
+                      lambda signum, frame: self._tracer.dump(config.TRACE_FILE))
         self._listen_thread = threading.Thread(target=self._listen_speech)
         self._listen_thread.daemon = True
         self._listen_thread.start()
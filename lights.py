@@ -1,42 +1,212 @@
 # Jackson: Voice-controlled Jacket
-# NeoPixel LED strip.
+# NeoPixel LED strips.  The strips are segments of one logical strip (see
+# segments.py), so Jackson renders frames for all of its lights at once.
 # Author: Tony DiCola
 # License: MIT https://opensource.org/licenses/MIT
-from neopixel import *
+import atexit
+import concurrent.futures
+import ctypes
+import time
 
-import config
+import numpy as np
+import _rpi_ws281x as ws
+
+import frames
+import segments
+
+
+class _Controller:
+    # One ws281x controller (DMA channel) driving the segments on its two PWM
+    # channels.  Rendering shows both channels at once.
+
+    def __init__(self, dma, group):
+        self.segments = group
+        self._leds = ws.new_ws2811_t()
+        for channum in range(2):
+            channel = ws.ws2811_channel_get(self._leds, channum)
+            ws.ws2811_channel_t_count_set(channel, 0)
+            ws.ws2811_channel_t_gpionum_set(channel, 0)
+            ws.ws2811_channel_t_invert_set(channel, 0)
+            ws.ws2811_channel_t_brightness_set(channel, 0)
+        self._channels = []
+        for segment in group:
+            channel = ws.ws2811_channel_get(self._leds, segment.channel)
+            ws.ws2811_channel_t_count_set(channel, segment.count)
+            ws.ws2811_channel_t_gpionum_set(channel, segment.pin)
+            ws.ws2811_channel_t_invert_set(channel, 1 if segment.invert else 0)
+            ws.ws2811_channel_t_brightness_set(channel, segment.brightness)
+            ws.ws2811_channel_t_strip_type_set(channel, segment.strip_type)
+            self._channels.append(channel)
+        ws.ws2811_t_freq_set(self._leds, group[0].freq_hz)
+        ws.ws2811_t_dmanum_set(self._leds, dma)
+        resp = ws.ws2811_init(self._leds)
+        if resp != ws.WS2811_SUCCESS:
+            # A failed init cleans up after itself, only the struct is left.
+            ws.delete_ws2811_t(self._leds)
+            self._leds = None
+            raise RuntimeError('ws2811_init failed with code {0} ({1})'.format(
+                resp, ws.ws2811_get_return_t_str(resp)))
+        # Grab the address of each channel's LED color buffer (an array of
+        # uint32 colors, one per pixel) so whole segments can be copied into
+        # it at once.  If the buffer can't be found fall back to setting each
+        # pixel through the SWIG wrapper.
+        try:
+            self._buffers = [int(ws.ws2811_channel_t_leds_get(c)) for c in self._channels]
+        except (AttributeError, TypeError):
+            self._buffers = [None] * len(self._channels)
+
+    def copy(self, i, pixels):
+        # Copy a (count,) uint32 slice of a frame into the buffer of the i-th
+        # segment.
+        if self._buffers[i] is not None:
+            ctypes.memmove(self._buffers[i], pixels.ctypes.data, pixels.nbytes)
+        else:
+            for j, color in enumerate(pixels.tolist()):
+                ws.ws2811_led_set(self._channels[i], j, color)
+
+    def set_pixel(self, i, j, color):
+        ws.ws2811_led_set(self._channels[i], j, color)
+
+    def render(self):
+        resp = ws.ws2811_render(self._leds)
+        if resp != ws.WS2811_SUCCESS:
+            raise RuntimeError('ws2811_render failed with code {0} ({1})'.format(
+                resp, ws.ws2811_get_return_t_str(resp)))
+
+    def close(self):
+        # Stop the DMA and PWM and free the mailbox memory and the struct.
+        if self._leds is not None:
+            ws.ws2811_fini(self._leds)
+            ws.delete_ws2811_t(self._leds)
+            self._leds = None
 
 
 class Lights:
 
-    def __init__(self):
-        # Create NeoPixel object with appropriate configuration.
-        self._strip = Adafruit_NeoPixel(config.LED_COUNT,
-                                        config.LED_PIN,
-                                        freq_hz=config.LED_FREQ_HZ,
-                                        dma=config.LED_DMA,
-                                        invert=config.LED_INVERT,
-                                        brightness=config.LED_BRIGHTNESS,
-                                        channel=config.LED_CHANNEL,
-                                        strip_type=config.LED_TYPE
-                                        )
-        self._strip.begin()
+    def __init__(self, layout=None):
+        """Drive the LED strips of a list of segments.Segment, by default the
+        ones configured in config.py (see LED_SEGMENTS).
+        """
+        self.segments = layout if layout is not None else segments.from_config()
+        self._count = segments.total(self.segments)
+        self._controllers = []
+        try:
+            for dma, group in segments.controllers(self.segments).items():
+                self._controllers.append(_Controller(dma, group))
+        except BaseException:
+            # Don't leave the controllers that were set up running.
+            self._close_controllers()
+            raise
+        # Controllers past the first show from worker threads so they're
+        # shown at the same time.
+        self._executor = concurrent.futures.ThreadPoolExecutor(len(self._controllers) - 1) \
+            if len(self._controllers) > 1 else None
+        # Per segment push timing statistics.
+        self.stats = segments.PushStats([s.name for s in self.segments])
+        # Last frame written with write_frame, to skip showing repeat frames.
+        self._last_frame = None
+        # Release the hardware at exit (like Adafruit_NeoPixel does).
+        atexit.register(self.close)
         # Clear the lights.
         self.fill(0)
-        self._strip.show()
+        self.show()
 
     def __len__(self):
-        return config.LED_COUNT
+        return self._count
+
+    def close(self):
+        """Stop the worker threads and release the LED controllers (DMA,
+        PWM and their memory).  Called at exit, the lights can't be used
+        after.
+        """
+        atexit.unregister(self.close)
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self._close_controllers()
+
+    def _close_controllers(self):
+        while self._controllers:
+            self._controllers.pop().close()
 
     def fill(self, color):
         """Set the color of all lights."""
-        for i in range(len(self)):
-            self._strip.setPixelColor(i, color)
+        frame = np.full(len(self), color, dtype=np.uint32)
+        for controller in self._controllers:
+            for i, pixels in enumerate(segments.split(frame, controller.segments)):
+                controller.copy(i, pixels)
+        self._last_frame = None
 
     def set_pixel(self, i, color):
         """Set the color of light at position i."""
-        self._strip.setPixelColor(i, color)
+        segment, j = segments.find(self.segments, i)
+        for controller in self._controllers:
+            if segment in controller.segments:
+                controller.set_pixel(controller.segments.index(segment), j, color)
+        self._last_frame = None
 
     def show(self):
-        """Push out the updated color buffer to the hardware."""
-        self._strip.show()
+        """Push out the updated color buffers to the hardware."""
+        self._render(self._controllers)
+
+    def _render(self, controllers):
+        # Render the controllers at the same time and return their render
+        # times (seconds).
+        if not controllers:
+            return []
+        timed = lambda c: _timed(c.render)
+        if self._executor is None or len(controllers) == 1:
+            return [timed(c) for c in controllers]
+        futures = [self._executor.submit(timed, c) for c in controllers[1:]]
+        return [timed(controllers[0])] + [f.result() for f in futures]
+
+    def write_frame(self, buffer):
+        """Set the color of all lights from a frame and push it out to the
+        hardware.  The frame can be a NumPy frame (see frames.py), an
+        array('I') or any bytes-like object of native uint32 24-bit colors,
+        with one color per light.  Each segment's slice of the frame is
+        copied into its LED buffer in one bulk copy, and a controller isn't
+        updated if none of its segments changed since the last frame written.
+        Returns True if the frame was shown.
+        """
+        if isinstance(buffer, np.ndarray):
+            frame = frames.pack(buffer)
+        else:
+            frame = np.frombuffer(buffer, dtype=np.uint32)
+        if len(frame) != len(self):
+            raise ValueError('Expected a frame of {0} pixels, got {1}'.format(len(self), len(frame)))
+        frame = np.ascontiguousarray(frame, dtype=np.uint32)
+        last = self._last_frame
+        changed = []
+        copy_times = {}
+        for controller in self._controllers:
+            updated = False
+            parts = segments.split(frame, controller.segments)
+            last_parts = segments.split(last, controller.segments) if last is not None \
+                else [None] * len(parts)
+            for i, segment in enumerate(controller.segments):
+                pixels = parts[i]
+                if last_parts[i] is not None and np.array_equal(pixels, last_parts[i]):
+                    self.stats.record_skipped(segment.name)
+                    continue
+                start = time.monotonic()
+                controller.copy(i, pixels)
+                copy_times[segment.name] = time.monotonic() - start
+                updated = True
+            if updated:
+                changed.append(controller)
+        if not changed:
+            return False
+        for controller, render_s in zip(changed, self._render(changed)):
+            for segment in controller.segments:
+                if segment.name in copy_times:
+                    self.stats.record(segment.name, copy_times[segment.name] + render_s)
+        self._last_frame = frame.copy()
+        return True
+
+
+def _timed(function):
+    # Call a function and return the seconds it took.
+    start = time.monotonic()
+    function()
+    return time.monotonic() - start
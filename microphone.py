@@ -1,40 +1,94 @@
 # Jackson: Voice-controlled Jacket
-# Microphone capture logic.
+# Microphone capture logic.  A background thread reads periods of samples from
+# an audio source (the ALSA microphone by default, see audio.py for others)
+# and writes them into a ring buffer that consumers (speech recognition,
+# spectrum animation) read from.
 # Author: Tony DiCola
 # License: MIT https://opensource.org/licenses/MIT
-import alsaaudio
+import logging
+import threading
+import time
 
+import numpy as np
+
+import audio
 import config
+import ringbuffer
+
+
+logger = logging.getLogger(__name__)
 
 
 class Microphone:
 
-    def __init__(self):
-        # Open the microphone and configure it for mono recording with signed
-        # 16-bit samples.
-        self._mic = alsaaudio.PCM(alsaaudio.PCM_CAPTURE,
-                                  alsaaudio.PCM_NONBLOCK,
-                                  device=config.DEVICE)
-        self._mic.setchannels(1)
-        self._mic.setrate(config.SAMPLE_RATE_HZ)
-        self._mic.setformat(alsaaudio.PCM_FORMAT_S16_LE)
-        self._mic.setperiodsize(512)
-        # Store a copy of the last sample for use with spectrogram
-        # animations.  This really should be protected behind a lock for
-        # thread safe access but for speed and simplicity any hiccups in
-        # the animation from contention and races here are ignored
-        self.last_read = None
-
-    def read(self):
-        """Read a buffer of microphone sample data and return it.  If data
-        couldn't be read then None/null is returned.
+    def __init__(self, source=None):
+        """Start capturing audio from the specified audio source, or the ALSA
+        device configured in config.py if not specified.
+        """
+        if source is None:
+            source = audio.AlsaSource(config.DEVICE, config.SAMPLE_RATE_HZ,
+                                      config.MIC_PERIOD_SIZE)
+        self._source = source
+        self.period_size = source.period_size
+        self.sample_rate = source.sample_rate
+        self._ring = ringbuffer.RingBuffer(int(config.MIC_BUFFER_S*self.sample_rate))
+        # Default reader and preallocated period buffer used by read, with a
+        # read-only byte view of it that read returns.
+        self._reader = self._ring.reader()
+        self._period = np.zeros(self.period_size, dtype=np.int16)
+        self._period_bytes = memoryview(self._period).cast('B').toreadonly()
+        self._capture_cpu_s = 0.0
+        self._started = time.monotonic()
+        self.finished = False
+        self._thread = threading.Thread(target=self._capture)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _capture(self):
+        # Background thread that moves audio from the source into the ring
+        # buffer until the source runs out.
+        while True:
+            buf = self._source.read()
+            if buf is None:
+                break
+            self._ring.write(buf)
+            self._capture_cpu_s = time.clock_gettime(time.CLOCK_THREAD_CPUTIME_ID)
+        logger.debug('Audio source finished')
+        self.finished = True
+
+    def read(self, timeout=None):
+        """Block until the next period of microphone sample data is available
+        and return it as a read-only memoryview of the bytes of signed 16-bit
+        samples.  The view is of a buffer that's reused, so it's only valid
+        until the next read (copy it with bytes() to keep it).  If the
+        timeout (seconds) elapses first None/null is returned.
         """
-        # Get a buffer of sample data from PyAlsaAudio library.
-        len, buf = self._mic.read()
-        # If no data was retrieved indicate it with a None value.
-        if len is None:
-            self.last_read = None
+        if not self._reader.read_into(self._period, timeout):
             return None
-        # Save the sample buffer and return it.
-        self.last_read = buf
-        return buf
+        return self._period_bytes
+
+    def reader(self):
+        """Create a ringbuffer.Reader for a consumer that needs its own
+        position in the stream of samples.
+        """
+        return self._ring.reader()
+
+    def latest(self, count):
+        """Return a read-only NumPy view of the latest count samples (no
+        copy), for visualizations like the spectrum animation.
+        """
+        return self._ring.latest(count)
+
+    def stats(self):
+        """Return a dict of capture statistics: seconds of audio captured,
+        source overruns, samples dropped by the default reader because it
+        fell behind, and the CPU time used by the capture thread as a percent
+        of wall clock time.
+        """
+        elapsed = time.monotonic() - self._started
+        return {
+            'captured_s': self._ring.written / float(self.sample_rate),
+            'overruns': self._source.overruns,
+            'dropped': self._reader.dropped,
+            'capture_cpu_pct': 100.0 * self._capture_cpu_s / max(elapsed, 1e-9)
+        }
@@ -0,0 +1,112 @@
+# Jackson: Voice-controlled Jacket
+# Fixed size ring buffer of audio samples.  One writer (the capture thread)
+# copies blocks of samples in and any number of readers consume them with
+# blocking reads, or grab a zero-copy view of the latest samples.
+# Author: Tony DiCola
+# License: MIT https://opensource.org/licenses/MIT
+import threading
+
+import numpy as np
+
+
+class RingBuffer:
+
+    def __init__(self, capacity, dtype=np.int16):
+        """Create a ring buffer that holds the last capacity samples of the
+        specified NumPy dtype.  All memory is allocated up front.
+        """
+        self.capacity = capacity
+        self.dtype = np.dtype(dtype)
+        # Every sample is stored twice, at its index and capacity past it, so
+        # any run of up to capacity samples is contiguous and can be returned
+        # as a view without copying.
+        self._data = np.zeros(2*capacity, dtype=self.dtype)
+        self._written = 0
+        self._cond = threading.Condition()
+
+    @property
+    def written(self):
+        """Total number of samples ever written to the buffer."""
+        return self._written
+
+    def write(self, samples):
+        """Copy a block of samples (NumPy array or bytes-like object) into the
+        buffer and wake up any blocked readers.
+        """
+        if not isinstance(samples, np.ndarray):
+            samples = np.frombuffer(samples, dtype=self.dtype)
+        total = len(samples)
+        samples = samples[-self.capacity:]
+        count = len(samples)
+        with self._cond:
+            start = (self._written + total - count) % self.capacity
+            first = min(count, self.capacity - start)
+            self._store(start, samples[:first])
+            self._store(0, samples[first:])
+            self._written += total
+            self._cond.notify_all()
+
+    def _store(self, start, samples):
+        end = start + len(samples)
+        self._data[start:end] = samples
+        self._data[start+self.capacity:end+self.capacity] = samples
+
+    def latest(self, count):
+        """Return a read-only view of the latest count samples (fewer if not
+        that many were written yet).  The view isn't copied so it can change
+        if more samples are written while it's being used, which is fine for
+        visualizations.
+        """
+        with self._cond:
+            count = min(count, self.capacity, self._written)
+            end = self._written % self.capacity + self.capacity
+        view = self._data[end-count:end]
+        view.flags.writeable = False
+        return view
+
+    def reader(self):
+        """Create a new Reader that consumes samples written from now on."""
+        return Reader(self)
+
+
+class Reader:
+    """Consumer of samples from a RingBuffer that tracks its own position.
+    If the reader falls more than the buffer capacity behind the writer the
+    oldest samples are dropped (and counted in dropped).
+    """
+
+    def __init__(self, ring):
+        self._ring = ring
+        self.position = ring.written
+        self.dropped = 0
+
+    @property
+    def available(self):
+        """Number of samples that can be read without blocking."""
+        return min(self._ring.written - self.position, self._ring.capacity)
+
+    def read_into(self, out, timeout=None):
+        """Block until len(out) new samples are available and copy them into
+        the NumPy array out.  Returns False if the timeout (seconds) elapses
+        before enough samples were written, otherwise True.
+        """
+        ring = self._ring
+        count = len(out)
+        if count > ring.capacity:
+            raise ValueError('Read of {0} samples is larger than the buffer'.format(count))
+        with ring._cond:
+            if not ring._cond.wait_for(lambda: ring._written - self.position >= count,
+                                       timeout):
+                return False
+            behind = ring._written - self.position
+            if behind > ring.capacity:
+                self.dropped += behind - ring.capacity
+                self.position = ring._written - ring.capacity
+            start = self.position % ring.capacity
+            out[:] = ring._data[start:start+count]
+            self.position += count
+        return True
+
+    def skip(self):
+        """Drop any unread samples and continue from the latest written."""
+        self.position = self._ring.written
@@ -0,0 +1,157 @@
+# Jackson: Voice-controlled Jacket
+# Fixed timestep frame scheduler.  Frames are scheduled on absolute deadlines
+# from a monotonic clock so render and push time doesn't slow the frame rate
+# down, and frames are skipped (rather than bunched up) when running behind.
+# Author: Tony DiCola
+# License: MIT https://opensource.org/licenses/MIT
+import collections
+import logging
+import math
+import threading
+import time
+
+import numpy as np
+
+import clock
+
+
+logger = logging.getLogger(__name__)
+
+
+class FrameStats:
+    """Rolling statistics of how long each stage of a frame takes (render,
+    push and sleep), and counts of missed deadlines and skipped frames.  Safe
+    to read from any thread while the scheduler is running.
+    """
+
+    STAGES = ('render', 'push', 'sleep')
+    # Histogram bin edges in milliseconds.
+    BINS_MS = (0.0, 1.0, 2.0, 4.0, 8.0, 16.0, 33.0, 66.0, math.inf)
+
+    def __init__(self, window=600):
+        """Create frame stats that keep the last window frames of timings."""
+        self._lock = threading.Lock()
+        self._times = {s: collections.deque(maxlen=window) for s in self.STAGES}
+        self.frames = 0
+        self.missed = 0
+        self.skipped = 0
+
+    def record(self, render, push, sleep):
+        """Record the render, push and sleep time (seconds) of a frame."""
+        with self._lock:
+            self._times['render'].append(render)
+            self._times['push'].append(push)
+            self._times['sleep'].append(sleep)
+            self.frames += 1
+
+    def record_missed(self, skipped):
+        """Record a missed deadline that caused skipped frames to be dropped."""
+        with self._lock:
+            self.missed += 1
+            self.skipped += skipped
+
+    def times(self, stage):
+        """Return a NumPy array of the recent times (seconds) for a stage."""
+        with self._lock:
+            return np.array(self._times[stage], dtype=np.float64)
+
+    def histogram(self, stage):
+        """Return a list of (upper bin edge in ms, count) tuples for the
+        recent times of a stage.
+        """
+        counts, _ = np.histogram(self.times(stage) * 1000.0, bins=self.BINS_MS)
+        return list(zip(self.BINS_MS[1:], counts.tolist()))
+
+    def summary(self):
+        """Return a one line summary of the recent frame timings."""
+        parts = []
+        for stage in self.STAGES:
+            times = self.times(stage) * 1000.0
+            if len(times) == 0:
+                continue
+            parts.append('{0} p50 {1:.2f}ms p95 {2:.2f}ms max {3:.2f}ms'.format(
+                stage, np.percentile(times, 50), np.percentile(times, 95),
+                times.max()))
+        parts.append('frames {0} missed {1} skipped {2}'.format(
+            self.frames, self.missed, self.skipped))
+        return ', '.join(parts)
+
+
+class FrameScheduler:
+
+    def __init__(self, rate_hz, clock_fn=time.monotonic, sleep=time.sleep,
+                 stats=None, log_interval_s=None):
+        """Create a scheduler that runs frames at rate_hz.  The clock_fn and
+        sleep functions can be swapped out (for tests), and if log_interval_s
+        is set the frame stats are logged every log_interval_s seconds.
+        """
+        self.period = 1.0 / rate_hz
+        self.stats = stats if stats is not None else FrameStats()
+        self._clock = clock_fn
+        self._sleep = sleep
+        self._log_interval_s = log_interval_s
+        self._next_log = None
+        self._deadline = None
+
+    def wait(self):
+        """Sleep until the next frame deadline.  If the deadline already
+        passed the frame starts right away and any earlier frames that were
+        missed are skipped.  Returns a 2-tuple of the current clock time and
+        the time spent sleeping (seconds).
+        """
+        now = self._clock()
+        if self._deadline is None:
+            self._deadline = now
+        self._deadline += self.period
+        if now > self._deadline:
+            # Running behind, start the frame now in place of the last slot
+            # that already passed and drop the slots before it.  Keep the
+            # original phase of the deadlines so the next frame lands on the
+            # next slot.
+            passed = int((now - self._deadline) // self.period) + 1
+            self._deadline += (passed - 1) * self.period
+            self.stats.record_missed(passed - 1)
+            return now, 0.0
+        self._sleep(self._deadline - now)
+        wake = self._clock()
+        return wake, wake - now
+
+    def ticks(self):
+        """Generator that waits for every frame and yields a clock.FrameTime
+        of the current time and the time elapsed since the previous frame
+        (zero on the first frame).
+        """
+        last = None
+        while True:
+            now, _ = self.wait()
+            yield clock.FrameTime(now, 0.0 if last is None else now - last)
+            last = now
+
+    def run(self, render, push=None, count=None):
+        """Run frames forever (or count frames if specified).  Each frame
+        calls render with a clock.FrameTime of the current time and time since
+        the last frame, and passes what it returns to push (unless it's None).
+        Render, push and sleep times are recorded in stats.
+        """
+        i = 0
+        last = None
+        while count is None or i < count:
+            start, sleep = self.wait()
+            frame = render(clock.FrameTime(start, 0.0 if last is None else start - last))
+            last = start
+            rendered = self._clock()
+            if push is not None and frame is not None:
+                push(frame)
+            pushed = self._clock()
+            self.stats.record(rendered - start, pushed - rendered, sleep)
+            self._log_stats(pushed)
+            i += 1
+
+    def _log_stats(self, now):
+        if self._log_interval_s is None:
+            return
+        if self._next_log is None:
+            self._next_log = now + self._log_interval_s
+        elif now >= self._next_log:
+            self._next_log = now + self._log_interval_s
+            logger.info('Frame stats: {0}'.format(self.stats.summary()))
@@ -0,0 +1,170 @@
+# Jackson: Voice-controlled Jacket
+# LED segment layout.  Jackson's lights can be several strips (like sleeves
+# and a back panel) on the two PWM channels of an LED controller or on other
+# controllers (DMA channels).  The strips are segments of one logical strip:
+# frames are rendered for all the lights at once and each segment shows its
+# slice of the frame, a view that isn't copied.
+# Author: Tony DiCola
+# License: MIT https://opensource.org/licenses/MIT
+import collections
+import threading
+
+import numpy as np
+
+import config
+
+
+# Peripheral that generates the signal of each GPIO pin that can drive
+# LEDs.  A peripheral can only be used by one controller (DMA channel).
+PERIPHERALS = {
+    12: 'PWM', 18: 'PWM', 40: 'PWM', 52: 'PWM',
+    13: 'PWM', 19: 'PWM', 41: 'PWM', 45: 'PWM', 53: 'PWM',
+    21: 'PCM', 31: 'PCM',
+    10: 'SPI', 38: 'SPI'
+}
+
+# A segment of the logical strip: its name, first logical pixel and number of
+# pixels, and the ws281x settings of the physical strip it's on.
+Segment = collections.namedtuple('Segment', ['name', 'start', 'count', 'pin',
+    'channel', 'dma', 'freq_hz', 'invert', 'brightness', 'strip_type'])
+
+
+def layout(specs):
+    """Return the list of Segments for a list of segment dicts (see
+    LED_SEGMENTS in config.py), one after the other in the logical strip.
+    Raises ValueError if a segment is empty, two segments have the same name
+    or are on the same channel of a controller, or segments on different
+    controllers use the same peripheral (see PERIPHERALS).
+    """
+    segments = []
+    start = 0
+    used = set()
+    peripherals = {}
+    for i, spec in enumerate(specs):
+        spec = dict(spec)
+        name = spec.pop('name', 'segment{0}'.format(i))
+        if any(s.name == name for s in segments):
+            raise ValueError('Segment name {0} is already used'.format(name))
+        settings = {
+            'pin':        config.LED_PIN,
+            'channel':    config.LED_CHANNEL,
+            'dma':        config.LED_DMA,
+            'freq_hz':    config.LED_FREQ_HZ,
+            'invert':     config.LED_INVERT,
+            'brightness': config.LED_BRIGHTNESS,
+            'strip_type': config.LED_TYPE
+        }
+        unknown = set(spec) - set(settings) - {'count'}
+        if unknown:
+            raise ValueError('Unknown settings of segment {0}: {1}'.format(
+                name, ', '.join(sorted(unknown))))
+        count = spec.pop('count')
+        if count <= 0:
+            raise ValueError('Segment {0} has no pixels'.format(name))
+        settings.update(spec)
+        if settings['channel'] not in (0, 1):
+            raise ValueError('Segment {0} channel must be 0 or 1'.format(name))
+        if (settings['dma'], settings['channel']) in used:
+            raise ValueError('Segment {0} is on channel {1} of DMA {2} which is already used'.format(
+                name, settings['channel'], settings['dma']))
+        used.add((settings['dma'], settings['channel']))
+        peripheral = PERIPHERALS.get(settings['pin'])
+        if peripheral is not None:
+            dma = peripherals.setdefault(peripheral, settings['dma'])
+            if dma != settings['dma']:
+                raise ValueError('Segment {0} uses the {1} on DMA {2} but DMA {3} already uses it'.format(
+                    name, peripheral, settings['dma'], dma))
+        segments.append(Segment(name, start, count, **settings))
+        start += count
+    return segments
+
+
+def from_config():
+    """Return the Segments configured in config.py: LED_SEGMENTS, or one
+    strip of LED_COUNT pixels if it isn't set.
+    """
+    return layout(config.LED_SEGMENTS or [dict(count=config.LED_COUNT)])
+
+
+def total(segments):
+    """Number of pixels in the logical strip of a list of Segments."""
+    return sum(s.count for s in segments)
+
+
+def controllers(segments):
+    """Group a list of Segments by the controller (DMA channel) that drives
+    them, returning an ordered dict of DMA channel to its list of segments.
+    Raises ValueError if segments of a controller have different signal
+    frequencies.
+    """
+    groups = collections.OrderedDict()
+    for segment in segments:
+        groups.setdefault(segment.dma, []).append(segment)
+    for dma, group in groups.items():
+        if len(set(s.freq_hz for s in group)) > 1:
+            raise ValueError('Segments on DMA {0} have different frequencies'.format(dma))
+    return groups
+
+
+def split(frame, segments):
+    """Return a list of the slices (views, not copies) of a frame for each
+    segment.
+    """
+    return [frame[s.start:s.start+s.count] for s in segments]
+
+
+def find(segments, i):
+    """Return the Segment with logical pixel i and the pixel's position in
+    it.
+    """
+    for segment in segments:
+        if segment.start <= i < segment.start + segment.count:
+            return segment, i - segment.start
+    raise IndexError('Pixel {0} is out of range'.format(i))
+
+
+class PushStats:
+    """Rolling statistics of how long pushing a frame to each segment takes
+    (copying its pixels and showing them), and how often it was skipped
+    because its pixels didn't change.  Safe to read from any thread.
+    """
+
+    def __init__(self, names, window=600):
+        """Create push stats for the named segments that keep the last
+        window pushes of timings.
+        """
+        self._lock = threading.Lock()
+        self._times = collections.OrderedDict(
+            (name, collections.deque(maxlen=window)) for name in names)
+        self.skipped = collections.OrderedDict((name, 0) for name in names)
+
+    def record(self, name, seconds):
+        """Record the time (seconds) a segment took to push."""
+        with self._lock:
+            self._times[name].append(seconds)
+
+    def record_skipped(self, name):
+        """Record a push of a segment skipped because it didn't change."""
+        with self._lock:
+            self.skipped[name] += 1
+
+    def times(self, name):
+        """Return a NumPy array of the recent push times (seconds) of a
+        segment.
+        """
+        with self._lock:
+            return np.array(self._times[name], dtype=np.float64)
+
+    def summary(self):
+        """Return a one line summary of the recent push times of every
+        segment.
+        """
+        parts = []
+        for name in self._times:
+            times = self.times(name) * 1000.0
+            if len(times) == 0:
+                continue
+            parts.append('{0} p50 {1:.2f}ms p95 {2:.2f}ms max {3:.2f}ms skipped {4}'.format(
+                name, np.percentile(times, 50), np.percentile(times, 95),
+                times.max(), self.skipped[name]))
+        return ', '.join(parts)
@@ -0,0 +1,91 @@
+# Jackson: Voice-controlled Jacket
+# Streaming spectrum analyzer for the spectrum animation.  Runs an FFT once per
+# block of new microphone audio and maps it onto log spaced frequency bands
+# (one per LED), with smoothing and automatic gain so the animation only has
+# to read the latest band levels.
+# Author: Tony DiCola
+# License: MIT https://opensource.org/licenses/MIT
+import threading
+
+import numpy as np
+
+
+class SpectrumAnalyzer:
+
+    def __init__(self, bands, sample_rate, block_size=512, min_hz=100.0,
+                 max_hz=4000.0, smoothing=0.6, range_db=40.0,
+                 peak_decay_db_s=6.0):
+        """Create an analyzer that splits blocks of block_size samples into
+        the specified number of log spaced bands from min_hz to max_hz.
+        Band levels are exponentially smoothed (smoothing is the fraction of
+        the previous level kept every block) and scaled so the loudest recent
+        level is 1.0 and levels range_db below it are 0.  The loudest level
+        decays by peak_decay_db_s decibels per second so quiet audio is
+        turned up again.
+        """
+        self.block_size = block_size
+        self.sample_rate = sample_rate
+        self._window = np.hanning(block_size)
+        # Map every band to the FFT bins it covers.  Bands narrower than a bin
+        # just use the bin they fall in.
+        max_hz = min(max_hz, sample_rate/2.0)
+        edges = np.geomspace(min_hz, max_hz, bands + 1)
+        bin_hz = sample_rate / float(block_size)
+        self._starts = np.clip(np.floor(edges[:-1] / bin_hz).astype(np.int64),
+                               1, block_size//2)
+        self._stop = max(int(np.ceil(max_hz / bin_hz)) + 1, self._starts[-1] + 1)
+        self._smoothing = smoothing
+        self._range_db = range_db
+        self._peak_decay_db = peak_decay_db_s * block_size / float(sample_rate)
+        self._level = np.zeros(bands)
+        self._peak = None
+        # Latest normalized band levels (0 to 1.0).  Replaced as a whole with
+        # a new array every block so readers never see a partial update.
+        self.bands = np.zeros(bands)
+        self.blocks = 0
+
+    def process(self, samples):
+        """Analyze a block of block_size signed 16-bit samples and publish
+        the new band levels in bands.
+        """
+        spectrum = np.abs(np.fft.rfft(samples * self._window))
+        # Loudest bin of every band, in decibels.  Amplitudes are clamped to at
+        # least 1 (0 dB) so silence isn't -inf.
+        power = np.maximum.reduceat(spectrum[:self._stop], self._starts)
+        power = np.maximum(power, 1.0)
+        level = 20.0*np.log10(power)
+        if self.blocks == 0:
+            self._level = level
+        else:
+            self._level = self._smoothing*self._level + (1.0 - self._smoothing)*level
+        # Automatic gain: follow the loudest level up right away and let it
+        # decay slowly, but never so low that silence lights up.
+        loudest = np.max(self._level)
+        if self._peak is None or loudest > self._peak:
+            self._peak = loudest
+        else:
+            self._peak -= self._peak_decay_db
+        self._peak = max(self._peak, self._range_db)
+        floor = self._peak - self._range_db
+        self.bands = np.clip((self._level - floor) / self._range_db, 0.0, 1.0)
+        self.blocks += 1
+        return self.bands
+
+    def start(self, microphone):
+        """Start a background thread that analyzes every new block of audio
+        from the specified microphone.
+        """
+        self._thread = threading.Thread(target=self._run, args=(microphone.reader(),))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self, reader):
+        block = np.zeros(self.block_size, dtype=np.int16)
+        while True:
+            # Block until there's new audio, then skip anything older than the
+            # latest block so the analyzer never falls behind.
+            if not reader.read_into(block, timeout=1.0):
+                continue
+            if reader.available >= self.block_size:
+                reader.skip()
+            self.process(block)
@@ -4,14 +4,24 @@
 # recognition.
 # Author: Tony DiCola
 # License: MIT https://opensource.org/licenses/MIT
+import collections
+import contextlib
 import logging
+import os
 import tempfile
 import time
 
 from pocketsphinx.pocketsphinx import *
 from sphinxbase.sphinxbase import *
 
+import cache
 import config
+import confidence
+import dictionary
+import endpoint
+import grammar
+import tracing
+import tuning
 
 
 logger = logging.getLogger(__name__)
@@ -19,99 +29,261 @@ logger = logging.getLogger(__name__)
 
 class SpeechRecognizer:
 
-    def __init__(self, microphone):
+    def __init__(self, microphone, is_complete=None, vad=None):
         """Create an instance of the speech recognizer with the specified
-        microphone instance as input.
+        microphone instance as input.  If is_complete is specified it's a
+        function that returns True if a hypothesis is a complete command, so
+        command listening can stop as soon as one is heard.  If vad is
+        specified it's a vad.VoiceActivityGate and keyword spotting only
+        decodes the audio it passes.
         """
         self._mic = microphone
+        self._is_complete = is_complete
+        self._vad = vad
+        # Keyword spotting samples heard and decoded, and decoding CPU time.
+        self.keyword_samples = 0
+        self.keyword_decoded_samples = 0
+        self.keyword_decode_cpu_s = 0.0
+        # Seconds taken by each phase of startup, in order.
+        self.startup_times = collections.OrderedDict()
+        # Files built at startup are kept in the cache directory so they're
+        # only rebuilt when their inputs change.  Without a cache directory
+        # they're built in a private temporary directory (removed when the
+        # recognizer is), never a shared one where stale files are removed.
+        self._temp_dir = None
+        if not config.CACHE_DIR:
+            self._temp_dir = tempfile.TemporaryDirectory(prefix='jackson-speech-')
+        self._cache_dir = config.CACHE_DIR or self._temp_dir.name
+        keywords = (config.WAKE_WORDS, config.HAPPY_WORDS, config.SAD_WORDS)
         # Build a keyword file to pass to Pocketsphinx (the only way
         # Pocketsphinx can be configured unfortunately).
-        self._kws = self._generate_keywords(config.WAKE_WORDS,
-                                            config.HAPPY_WORDS,
-                                            config.SAD_WORDS)
-        logger.debug('Generated keyword file: {0}'.format(self._kws.name))
+        with self._timed('keywords'):
+            self._kws = self._generate_keywords(*keywords)
+        # Prune the pronunciation dictionary to the words Jackson listens for
+        # so Pocketsphinx doesn't parse the whole thing every start.
+        with self._timed('dictionary'):
+            words = grammar.load(config.GRAMMAR_MODEL).words() | \
+                dictionary.phrase_words(w for k in keywords for w in k)
+            dict_path, missing = dictionary.load_pruned(config.DICTIONARY_MODEL,
+                                                        words, self._cache_dir)
+        if missing:
+            logger.warning('Words missing from the dictionary can\'t be recognized: {0}'.format(
+                ', '.join(missing)))
         # Configure Pocketsphinx recognition model.
-        psconfig = Decoder.default_config()
-        psconfig.set_string('-hmm', config.ACOUSTIC_MODEL)
-        psconfig.set_string('-dict', config.DICTIONARY_MODEL)
-        psconfig.set_float('-samprate', config.SAMPLE_RATE_HZ)
-        psconfig.set_int('-nfft', 2048)  # Must bump up FFT size when using
-                                         # fast sample rate (16khz or more).
-        if not config.POCKETSPHINX_DEBUG:
-            psconfig.set_string('-logfn', '/dev/null')  # Disable debug output.
-        self._decoder = Decoder(psconfig)
+        with self._timed('decoder'):
+            psconfig = Decoder.default_config()
+            psconfig.set_string('-hmm', config.ACOUSTIC_MODEL)
+            psconfig.set_string('-dict', dict_path)
+            psconfig.set_float('-samprate', config.SAMPLE_RATE_HZ)
+            psconfig.set_int('-nfft', config.POCKETSPHINX_NFFT)
+            if not config.POCKETSPHINX_DEBUG:
+                psconfig.set_string('-logfn', '/dev/null')  # Disable debug output.
+            self._decoder = Decoder(psconfig)
         # Setup two searches for the pocketsphinx decoder, one for keywords and
         # another for the general language model.  These are used for keyword
         # spotting of wake words and continuous recognition once woken up.
-        self._decoder.set_jsgf_file('command', config.GRAMMAR_MODEL)
-        self._decoder.set_kws('keyword', self._kws.name)
+        with self._timed('grammar search'):
+            self._decoder.set_jsgf_file('command', config.GRAMMAR_MODEL)
+        with self._timed('keyword search'):
+            self._decoder.set_kws('keyword', self._kws)
+
+    @contextlib.contextmanager
+    def _timed(self, phase):
+        # Record the time taken by a phase of startup.
+        start = time.monotonic()
+        yield
+        self.startup_times[phase] = time.monotonic() - start
 
     def _serialize_keywords(self, words):
         # Convert keywords into a string with one per line and the
-        # weight/threshold value in the format expected by Pocketsphinx.
-        return '\n'.join({'{0} /{1}/'.format(k, v) for k, v in words.items()})
+        # weight/threshold value in the format expected by Pocketsphinx.  Sorted
+        # so the same keywords always make the same file.
+        return '\n'.join(sorted('{0} /{1}/'.format(k, v) for k, v in words.items()))
 
     def _generate_keywords(self, *words):
-        # Generate a keywords text file in a temporary location and return
-        # the file.
-        file = tempfile.NamedTemporaryFile(mode='w+', encoding='utf8')
-        for w in words:
-            file.write(self._serialize_keywords(w))
-            file.write('\n')
-        file.flush()
-        return file
-
-    def listen_command(self):
+        # Generate a keywords text file and return its path.  Thresholds
+        # recommended by the tuning tool (see tuning.py) replace the ones in
+        # the keyword dicts.
+        tuned = tuning.load_thresholds(config.KEYWORD_THRESHOLDS_FILE)
+        if tuned:
+            logger.debug('Tuned keyword thresholds: {0}'.format(tuned))
+        return self._write_keywords(*({k: tuned.get(k, v) for k, v in w.items()}
+                                      for w in words))
+
+    def _write_keywords(self, *words):
+        # Write a keywords text file in the cache directory (named by a hash
+        # of its contents so it's only written when keywords change) and
+        # return its path.
+        text = ''.join(self._serialize_keywords(w) + '\n' for w in words)
+        return cache.load_file(self._cache_dir, 'keywords', cache.digest(text),
+                               lambda: text, '.kws')
+
+    def set_keywords(self, words):
+        """Replace the keywords spotted by listen_keyword and spot_keywords
+        with a dict of keyword to threshold, exactly as specified (used to
+        tune thresholds).  The keyword file is temporary and not cached, so
+        recognizers in other processes tuning other keywords (or Jackson's
+        cached keyword file) aren't disturbed.
+        """
+        with tempfile.TemporaryDirectory(prefix='jackson-keywords-') as directory:
+            path = os.path.join(directory, 'keywords.kws')
+            with open(path, 'w', encoding='utf8') as outfile:
+                outfile.write(self._serialize_keywords(words) + '\n')
+            # Pocketsphinx reads the file right away.
+            self._decoder.set_kws('keyword', path)
+
+    def listen_command(self, trace=tracing.NULL_TRACE, endpointer=None):
         """Listen for a command to be heard from the microphone using the
         grammar-based command search.  Will block until a command is recognized,
         or the maximum listen time elapses (specified in config.py).  Returns
-        a 2-tuple of command string and score if a command is recognized, or
-        None/null values if nothing was recognized and the timeout elapsed.
+        a 2-tuple of command string and confidence (0 to 1.0, see
+        _command_confidence) if a command is recognized, or None/null values
+        if nothing was recognized and the timeout elapsed.  Listening ends
+        when the endpointer (an endpoint.Endpointer, by default one configured
+        from config.py) says the utterance is over.  The listen and final
+        decode are recorded as spans of the specified tracing.Trace, with the
+        time spent waiting for audio and in Pocketsphinx and why listening
+        ended as attributes.
         """
+        if endpointer is None:
+            endpointer = endpoint.Endpointer(no_speech_s=config.COMMAND_MIN_S,
+                max_s=config.COMMAND_MAX_S,
+                silence_s=config.COMMAND_SILENCE_S,
+                is_complete=self._is_complete if config.COMMAND_EARLY_RETURN else None)
         # Switch Pocketsphinx to grammar-based command search mode.
         self._decoder.set_search('command')
         self._decoder.start_utt()
-        in_speech = False
-        start = time.time()
+        read_s = process_s = 0.0
+        samples = 0
+        listen_start = time.monotonic()
         while True:
-            # Stop if minimum listen time has elapsed and no speech is heard.
-            if not in_speech and time.time() > (start + config.COMMAND_MIN_S):
-                break
-            # Stop if maximum listen time has elapsed.
-            if time.time() > (start + config.COMMAND_MAX_S):
-                break
             # Grab data from the microphone and process it with Pocketsphinx.
-            buf = self._mic.read()
+            # Wait at most a short time for audio so the maximum listen time
+            # is still checked if the microphone stalls.
+            read_start = time.monotonic()
+            buf = self._mic.read(timeout=0.1)
+            process_start = time.monotonic()
+            read_s += process_start - read_start
             if buf is None:
+                if process_start - listen_start > endpointer.max_s:
+                    reason = 'max'
+                    break
                 continue
             self._decoder.process_raw(buf, False, False)
             in_speech = self._decoder.get_in_speech()
-        # Check if Pocketsphinx detected a command and return it with the score.
+            # Partial hypotheses only change while there's speech.
+            hyp = self._decoder.hyp() if in_speech else None
+            process_s += time.monotonic() - process_start
+            # Time is measured in audio heard (2 bytes per sample), which
+            # matches the wall clock for a live microphone.
+            samples += len(buf) // 2
+            reason = endpointer.update(samples / config.SAMPLE_RATE_HZ, in_speech,
+                                       hyp.hypstr.strip() if hyp is not None else None)
+            if reason is not None:
+                break
+        decode_start = time.monotonic()
+        trace.add_span('listen', listen_start, decode_start)
+        # Check if Pocketsphinx detected a command and return it with its
+        # confidence.
         self._decoder.end_utt()
         hyp = self._decoder.hyp()
+        result = (None, None)
         if hyp is not None:
-            return (hyp.hypstr.strip(), hyp.best_score)
-        else:
-            return (None, None)
+            result = (hyp.hypstr.strip(), self._command_confidence(hyp))
+        trace.add_span('decode', decode_start, time.monotonic())
+        trace.set(read_wait_ms=read_s*1000.0, process_raw_ms=process_s*1000.0,
+                  endpoint=reason, endpoint_s=samples / float(config.SAMPLE_RATE_HZ))
+        return result
 
-    def listen_keyword(self):
-        """Listen for a command to be heard from the microphone using the
-        grammar-based command search.  Will block until a command is recognized
-        and the resulting command string and score will be returned as a
-        2-tuple.
+    def _command_confidence(self, hyp):
+        # Confidence of a command hypothesis: the lower of its lattice
+        # posterior probability and its share of the likelihood of the N-best
+        # list of distinct hypotheses.  A command that sounds much like other
+        # commands (or noise that sounds like several) gets a low confidence.
+        logmath = self._decoder.get_logmath()
+        posterior = logmath.exp(hyp.prob)
+        scores = []
+        seen = set()
+        for best in self._decoder.nbest():
+            text = best.hypstr.strip()
+            if text in seen:
+                continue
+            seen.add(text)
+            scores.append(logmath.log_to_ln(best.score))
+            if len(scores) >= config.COMMAND_NBEST:
+                break
+        if not scores:
+            return posterior
+        return min(posterior, confidence.nbest_posterior(scores))
+
+    def listen_keyword(self, trace=tracing.NULL_TRACE):
+        """Listen for a keyword to be heard from the microphone using the
+        keyword spotting search.  Will block until a keyword is spotted and
+        the resulting keyword string and confidence (0 to 1.0) will be
+        returned as a 2-tuple.  Processing of the audio the keyword was
+        detected in is recorded as a span of the specified tracing.Trace.
+        """
+        keywords = self.spot_keywords(self._read_microphone(), trace)
+        try:
+            return next(keywords)
+        finally:
+            keywords.close()
+
+    def _read_microphone(self):
+        # Generate buffers of audio from the microphone, forever.
+        while True:
+            # Wait at most a short time so a stalled microphone doesn't hang.
+            buf = self._mic.read(timeout=1.0)
+            if buf is not None:
+                yield buf
+
+    def spot_keywords(self, buffers, trace=tracing.NULL_TRACE):
+        """Generate a 2-tuple of keyword and confidence for every keyword
+        heard in an iterable of audio buffers.  If the recognizer has a voice
+        activity gate only audio it passes is decoded.
         """
         # Switch Pocketsphinx to continuous keyword spotting search.
         self._decoder.set_search('keyword')
         self._decoder.start_utt()
-        while True:
-            # Grab data from the microphone and process it with Pocketsphinx.
-            buf = self._mic.read()
-            if buf is None:
-                continue
-            self._decoder.process_raw(buf, False, False)
-            # If a keyword was detected return it.
-            hyp = self._decoder.hyp()
-            if hyp is not None:
-                keyword = hyp.hypstr.strip()
+        in_utterance = True
+        try:
+            for buf in buffers:
+                self.keyword_samples += len(buf) // 2
+                periods = (buf,) if self._vad is None else self._vad.process(buf)
+                for period in periods:
+                    process_start = time.monotonic()
+                    cpu_start = time.clock_gettime(time.CLOCK_THREAD_CPUTIME_ID)
+                    self._decoder.process_raw(period, False, False)
+                    hyp = self._decoder.hyp()
+                    self.keyword_decode_cpu_s += \
+                        time.clock_gettime(time.CLOCK_THREAD_CPUTIME_ID) - cpu_start
+                    self.keyword_decoded_samples += len(period) // 2
+                    # If a keyword was detected return it and start over.
+                    if hyp is not None:
+                        keyword = hyp.hypstr.strip()
+                        result = (keyword, confidence.keyword_confidence(self._decoder, keyword))
+                        self._decoder.end_utt()
+                        in_utterance = False
+                        trace.add_span('keyword', process_start, time.monotonic())
+                        yield result
+                        self._decoder.start_utt()
+                        in_utterance = True
+        finally:
+            if in_utterance:
                 self._decoder.end_utt()
-                return keyword
+
+    def keyword_stats(self):
+        """Return a dict of keyword spotting statistics: seconds of audio
+        heard and decoded, CPU seconds spent decoding, and the estimated CPU
+        seconds saved by the voice activity gate skipping silence.
+        """
+        rate = float(config.SAMPLE_RATE_HZ)
+        skipped = self.keyword_samples - self.keyword_decoded_samples
+        per_sample = self.keyword_decode_cpu_s / self.keyword_decoded_samples \
+            if self.keyword_decoded_samples else 0.0
+        return {
+            'heard_s':          self.keyword_samples / rate,
+            'decoded_s':        self.keyword_decoded_samples / rate,
+            'decode_cpu_s':     self.keyword_decode_cpu_s,
+            'saved_cpu_s':      max(skipped, 0) * per_sample
+        }
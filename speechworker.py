@@ -0,0 +1,251 @@
+# Jackson: Voice-controlled Jacket
+# Speech recognition in a separate worker process.  Pocketsphinx decoding
+# holds the GIL for the length of every process_raw call, which can delay the
+# LED animation thread, so speech recognition can instead run in its own
+# process.  Audio is passed to the worker through a ring of samples in shared
+# memory and recognized keywords and commands come back over a queue.
+# SpeechProcess has the same interface as speech.SpeechRecognizer so Jackson
+# can use either (see SPEECH_PROCESS in config.py).  Needs Python 3.8 or
+# later for multiprocessing.shared_memory.
+# Author: Tony DiCola
+# License: MIT https://opensource.org/licenses/MIT
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+
+import numpy as np
+
+import config
+import tracing
+
+
+logger = logging.getLogger(__name__)
+
+
+class SharedAudio:
+
+    _HEADER = 8  # Bytes before the samples, the int64 count of samples written.
+
+    def __init__(self, capacity, name=None, lock=None):
+        """Create a ring of the last capacity signed 16-bit samples in shared
+        memory, or attach to an existing one by name.  There must be one
+        writer, and any number of readers which track their own position.
+        The lock (a multiprocessing.Condition) must be shared by every
+        process using the ring.
+        """
+        # Imported here so the rest of Jackson works on Python before 3.8.
+        from multiprocessing import shared_memory
+        self.capacity = capacity
+        size = self._HEADER + 2*capacity
+        if name is None:
+            self._memory = shared_memory.SharedMemory(create=True, size=size)
+            self._owner = True
+        else:
+            self._memory = shared_memory.SharedMemory(name=name)
+            self._owner = False
+        self.name = self._memory.name
+        self._written = np.ndarray(1, dtype=np.int64, buffer=self._memory.buf)
+        self._data = np.ndarray(capacity, dtype=np.int16, buffer=self._memory.buf,
+                                offset=self._HEADER)
+        if self._owner:
+            self._written[0] = 0
+        self.lock = lock if lock is not None else multiprocessing.Condition()
+
+    @property
+    def written(self):
+        """Total number of samples ever written to the ring."""
+        with self.lock:
+            return int(self._written[0])
+
+    def write(self, samples):
+        """Copy a block of samples (NumPy array or bytes-like object) into the
+        ring and wake up any waiting readers.
+        """
+        if not isinstance(samples, np.ndarray):
+            samples = np.frombuffer(samples, dtype=np.int16)
+        total = len(samples)
+        samples = samples[-self.capacity:]
+        # Only the writer changes the count so it can be read without the lock.
+        written = int(self._written[0])
+        start = (written + total - len(samples)) % self.capacity
+        first = min(len(samples), self.capacity - start)
+        self._data[start:start+first] = samples[:first]
+        self._data[:len(samples)-first] = samples[first:]
+        # The count is updated under the lock, a 64-bit store isn't atomic on
+        # 32-bit ARM.
+        with self.lock:
+            self._written[0] = written + total
+            self.lock.notify_all()
+
+    def read_into(self, out, position, timeout=None):
+        """Block until len(out) samples past position have been written and
+        copy them into the NumPy array out.  Returns a 2-tuple of the new
+        position and the number of samples dropped because the reader fell
+        more than the capacity behind, or (None, 0) if the timeout elapses
+        first.
+        """
+        count = len(out)
+        with self.lock:
+            if not self.lock.wait_for(lambda: self._written[0] - position >= count,
+                                      timeout):
+                return None, 0
+            written = int(self._written[0])
+        dropped = 0
+        if written - position > self.capacity - count:
+            # Too far behind, skip ahead leaving room for a period being written.
+            dropped = written - self.capacity + count - position
+            position += dropped
+        start = position % self.capacity
+        first = min(count, self.capacity - start)
+        out[:first] = self._data[start:start+first]
+        out[first:] = self._data[:count-first]
+        return position + count, dropped
+
+    def close(self):
+        """Detach from the shared memory, and free it if this is the ring
+        that created it.
+        """
+        # Views of the memory must be released before it can be closed.
+        self._written = self._data = None
+        self._memory.close()
+        if self._owner:
+            self._memory.unlink()
+
+
+class _SharedMicrophone:
+    # Microphone interface (see microphone.Microphone.read) over a SharedAudio
+    # ring, used in the worker process.
+
+    def __init__(self, shared, period_size):
+        self._shared = shared
+        self._position = shared.written
+        self._period = np.zeros(period_size, dtype=np.int16)
+        self._period_bytes = memoryview(self._period).cast('B').toreadonly()
+        self.dropped = 0
+
+    def read(self, timeout=None):
+        position, dropped = self._shared.read_into(self._period, self._position, timeout)
+        if position is None:
+            return None
+        self._position = position
+        self.dropped += dropped
+        return self._period_bytes
+
+
+def _worker(name, capacity, lock, period_size, actions, requests, results):
+    # Worker process main: create the speech recognizer and handle requests
+    # from Jackson's process until told to stop.
+    import commands
+    import grammar
+    import speech
+    import vad
+    shared = SharedAudio(capacity, name=name, lock=lock)
+    index = grammar.load_index(config.GRAMMAR_MODEL, 'command', actions,
+                               junk_rule='junk', cache_dir=config.CACHE_DIR)
+    junk = commands.Dispatcher(junk=index.junk)
+    recognizer = speech.SpeechRecognizer(_SharedMicrophone(shared, period_size),
+        is_complete=lambda command: index.is_complete(' '.join(junk.clean(command))),
+        vad=vad.from_config(config.SAMPLE_RATE_HZ))
+    tracer = tracing.Tracer()
+    results.put(('ready', dict(recognizer.startup_times)))
+    while True:
+        request = requests.get()
+        if request is None:
+            break
+        # Traces are recorded here and their spans sent back, the monotonic
+        # clock is the same for every process.
+        trace = tracer.start(request) if request in ('keyword', 'command') else None
+        if request == 'keyword':
+            result = recognizer.listen_keyword(trace)
+        elif request == 'command':
+            result = recognizer.listen_command(trace)
+        else:
+            result = recognizer.keyword_stats()
+        spans = (trace.spans, trace.attributes) if trace is not None else ([], {})
+        results.put((request, result, spans))
+    shared.close()
+
+
+class SpeechProcess:
+
+    def __init__(self, microphone, actions, start_timeout_s=60.0):
+        """Start a worker process that recognizes speech from the specified
+        microphone.microphone instance.  Actions is the list of command tags
+        of the grammar (see grammar.build_index).  Blocks until the worker's
+        speech recognizer is set up.
+        """
+        self.period_size = microphone.period_size
+        # Spawn a fresh interpreter instead of forking this process, which
+        # has threads (like the microphone capture) that don't survive a fork.
+        context = multiprocessing.get_context('spawn')
+        capacity = int(config.MIC_BUFFER_S*microphone.sample_rate)
+        self._shared = SharedAudio(capacity, lock=context.Condition())
+        self._requests = context.Queue()
+        self._results = context.Queue()
+        self._lock = threading.Lock()
+        self._process = context.Process(target=_worker, args=(self._shared.name,
+            capacity, self._shared.lock, self.period_size, list(actions),
+            self._requests, self._results))
+        self._process.daemon = True
+        self._process.start()
+        # Forward audio from the microphone into shared memory.
+        self._forward_thread = threading.Thread(target=self._forward,
+                                                args=(microphone.reader(),))
+        self._forward_thread.daemon = True
+        self._forward_thread.start()
+        start = time.monotonic()
+        try:
+            kind, times = self._results.get(timeout=start_timeout_s)
+        except queue.Empty:
+            raise RuntimeError('Speech worker process failed to start')
+        self.startup_times = times
+        self.startup_times['worker'] = time.monotonic() - start
+
+    def _forward(self, reader):
+        period = np.zeros(self.period_size, dtype=np.int16)
+        while True:
+            if reader.read_into(period, timeout=1.0):
+                self._shared.write(period)
+
+    def _request(self, kind, trace=tracing.NULL_TRACE):
+        # Send a request to the worker and wait for its result.  Only one
+        # request is outstanding at a time.
+        with self._lock:
+            self._requests.put(kind)
+            while True:
+                try:
+                    result_kind, result, (spans, attributes) = self._results.get(timeout=1.0)
+                    break
+                except queue.Empty:
+                    if not self._process.is_alive():
+                        raise RuntimeError('Speech worker process exited')
+        received = time.monotonic()
+        for span in spans:
+            trace.add_span(*span)
+        trace.set(**attributes)
+        if spans:
+            # Time to get the result back from the worker.
+            trace.add_span('result', spans[-1][2], received)
+        return result
+
+    def listen_keyword(self, trace=tracing.NULL_TRACE):
+        """Listen for a keyword (see speech.SpeechRecognizer.listen_keyword)."""
+        return self._request('keyword', trace)
+
+    def listen_command(self, trace=tracing.NULL_TRACE):
+        """Listen for a command (see speech.SpeechRecognizer.listen_command)."""
+        return self._request('command', trace)
+
+    def keyword_stats(self):
+        """Return the worker's keyword spotting statistics (see
+        speech.SpeechRecognizer.keyword_stats).
+        """
+        return self._request('stats')
+
+    def close(self):
+        """Stop the worker process and free the shared memory."""
+        self._requests.put(None)
+        self._process.join(5.0)
+        self._shared.close()
@@ -0,0 +1,54 @@
+# Jackson: Voice-controlled Jacket
+# Jackson's state (happiness, brightness, hue) as an immutable snapshot.
+# Writers swap in a new snapshot and readers (like the render loop) grab the
+# current snapshot once without taking any lock.
+# Author: Tony DiCola
+# License: MIT https://opensource.org/licenses/MIT
+import collections
+import threading
+
+import utils
+
+
+class State(collections.namedtuple('State', ['happiness', 'brightness', 'hue'])):
+    """Immutable snapshot of Jackson's state.  Happiness goes from -3 to 3,
+    brightness from 0 to 3 and hue is in degrees from 0 to 360.
+    """
+    __slots__ = ()
+
+    @property
+    def happiness_freq(self):
+        """Express happiness as a frequency value for animations."""
+        return utils.lerp(self.happiness, -3.0, 3.0, 1.0/4.0, 2.0)
+
+    @property
+    def brightness_hsv(self):
+        """Express brightness as a HSV value (0 to 1.0)."""
+        return utils.lerp(self.brightness, 0.0, 3.0, 0.0, 1.0)
+
+
+class StateStore:
+
+    def __init__(self, state, lock=None):
+        """Create a store holding the specified initial State snapshot.  A
+        lock to serialize writers can optionally be provided.
+        """
+        self._lock = lock if lock is not None else threading.Lock()
+        self._state = state
+
+    @property
+    def snapshot(self):
+        """The current State snapshot.  Reading it never takes a lock, the
+        snapshot is replaced as a whole (a single atomic reference swap) by
+        update.
+        """
+        return self._state
+
+    def update(self, **changes):
+        """Replace the snapshot with a copy that has the specified fields
+        changed and return the new snapshot.  Writers are serialized so
+        concurrent updates of different fields aren't lost.
+        """
+        with self._lock:
+            self._state = self._state._replace(**changes)
+            return self._state
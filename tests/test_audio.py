@@ -0,0 +1,93 @@
+import os
+import tempfile
+import unittest
+import wave
+
+import numpy as np
+
+import audio
+
+
+def write_wav(path, samples, sample_rate=16000):
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(np.asarray(samples, dtype='<i2').tobytes())
+
+
+def read_all(source):
+    samples = []
+    while True:
+        buf = source.read()
+        if buf is None:
+            return samples
+        samples.extend(np.frombuffer(buf, dtype=np.int16).tolist())
+
+
+class FileSourceTests(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._dir.cleanup)
+
+    def test_wav_file(self):
+        path = os.path.join(self._dir.name, 'test.wav')
+        write_wav(path, range(1000), sample_rate=8000)
+        source = audio.FileSource(path, period_size=300, realtime=False)
+        self.assertEqual(source.sample_rate, 8000)
+        self.assertAlmostEqual(source.duration_s, 1000/8000.0)
+        self.assertEqual(read_all(source), list(range(1000)))
+        source.close()
+
+    def test_wav_file_wrong_sample_rate_raises(self):
+        path = os.path.join(self._dir.name, 'test.wav')
+        write_wav(path, range(10), sample_rate=8000)
+        with self.assertRaises(ValueError):
+            audio.FileSource(path, sample_rate=16000)
+
+    def test_raw_file(self):
+        path = os.path.join(self._dir.name, 'test.raw')
+        with open(path, 'wb') as raw:
+            raw.write(np.arange(-5, 5, dtype='<i2').tobytes())
+        source = audio.FileSource(path, sample_rate=16000, period_size=4,
+                                  realtime=False)
+        self.assertEqual(read_all(source), list(range(-5, 5)))
+
+    def test_raw_file_requires_sample_rate(self):
+        path = os.path.join(self._dir.name, 'test.raw')
+        with open(path, 'wb') as raw:
+            raw.write(bytes(4))
+        with self.assertRaises(ValueError):
+            audio.FileSource(path)
+
+    def test_loop(self):
+        path = os.path.join(self._dir.name, 'test.wav')
+        write_wav(path, range(4))
+        source = audio.FileSource(path, period_size=4, realtime=False, loop=True)
+        for _ in range(3):
+            self.assertEqual(np.frombuffer(source.read(), dtype=np.int16).tolist(),
+                             [0, 1, 2, 3])
+
+
+class SyntheticSourceTests(unittest.TestCase):
+
+    def test_tone_duration_and_amplitude(self):
+        source = audio.ToneSource(1000.0, amplitude=0.5, sample_rate=8000,
+                                  period_size=256, realtime=False,
+                                  duration_s=0.1)
+        samples = np.array(read_all(source))
+        self.assertEqual(len(samples), 800)
+        self.assertAlmostEqual(samples.max(), 16383, delta=2)
+
+    def test_tone_frequency(self):
+        source = audio.ToneSource(1000.0, sample_rate=8000, period_size=800,
+                                  realtime=False)
+        samples = np.frombuffer(source.read(), dtype=np.int16)
+        peak = np.argmax(np.abs(np.fft.rfft(samples)))
+        self.assertEqual(peak * 8000 / 800, 1000)
+
+    def test_noise_is_repeatable_with_seed(self):
+        a = audio.NoiseSource(seed=1, realtime=False, duration_s=0.05)
+        b = audio.NoiseSource(seed=1, realtime=False, duration_s=0.05)
+        self.assertEqual(read_all(a), read_all(b))
@@ -0,0 +1,101 @@
+import math
+import unittest
+
+import numpy as np
+
+import baking
+import clock
+import color
+import state
+
+
+def wave(t, state):
+    # Values of 8 pixels that repeat every second at a brightness.
+    return state.brightness_hsv * (0.5 + 0.5*np.sin(2.0*math.pi*t + np.arange(8)))
+
+
+def baked(cache, rate_hz=20.0):
+    return baking.Baked('wave', wave, lambda state: state.hue, lambda state: 1.0,
+                        lambda state: state.brightness, color.hsv_table(), rate_hz, cache)
+
+
+class TableCacheTests(unittest.TestCase):
+
+    def test_builds_once(self):
+        cache = baking.TableCache()
+        builds = []
+        def build():
+            builds.append(1)
+            return np.zeros(10, dtype=np.uint8)
+        first = cache.get('a', build)
+        self.assertIs(cache.get('a', build), first)
+        self.assertEqual(len(builds), 1)
+        self.assertEqual(cache.report(), {'tables': 1, 'bytes': 10, 'hits': 1,
+                                          'builds': 1, 'evictions': 0})
+
+    def test_drops_least_recently_used(self):
+        cache = baking.TableCache(max_bytes=25)
+        table = lambda: np.zeros(10, dtype=np.uint8)
+        cache.get('a', table)
+        cache.get('b', table)
+        cache.get('a', table)
+        cache.get('c', table)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.bytes, 20)
+        self.assertEqual(cache.evictions, 1)
+        builds = cache.builds
+        cache.get('a', table)
+        self.assertEqual(cache.builds, builds)
+        cache.get('b', table)
+        self.assertEqual(cache.builds, builds + 1)
+
+    def test_keeps_table_bigger_than_limit(self):
+        cache = baking.TableCache(max_bytes=5)
+        cache.get('a', lambda: np.zeros(10, dtype=np.uint8))
+        self.assertEqual(len(cache), 1)
+
+
+class BakedTests(unittest.TestCase):
+
+    def test_matches_live_animation_at_sample_times(self):
+        colors = color.hsv_table()
+        live = baking.live(wave, lambda state: state.hue, colors)
+        animation = baked(baking.TableCache())
+        s = state.State(0, 3, 200.0)
+        for k in range(20):
+            ft = clock.FrameTime(k / 20.0, 0.05)
+            np.testing.assert_array_equal(animation(ft, s), live(ft, s))
+
+    def test_table_is_one_period_of_uint8(self):
+        table = baked(baking.TableCache()).table(state.State(0, 2, 0.0))
+        self.assertEqual(table.shape, (20, 8))
+        self.assertEqual(table.dtype, np.uint8)
+
+    def test_hue_changes_without_rebuilding(self):
+        cache = baking.TableCache()
+        animation = baked(cache)
+        for hue in range(0, 360, 10):
+            animation(clock.FrameTime(0.3, 0.05), state.State(0, 2, float(hue)))
+        self.assertEqual(cache.builds, 1)
+
+    def test_rebuilds_for_new_key(self):
+        cache = baking.TableCache()
+        animation = baked(cache)
+        ft = clock.FrameTime(0.3, 0.05)
+        animation(ft, state.State(0, 2, 0.0))
+        animation(ft, state.State(0, 3, 0.0))
+        animation(ft, state.State(0, 2, 0.0))
+        self.assertEqual(cache.builds, 2)
+        # Same name and key share tables.
+        baked(cache)(ft, state.State(0, 3, 0.0))
+        self.assertEqual(cache.builds, 2)
+
+    def test_wraps_around_period(self):
+        animation = baked(baking.TableCache())
+        s = state.State(0, 3, 0.0)
+        np.testing.assert_array_equal(animation(clock.FrameTime(0.25, 0.05), s),
+                                      animation(clock.FrameTime(3.25, 0.05), s))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import os
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+
+import cache
+
+
+class CacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_digest_of_file_contents(self):
+        path = os.path.join(self.directory, 'input')
+        with open(path, 'wb') as outfile:
+            outfile.write(b'abc')
+        self.assertEqual(cache.digest('file:' + path), cache.digest(b'abc'))
+        self.assertNotEqual(cache.digest('ab', 'c'), cache.digest('a', 'bc'))
+
+    def test_load_builds_once(self):
+        build = unittest.mock.Mock(return_value={'value': 1})
+        self.assertEqual(cache.load(self.directory, 'test', 'key', build), {'value': 1})
+        self.assertEqual(cache.load(self.directory, 'test', 'key', build), {'value': 1})
+        build.assert_called_once_with()
+
+    def test_new_key_rebuilds_and_removes_stale(self):
+        cache.load(self.directory, 'test', 'key1', lambda: 1)
+        self.assertEqual(cache.load(self.directory, 'test', 'key2', lambda: 2), 2)
+        self.assertEqual(os.listdir(self.directory), [os.path.basename(
+            cache.path(self.directory, 'test', 'key2'))])
+
+    def test_corrupt_entry_is_rebuilt(self):
+        cache.load(self.directory, 'test', 'key', lambda: 1)
+        with open(cache.path(self.directory, 'test', 'key'), 'wb') as outfile:
+            outfile.write(b'garbage')
+        with self.assertLogs('cache', 'WARNING'):
+            self.assertEqual(cache.load(self.directory, 'test', 'key', lambda: 2), 2)
+        self.assertEqual(cache.load(self.directory, 'test', 'key', lambda: 3), 2)
+
+    def test_disabled(self):
+        build = unittest.mock.Mock(return_value=1)
+        cache.load(None, 'test', 'key', build)
+        cache.load(None, 'test', 'key', build)
+        self.assertEqual(build.call_count, 2)
+
+    def test_load_file(self):
+        build = unittest.mock.Mock(return_value='text')
+        path = cache.load_file(self.directory, 'test', 'key', build, '.txt')
+        self.assertTrue(path.endswith('.txt'))
+        self.assertEqual(cache.load_file(self.directory, 'test', 'key', build, '.txt'), path)
+        build.assert_called_once_with()
+        with open(path) as infile:
+            self.assertEqual(infile.read(), 'text')
@@ -0,0 +1,35 @@
+import unittest
+
+import clock
+
+
+class TimelineTests(unittest.TestCase):
+
+    def test_timeline_starts_at_zero_and_advances_by_delta(self):
+        times = []
+        timeline = clock.Timeline(lambda ft, state: times.append(ft))
+        timeline(clock.FrameTime(1000.0, 0.5))
+        timeline(clock.FrameTime(1000.5, 0.25))
+        self.assertEqual(times, [clock.FrameTime(0.5, 0.5),
+                                 clock.FrameTime(0.75, 0.25)])
+
+    def test_timeline_is_paused_when_not_rendered(self):
+        timeline = clock.Timeline(lambda ft, state: ft.t)
+        self.assertEqual(timeline(clock.FrameTime(0.0, 1.0)), 1.0)
+        # Ten seconds pass while another animation is on top.
+        self.assertEqual(timeline(clock.FrameTime(10.0, 1.0)), 2.0)
+
+    def test_nested_timelines_keep_their_own_time(self):
+        inner = clock.Timeline(lambda ft, state: ft.t, t=5.0)
+        outer = clock.Timeline(inner)
+        self.assertEqual(outer(clock.FrameTime(0.0, 1.0)), 6.0)
+        self.assertEqual(outer.t, 1.0)
+
+
+class FrameTimesTests(unittest.TestCase):
+
+    def test_frame_times(self):
+        times = list(clock.frame_times(4.0, 3, t=1.0))
+        self.assertEqual(times, [clock.FrameTime(1.0, 0.0),
+                                 clock.FrameTime(1.25, 0.25),
+                                 clock.FrameTime(1.5, 0.25)])
@@ -1,5 +1,7 @@
 import unittest
 
+import numpy as np
+
 import color
 
 
@@ -26,3 +28,78 @@ class ColorTests(unittest.TestCase):
     def test_hsv_to_rgb_zero_value(self):
         val = color.hsv_to_rgb(0.0, 1.0, 0.0)
         self.assertEqual(val, 0)
+
+    def test_lerp_array(self):
+        val = color.lerp_array(0.5, 0.0, 1.0, [0x000000, 0xFF0000], 0xFFFFFF)
+        self.assertEqual(val.tolist(), [0x7F7F7F, 0xFF7F7F])
+
+    def test_hsv_to_rgb_array_matches_scalar(self):
+        hues = [0.0, 45.0, 90.0, 180.0, 270.0, 359.0]
+        vals = color.hsv_to_rgb_array(hues, 1.0, 0.5)
+        self.assertEqual(vals.tolist(),
+                         [color.hsv_to_rgb(h, 1.0, 0.5) for h in hues])
+
+    def test_compose_array(self):
+        val = color.compose_array([1, 0xFF], [2, 0], [3, 0x80])
+        self.assertEqual(val.dtype, np.uint32)
+        self.assertEqual(val.tolist(), [0x010203, 0xFF0080])
+
+    def test_decompose_array(self):
+        red, green, blue = color.decompose_array([0x010203, 0xFF0080])
+        self.assertEqual(red.tolist(), [1, 0xFF])
+        self.assertEqual(green.tolist(), [2, 0])
+        self.assertEqual(blue.tolist(), [3, 0x80])
+
+    def test_gamma_array_matches_gamma8(self):
+        val = color.gamma_array(np.arange(256))
+        self.assertEqual(val.tolist(), list(color.gamma8))
+
+    def test_lerp_array_matches_scalar(self):
+        rng = np.random.RandomState(0)
+        c0 = rng.randint(0, 0xFFFFFF, 500)
+        c1 = rng.randint(0, 0xFFFFFF, 500)
+        for x in (-0.5, 0.0, 0.1, 0.5, 0.99, 1.0, 1.5):
+            vals = color.lerp_array(x, 0.0, 1.0, c0, c1)
+            expected = [color.lerp(x, 0.0, 1.0, int(a), int(b))
+                        for a, b in zip(c0, c1)]
+            self.assertEqual(vals.tolist(), expected)
+
+    def test_hsv_to_rgb_array_matches_scalar_exhaustively(self):
+        hues = np.arange(0.0, 360.5, 0.5)
+        for s in (0.0, 0.25, 1.0):
+            for v in np.linspace(0.0, 1.0, 52):
+                vals = color.hsv_to_rgb_array(hues, s, v)
+                expected = [color.hsv_to_rgb(float(h), s, float(v))
+                            for h in hues]
+                self.assertEqual(vals.tolist(), expected)
+
+
+class HueValueTableTests(unittest.TestCase):
+
+    def test_lookup_matches_exact_color_on_table_entries(self):
+        table = color.HueValueTable(360, 256)
+        self.assertEqual(int(table.lookup(120.0, 1.0)),
+                         color.hsv_to_rgb(120.0, 1.0, 1.0))
+        self.assertEqual(int(table.lookup(0.0, 0.0)), 0)
+
+    def test_lookup_wraps_hue_and_clamps_value(self):
+        table = color.HueValueTable(360, 256)
+        self.assertEqual(int(table.lookup(360.0, 2.0)), 0xFF0000)
+        self.assertEqual(int(table.lookup(-360.0, -1.0)), 0)
+
+    def test_lookup_arrays(self):
+        table = color.HueValueTable(360, 256)
+        vals = table.lookup([0.0, 120.0, 240.0], 1.0)
+        self.assertEqual(vals.tolist(), [0xFF0000, 0x00FF00, 0x0000FF])
+
+    def test_nbytes(self):
+        table = color.HueValueTable(36, 16)
+        self.assertEqual(table.nbytes, 36*16*4)
+
+    def test_error_shrinks_with_resolution(self):
+        coarse, _ = color.HueValueTable(36, 16).error()
+        fine, _ = color.HueValueTable(360, 256).error()
+        self.assertLess(fine, coarse)
+
+    def test_hsv_table_is_shared(self):
+        self.assertIs(color.hsv_table(36, 16), color.hsv_table(36, 16))
@@ -1,7 +1,10 @@
+import os
+import random
 import unittest
 import unittest.mock
 
 import commands
+import grammar
 
 
 class CommandsDispatcherTests(unittest.TestCase):
@@ -63,3 +66,81 @@ class CommandsDispatcherTests(unittest.TestCase):
         dispatcher.register('test', callback)
         dispatcher.dispatch(None)
         callback.assert_not_called()
+
+    def test_junk_only_removed_on_word_boundaries(self):
+        dispatcher = commands.Dispatcher(junk=['to'])
+        callback = unittest.mock.Mock()
+        dispatcher.register('light up tomato', callback)
+        dispatcher.dispatch('light up to tomato')
+        callback.assert_called_once_with(('light', 'up', 'tomato'))
+
+    def test_multiple_word_junk_removed(self):
+        dispatcher = commands.Dispatcher(junk=['thank you', 'thanks'])
+        callback = unittest.mock.Mock()
+        dispatcher.register('test', callback)
+        dispatcher.dispatch('test thank you thanks')
+        callback.assert_called_once_with(('test',))
+
+    def test_longest_starts_with_wins(self):
+        dispatcher = commands.Dispatcher()
+        short = unittest.mock.Mock()
+        long = unittest.mock.Mock()
+        dispatcher.register_starts_with('test', short)
+        dispatcher.register_starts_with('test word', long)
+        dispatcher.dispatch('test word one')
+        long.assert_called_once_with(('test', 'word', 'one'))
+        short.assert_not_called()
+
+    def test_exact_wins_over_starts_with(self):
+        dispatcher = commands.Dispatcher()
+        starts_with = unittest.mock.Mock()
+        exact = unittest.mock.Mock()
+        dispatcher.register_starts_with('test', starts_with)
+        dispatcher.register('test word', exact)
+        dispatcher.dispatch('test word')
+        exact.assert_called_once_with(('test', 'word'))
+        starts_with.assert_not_called()
+
+    def test_unmatched_command_does_not_call_starts_with(self):
+        dispatcher = commands.Dispatcher()
+        callback = unittest.mock.Mock()
+        dispatcher.register_starts_with('test', callback)
+        dispatcher.register_starts_with('other', callback)
+        dispatcher.dispatch('foo bar')
+        callback.assert_not_called()
+
+    def test_register_index_dispatches_action_values(self):
+        gram = grammar.parse('''
+            grammar test;
+            public <command> = [<junk>] (<color> | set color <color> | brighter {step=1});
+            <junk> = please | thank you;
+            <color> = red {hue=0} | blue {hue=210};
+        ''')
+        index = grammar.build_index(gram, 'command', ['hue', 'step'], junk_rule='junk')
+        dispatcher = commands.Dispatcher(junk=index.junk)
+        hue = unittest.mock.Mock()
+        step = unittest.mock.Mock()
+        dispatcher.register_index(index, {'hue': hue, 'step': step})
+        dispatcher.dispatch('please set color blue thank you')
+        hue.assert_called_once_with(('set', 'color', 'blue'), 210)
+        dispatcher.dispatch('brighter')
+        step.assert_called_once_with(('brighter',), 1)
+
+    def test_register_index_requires_callbacks(self):
+        index = grammar.Index({'red': ('hue', 0), 'wink': ('animation', 'wink')}, [])
+        dispatcher = commands.Dispatcher()
+        with self.assertRaises(ValueError):
+            dispatcher.register_index(index, {'hue': unittest.mock.Mock()})
+
+    def test_every_grammar_command_dispatches(self):
+        path = os.path.join(os.path.dirname(__file__), '..', 'commands.gram')
+        keys = ['animation', 'hue', 'brightness', 'brightness_step']
+        index = grammar.build_index(grammar.load(path), 'command', keys, junk_rule='junk')
+        dispatcher = commands.Dispatcher(junk=index.junk)
+        callback = unittest.mock.Mock()
+        dispatcher.register_index(index, dict.fromkeys(keys, callback))
+        gram = grammar.load(path)
+        rng = random.Random(0)
+        for i in range(200):
+            dispatcher.dispatch(' '.join(gram.sample('command', rng)))
+        self.assertEqual(callback.call_count, 200)
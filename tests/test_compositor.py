@@ -0,0 +1,227 @@
+import math
+import unittest
+
+import numpy as np
+
+import clock
+import compositor
+
+
+def solid(color, n=4):
+    return lambda ft, state: np.full(n, color, dtype=np.uint32)
+
+
+def render(comp, dt=0.1):
+    return comp.render(clock.FrameTime(0.0, dt), None)
+
+
+class EnvelopeTests(unittest.TestCase):
+
+    def test_default_is_opaque_forever(self):
+        envelope = compositor.Envelope()
+        self.assertEqual(envelope(0.0), 1.0)
+        self.assertEqual(envelope(1e9), 1.0)
+        self.assertEqual(envelope.end_s, math.inf)
+
+    def test_delay_fade_in_hold_fade_out(self):
+        envelope = compositor.Envelope(delay_s=1.0, fade_in_s=2.0, hold_s=1.0,
+                                       fade_out_s=2.0, opacity=0.5)
+        self.assertEqual(envelope(0.5), 0.0)
+        self.assertAlmostEqual(envelope(2.0), 0.25)
+        self.assertEqual(envelope(3.5), 0.5)
+        self.assertAlmostEqual(envelope(5.0), 0.25)
+        self.assertEqual(envelope(6.0), 0.0)
+        self.assertEqual(envelope.end_s, 6.0)
+
+
+class CompositorTests(unittest.TestCase):
+
+    def test_no_layers_renders_none(self):
+        self.assertIsNone(render(compositor.Compositor(4)))
+
+    def test_opaque_top_layer_is_returned_as_is(self):
+        comp = compositor.Compositor(4)
+        comp.push(solid(0x123456))
+        top = np.arange(4, dtype=np.uint32)
+        comp.push(lambda ft, state: top)
+        self.assertIs(render(comp), top)
+
+    def test_layers_below_opaque_layer_are_not_rendered(self):
+        calls = []
+        def below(ft, state):
+            calls.append(ft)
+            return np.zeros(4, dtype=np.uint32)
+        comp = compositor.Compositor(4)
+        comp.push(below)
+        comp.push(solid(0xFFFFFF))
+        render(comp)
+        self.assertEqual(calls, [])
+
+    def test_layer_time_starts_at_push(self):
+        times = []
+        def animation(ft, state):
+            times.append(ft.t)
+            return np.zeros(4, dtype=np.uint32)
+        comp = compositor.Compositor(4)
+        render(comp, 1.0)
+        comp.push(animation)
+        render(comp, 0.5)
+        render(comp, 0.25)
+        self.assertEqual(times, [0.5, 0.75])
+
+    def test_layer_under_opaque_layer_is_paused(self):
+        times = []
+        def below(ft, state):
+            times.append(ft.t)
+            return np.zeros(4, dtype=np.uint32)
+        comp = compositor.Compositor(4)
+        comp.push(below)
+        render(comp, 0.25)
+        comp.push(solid(0xFFFFFF), envelope=compositor.Envelope(hold_s=0.3))
+        render(comp, 0.125)
+        render(comp, 0.125)
+        render(comp, 0.25)
+        self.assertEqual(times, [0.25, 0.5])
+
+    def test_finished_animation_renders_each_layer_once(self):
+        calls = []
+        def below(ft, state):
+            calls.append(ft)
+            return np.zeros(4, dtype=np.uint32)
+        comp = compositor.Compositor(4)
+        comp.push(below)
+        comp.push(lambda ft, state: calls.append(ft) or np.zeros(4, dtype=np.uint32),
+                  blend=compositor.ADD)
+        comp.push(lambda ft, state: None, envelope=compositor.Envelope(hold_s=1.0))
+        render(comp)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(len(comp), 2)
+
+    def test_opacity_blends_with_layer_below(self):
+        comp = compositor.Compositor(4)
+        comp.push(solid(0x000000))
+        comp.push(solid(0xC8C8C8), envelope=compositor.Envelope(opacity=0.5))
+        np.testing.assert_array_equal(render(comp), np.full(4, 0x646464, dtype=np.uint32))
+
+    def test_blend_modes(self):
+        comp = compositor.Compositor(1)
+        comp.push(solid(0x301020, 1))
+        comp.push(solid(0xF000F0, 1), blend=compositor.ADD)
+        self.assertEqual(int(render(comp)[0]), 0xFF10FF)
+        comp = compositor.Compositor(1)
+        comp.push(solid(0x801020, 1))
+        comp.push(solid(0x408080, 1), blend=compositor.MAX)
+        self.assertEqual(int(render(comp)[0]), 0x808080)
+        comp = compositor.Compositor(1)
+        comp.push(solid(0xFF8000, 1))
+        comp.push(solid(0x80FFFF, 1), blend=compositor.MULTIPLY)
+        self.assertEqual(int(render(comp)[0]), 0x808000)
+
+    def test_unknown_blend_mode(self):
+        with self.assertRaises(ValueError):
+            compositor.Compositor(4).push(solid(0), blend='overlay')
+
+    def test_expired_layers_are_dropped(self):
+        comp = compositor.Compositor(4)
+        comp.push(solid(0x0000FF))
+        comp.push(solid(0xFF0000), envelope=compositor.Envelope(hold_s=0.25))
+        self.assertEqual(int(render(comp)[0]), 0xFF0000)
+        self.assertEqual(int(render(comp)[0]), 0xFF0000)
+        self.assertEqual(int(render(comp)[0]), 0x0000FF)
+        self.assertEqual(len(comp), 1)
+
+    def test_finished_animation_shows_layer_below_same_frame(self):
+        comp = compositor.Compositor(4)
+        comp.push(solid(0x0000FF))
+        comp.push(lambda ft, state: None, envelope=compositor.Envelope(hold_s=1.0))
+        self.assertEqual(int(render(comp)[0]), 0x0000FF)
+        self.assertEqual(len(comp), 1)
+
+    def test_delayed_layer_is_invisible(self):
+        comp = compositor.Compositor(4)
+        comp.push(solid(0x0000FF))
+        comp.push(solid(0xFF0000), envelope=compositor.Envelope(delay_s=0.15))
+        self.assertEqual(int(render(comp)[0]), 0x0000FF)
+        self.assertEqual(int(render(comp)[0]), 0xFF0000)
+
+    def test_fade_out(self):
+        comp = compositor.Compositor(1)
+        comp.push(solid(0x000000, 1))
+        layer = comp.push(solid(0xC80000, 1), envelope=compositor.Envelope(hold_s=10.0))
+        render(comp)
+        layer.fade_out(1.0)
+        self.assertEqual(int(render(comp, 0.5)[0]), 0x640000)
+        render(comp, 0.5)
+        self.assertEqual(len(comp), 1)
+
+    def test_remove_and_clear(self):
+        comp = compositor.Compositor(4)
+        layer = comp.push(solid(1))
+        comp.push(solid(2))
+        comp.remove(layer)
+        self.assertEqual(len(comp), 1)
+        comp.clear()
+        self.assertEqual(comp.layers, ())
+
+
+class BoundTests(unittest.TestCase):
+
+    def test_same_kind_push_replaces_layer(self):
+        comp = compositor.Compositor(4)
+        comp.push(solid(1), kind='idle')
+        comp.push(solid(2), envelope=compositor.Envelope(hold_s=1.0), kind='mood')
+        layer = comp.push(solid(3), envelope=compositor.Envelope(hold_s=1.0), kind='mood')
+        self.assertEqual([l.kind for l in comp.layers], ['idle', 'mood'])
+        self.assertIs(comp.layers[-1], layer)
+        self.assertEqual(comp.report()['coalesced'], 1)
+
+    def test_layers_under_opaque_forever_layer_are_evicted(self):
+        comp = compositor.Compositor(4)
+        comp.push(solid(1))
+        comp.push(solid(2), envelope=compositor.Envelope(hold_s=1.0))
+        comp.push(solid(3), blend=compositor.ADD)
+        self.assertEqual(len(comp), 3)
+        top = comp.push(solid(4))
+        self.assertEqual(comp.layers, (top,))
+        self.assertEqual(comp.report()['evicted'], 3)
+
+    def test_layers_are_kept_under_layers_that_end_or_blend(self):
+        comp = compositor.Compositor(4)
+        comp.push(solid(1))
+        comp.push(solid(2), envelope=compositor.Envelope(hold_s=1.0))
+        comp.push(solid(3), envelope=compositor.Envelope(opacity=0.5))
+        comp.push(solid(4), envelope=compositor.Envelope(fade_in_s=1.0))
+        self.assertEqual(len(comp), 4)
+
+    def test_layer_covers_once_faded_in(self):
+        comp = compositor.Compositor(4)
+        comp.push(solid(1))
+        comp.push(solid(2), envelope=compositor.Envelope(fade_in_s=0.15))
+        render(comp)
+        self.assertEqual(len(comp), 2)
+        render(comp)
+        self.assertEqual(len(comp), 1)
+
+    def test_oldest_ending_layers_dropped_past_maximum(self):
+        comp = compositor.Compositor(4, max_layers=3)
+        base = comp.push(solid(1))
+        for i in range(5):
+            comp.push(solid(i), envelope=compositor.Envelope(hold_s=10.0 + i))
+        self.assertEqual(len(comp), 3)
+        self.assertIs(comp.layers[0], base)
+        self.assertEqual([l.envelope.hold_s for l in comp.layers[1:]], [13.0, 14.0])
+
+    def test_report(self):
+        comp = compositor.Compositor(4)
+        phases = np.zeros(1000)
+        comp.push(lambda ft, state: phases, kind='idle')
+        report = comp.report()
+        self.assertEqual(report['depth'], 1)
+        self.assertEqual(report['max_depth'], 1)
+        self.assertEqual(report['kinds'], ['idle'])
+        self.assertGreaterEqual(report['bytes'], phases.nbytes)
+        self.assertEqual(report['pushed'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
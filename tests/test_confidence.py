@@ -0,0 +1,99 @@
+import math
+import unittest
+
+import confidence
+
+
+class FakeSegment:
+
+    def __init__(self, word, prob, start_frame, end_frame):
+        self.word = word
+        self.prob = prob
+        self.start_frame = start_frame
+        self.end_frame = end_frame
+
+
+class FakeLogMath:
+
+    def log_to_ln(self, value):
+        # Pocketsphinx log values are in base 1.0001.
+        return value * math.log(1.0001)
+
+
+class FakeDecoder:
+    # A keyword spotting decoder: segments with keyword vs phone loop scores.
+
+    def __init__(self, segments):
+        self.segments = segments
+
+    def seg(self):
+        return iter(self.segments)
+
+    def get_logmath(self):
+        return FakeLogMath()
+
+
+class ConfidenceTests(unittest.TestCase):
+
+    def test_nbest_posterior(self):
+        self.assertEqual(confidence.nbest_posterior([]), 0.0)
+        self.assertEqual(confidence.nbest_posterior([-100.0]), 1.0)
+        self.assertAlmostEqual(confidence.nbest_posterior([-100.0, -100.0]), 0.5)
+        self.assertAlmostEqual(confidence.nbest_posterior([-10.0, -10.0 - math.log(3.0)]), 0.75)
+        # Far less likely alternatives barely matter.
+        self.assertGreater(confidence.nbest_posterior([-10.0, -60.0, -80.0]), 0.999)
+
+    def test_per_frame(self):
+        self.assertAlmostEqual(confidence.per_frame(-20.0, 10), math.exp(-2.0))
+        self.assertEqual(confidence.per_frame(5.0, 10), 1.0)
+        self.assertAlmostEqual(confidence.per_frame(-2.0, 0), math.exp(-2.0))
+
+    def test_keyword_confidence(self):
+        frames = 50
+        ln = math.log(1.0001)
+        strong = FakeDecoder([FakeSegment('<sil>', -5000, 0, 9),
+                              FakeSegment('yo jackson', int(-0.1 * frames / ln), 10, 59)])
+        weak = FakeDecoder([FakeSegment('yo jackson', int(-3.0 * frames / ln), 10, 59)])
+        self.assertAlmostEqual(confidence.keyword_confidence(strong, 'yo jackson'),
+                               math.exp(-0.1), places=3)
+        self.assertAlmostEqual(confidence.keyword_confidence(weak, 'yo jackson'),
+                               math.exp(-3.0), places=3)
+        self.assertIsNone(confidence.keyword_confidence(FakeDecoder([]), 'yo jackson'))
+        # The low scoring keyword is rejected.
+        gate = confidence.Gate(confidence.Thresholds(0.5))
+        self.assertTrue(gate.accept(confidence.keyword_confidence(strong, 'yo jackson'),
+                                    'yo jackson'))
+        self.assertFalse(gate.accept(confidence.keyword_confidence(weak, 'yo jackson'),
+                                     'yo jackson'))
+
+    def test_thresholds(self):
+        thresholds = confidence.Thresholds(0.1, {'hue': 0.5, 'set color blue': 0.7})
+        self.assertEqual(thresholds.get('set color blue', 'hue'), 0.7)
+        self.assertEqual(thresholds.get('set color red', 'hue'), 0.5)
+        self.assertEqual(thresholds.get('wink', 'animation'), 0.1)
+        self.assertEqual(thresholds.get('wink', None), 0.1)
+
+    def test_gate_records_stats(self):
+        gate = confidence.Gate(confidence.Thresholds(0.5, {'yo jackson': 0.8}),
+                               confidence.ScoreStats(window=10))
+        self.assertTrue(gate.accept(0.9, 'yo jackson'))
+        self.assertFalse(gate.accept(0.7, 'yo jackson'))
+        self.assertTrue(gate.accept(0.6, 'happiness'))
+        self.assertFalse(gate.accept(None, 'happiness'))
+        summary = gate.stats.summary()
+        self.assertEqual(summary['total']['accepted'], 2)
+        self.assertEqual(summary['total']['rejected'], 2)
+        self.assertEqual(summary['total']['rejected_rate'], 0.5)
+        self.assertAlmostEqual(summary['total']['accepted_mean'], 0.75)
+        self.assertEqual(summary['total']['rejected_max'], 0.7)
+        self.assertEqual(summary['by_name']['yo jackson']['accepted_min'], 0.9)
+        self.assertEqual(summary['by_name']['happiness']['rejected'], 1)
+        self.assertNotIn('rejected_mean', summary['by_name']['happiness'])
+
+    def test_stats_window(self):
+        stats = confidence.ScoreStats(window=3)
+        for i in range(5):
+            stats.record('wink', i/10.0, i % 2 == 0)
+        summary = stats.summary()['total']
+        self.assertEqual(summary['accepted'] + summary['rejected'], 3)
+        self.assertEqual(summary['accepted_min'], 0.2)
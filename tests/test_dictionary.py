@@ -0,0 +1,51 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import dictionary
+
+
+DICTIONARY = '''a AH
+blue B L UW
+jackson JH AE K S AH N
+red R EH D
+read R EH D
+read(2) R IY D
+yo Y OW
+'''
+
+
+class DictionaryTests(unittest.TestCase):
+
+    def test_prune_keeps_alternate_pronunciations(self):
+        pruned, missing = dictionary.prune(DICTIONARY.splitlines(), {'read', 'blue'})
+        self.assertEqual(pruned, ['blue B L UW', 'read R EH D', 'read(2) R IY D'])
+        self.assertEqual(missing, [])
+
+    def test_prune_reports_missing_words(self):
+        _, missing = dictionary.prune(DICTIONARY.splitlines(), {'red', 'tomato', 'kiwi'})
+        self.assertEqual(missing, ['kiwi', 'tomato'])
+
+    def test_phrase_words(self):
+        self.assertEqual(dictionary.phrase_words(['Yo Jackson', 'red']),
+                         {'yo', 'jackson', 'red'})
+
+    def test_load_pruned_is_cached(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'full.dict')
+        cache_dir = os.path.join(directory, 'cache')
+        with open(path, 'w') as outfile:
+            outfile.write(DICTIONARY)
+        pruned_path, missing = dictionary.load_pruned(path, {'yo', 'jackson', 'kiwi'}, cache_dir)
+        self.assertEqual(missing, ['kiwi'])
+        with open(pruned_path) as infile:
+            self.assertEqual(infile.read(), 'jackson JH AE K S AH N\nyo Y OW\n')
+        again, missing = dictionary.load_pruned(path, {'yo', 'jackson', 'kiwi'}, cache_dir)
+        self.assertEqual(again, pruned_path)
+        self.assertEqual(missing, ['kiwi'])
+        # Different words make a new pruned dictionary that replaces the old.
+        other, _ = dictionary.load_pruned(path, {'red'}, cache_dir)
+        self.assertNotEqual(other, pruned_path)
+        self.assertEqual(os.listdir(cache_dir), [os.path.basename(other)])
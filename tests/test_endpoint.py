@@ -0,0 +1,78 @@
+import unittest
+
+import endpoint
+
+
+def run(endpointer, frames, step=0.032):
+    # Feed (in_speech, hypothesis) frames and return the reason and time the
+    # endpointer stopped, or (None, None) if it never did.
+    for i, (in_speech, hypothesis) in enumerate(frames):
+        elapsed = (i + 1)*step
+        reason = endpointer.update(elapsed, in_speech, hypothesis)
+        if reason is not None:
+            return reason, elapsed
+    return None, None
+
+
+def utterance(silence_s, speech_s, hypotheses=(), total_s=6.0, step=0.032):
+    # Frames of silence, then speech with the hypotheses spread over it, then
+    # silence until total_s.
+    frames = []
+    for i in range(int(round(total_s/step))):
+        t = i*step
+        in_speech = silence_s <= t < silence_s + speech_s
+        hypothesis = None
+        if in_speech and hypotheses:
+            k = int((t - silence_s) / speech_s * len(hypotheses))
+            hypothesis = hypotheses[k]
+        frames.append((in_speech, hypothesis))
+    return frames
+
+
+class EndpointerTests(unittest.TestCase):
+
+    def test_no_speech(self):
+        reason, elapsed = run(endpoint.Endpointer(no_speech_s=2.0), utterance(10.0, 0.0))
+        self.assertEqual(reason, 'no_speech')
+        self.assertAlmostEqual(elapsed, 2.0, delta=0.04)
+
+    def test_silence_after_speech(self):
+        reason, elapsed = run(endpoint.Endpointer(silence_s=0.2), utterance(0.3, 0.5))
+        self.assertEqual(reason, 'silence')
+        self.assertAlmostEqual(elapsed, 1.0, delta=0.07)
+
+    def test_max(self):
+        reason, elapsed = run(endpoint.Endpointer(max_s=5.0), utterance(0.1, 10.0))
+        self.assertEqual(reason, 'max')
+        self.assertAlmostEqual(elapsed, 5.0, delta=0.04)
+
+    def test_complete_hypothesis_returns_early(self):
+        checked = []
+        def is_complete(hypothesis):
+            checked.append(hypothesis)
+            return hypothesis == 'show me sparkle'
+        frames = utterance(0.2, 1.5, ['show', 'show me', 'show me sparkle', 'show me sparkle please'])
+        reason, elapsed = run(endpoint.Endpointer(is_complete=is_complete), frames)
+        self.assertEqual(reason, 'complete')
+        self.assertLess(elapsed, 1.7)
+        # Each distinct hypothesis is only checked once.
+        self.assertEqual(checked, ['show', 'show me', 'show me sparkle'])
+
+    def test_min(self):
+        reason, elapsed = run(endpoint.Endpointer(min_s=1.5, is_complete=lambda h: True),
+                              utterance(0.1, 0.3, ['wink']))
+        self.assertEqual(reason, 'silence')
+        self.assertAlmostEqual(elapsed, 1.5, delta=0.04)
+
+    def test_fixed_waits_for_min_after_short_command(self):
+        frames = utterance(0.3, 0.5)
+        self.assertEqual(run(endpoint.fixed(2.0, 5.0), frames)[1], run(
+            endpoint.Endpointer(min_s=2.0, silence_s=0.0), frames)[1])
+        reason, elapsed = run(endpoint.fixed(2.0, 5.0), frames)
+        self.assertEqual(reason, 'silence')
+        self.assertAlmostEqual(elapsed, 2.0, delta=0.04)
+
+    def test_fixed_runs_while_speaking(self):
+        reason, elapsed = run(endpoint.fixed(2.0, 5.0), utterance(0.5, 2.5))
+        self.assertEqual(reason, 'silence')
+        self.assertAlmostEqual(elapsed, 3.0, delta=0.07)
@@ -0,0 +1,41 @@
+import unittest
+
+import numpy as np
+
+import clock
+import frames
+
+
+class FramesTests(unittest.TestCase):
+
+    def test_pack_uint32_frame_is_not_copied(self):
+        frame = np.array([0x010203, 0xFFFFFF], dtype=np.uint32)
+        self.assertIs(frames.pack(frame), frame)
+
+    def test_pack_rgb_frame(self):
+        frame = np.array([[1, 2, 3], [255, 0, 128]], dtype=np.uint8)
+        packed = frames.pack(frame)
+        self.assertEqual(packed.dtype, np.uint32)
+        self.assertEqual(packed.tolist(), [0x010203, 0xFF0080])
+
+    def test_pack_int_list(self):
+        packed = frames.pack([0x010203, 0])
+        self.assertEqual(packed.dtype, np.uint32)
+        self.assertEqual(packed.tolist(), [0x010203, 0])
+
+    def test_pack_bad_shape_raises(self):
+        with self.assertRaises(ValueError):
+            frames.pack(np.zeros((2, 4), dtype=np.uint8))
+
+    def test_from_pixels_groups_pixels_into_frames(self):
+        pixels = iter(range(6))
+        animation = frames.from_pixels(pixels, 3)
+        ft = clock.FrameTime(0.0, 0.0)
+        self.assertEqual(animation(ft, None).tolist(), [0, 1, 2])
+        self.assertEqual(animation(ft, None).tolist(), [3, 4, 5])
+
+    def test_from_pixels_stops_with_pixel_generator(self):
+        animation = frames.from_pixels(iter(range(4)), 3)
+        ft = clock.FrameTime(0.0, 0.0)
+        animation(ft, None)
+        self.assertIsNone(animation(ft, None))
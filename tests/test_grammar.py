@@ -0,0 +1,164 @@
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+import grammar
+
+
+GRAMMAR = '''#JSGF V1.0 UTF-8 en;
+
+grammar test;
+
+/* Comment. */
+public <command> = [<junk>] (<color> | light up <color> | (knight rider) {animation=knight_rider}) [<junk>];
+
+// Another comment.
+<junk> = please | thank you;
+
+<color> = red {hue=0} | blue {hue=210.5};
+'''
+
+
+class GrammarTests(unittest.TestCase):
+
+    def test_parse_rules(self):
+        gram = grammar.parse(GRAMMAR)
+        self.assertEqual(gram.name, 'test')
+        self.assertEqual(gram.public, ['command'])
+        self.assertEqual(sorted(gram.rules), ['color', 'command', 'junk'])
+        self.assertEqual(gram.rules['junk'], grammar.Alternatives((
+            grammar.Word('please'),
+            grammar.Sequence((grammar.Word('thank'), grammar.Word('you'))))))
+
+    def test_phrases(self):
+        gram = grammar.parse(GRAMMAR)
+        self.assertEqual(gram.phrases('junk'), ['please', 'thank you'])
+
+    def test_words(self):
+        gram = grammar.parse(GRAMMAR)
+        self.assertEqual(gram.words(), {'please', 'thank', 'you', 'red', 'blue',
+                                         'light', 'up', 'knight', 'rider'})
+
+    def test_expand_with_tags(self):
+        gram = grammar.parse(GRAMMAR)
+        expansions = dict(gram.expand('command', skip=['junk']))
+        self.assertEqual(expansions, {
+            ('red',): {'hue': 0},
+            ('blue',): {'hue': 210.5},
+            ('light', 'up', 'red'): {'hue': 0},
+            ('light', 'up', 'blue'): {'hue': 210.5},
+            ('knight', 'rider'): {'animation': 'knight_rider'}
+        })
+
+    def test_expand_with_junk(self):
+        gram = grammar.parse(GRAMMAR)
+        expansions = list(gram.expand('command'))
+        self.assertEqual(len(expansions), 3*5*3)
+
+    def test_sample_is_in_language(self):
+        gram = grammar.parse(GRAMMAR)
+        language = set(words for words, _ in gram.expand('command'))
+        rng = random.Random(1)
+        for i in range(50):
+            self.assertIn(gram.sample('command', rng), language)
+
+    def test_undefined_rule_raises(self):
+        gram = grammar.parse('grammar test; public <a> = <b>;')
+        with self.assertRaises(grammar.GrammarError):
+            list(gram.expand('a'))
+
+    def test_recursive_rule_raises(self):
+        gram = grammar.parse('grammar test; public <a> = x [<a>];')
+        with self.assertRaises(grammar.GrammarError):
+            list(gram.expand('a'))
+
+    def test_syntax_errors_raise(self):
+        for text in ['grammar test; <a> = x', 'grammar test; <a> = (x;',
+                     'grammar test; <a> = x*;', 'grammar test; <a> = ;',
+                     'grammar test; / * bad comment */ <a> = x;']:
+            with self.assertRaises(grammar.GrammarError):
+                grammar.parse(text)
+
+    def test_duplicate_rule_raises(self):
+        with self.assertRaises(grammar.GrammarError):
+            grammar.parse('grammar test; public <a> = x; <a> = y;')
+
+    def test_validate(self):
+        grammar.parse(GRAMMAR).validate()
+        for text in ['grammar test; public <a> = <b>;',
+                     'grammar test; public <a> = x [<a>];',
+                     'grammar test; public <a> = x; <b> = y;']:
+            with self.assertRaises(grammar.GrammarError):
+                grammar.parse(text).validate()
+
+    def test_build_index(self):
+        index = grammar.build_index(grammar.parse(GRAMMAR), 'command',
+                                    ['hue', 'animation'], junk_rule='junk')
+        self.assertEqual(index.junk, ['please', 'thank you'])
+        self.assertEqual(len(index), 5)
+        self.assertEqual(index.get('light up blue'), ('hue', 210.5))
+        self.assertEqual(index.get('knight rider'), ('animation', 'knight_rider'))
+        self.assertIsNone(index.get('please red'))
+
+    def test_is_complete(self):
+        gram = grammar.parse('grammar test; public <a> = wink {x=1} | wink wink {x=2} | sparkle {x=3};')
+        index = grammar.build_index(gram, 'a', ['x'])
+        self.assertFalse(index.is_complete('wink'))
+        self.assertTrue(index.is_complete('wink wink'))
+        self.assertTrue(index.is_complete('sparkle'))
+        self.assertFalse(index.is_complete('show'))
+
+    def test_build_index_errors(self):
+        for text in [
+            # Command without an action.
+            'grammar test; public <a> = red {hue=0} | wink;',
+            # Command with two different actions.
+            'grammar test; public <a> = red {hue=0} | red {hue=1};',
+            # Command with two actions.
+            'grammar test; public <a> = (red {hue=0}) {animation=x};',
+            # Command containing junk words.
+            'grammar test; public <a> = [<junk>] (red {hue=0} | please {hue=1}); <junk> = please;']:
+            with self.assertRaises(grammar.GrammarError):
+                grammar.build_index(grammar.parse(text), 'a', ['hue', 'animation'],
+                                    junk_rule='junk' if '<junk>' in text else None)
+
+    def test_load_index_is_cached_by_grammar_hash(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'test.gram')
+        cache_dir = os.path.join(directory, 'cache')
+        with open(path, 'w') as outfile:
+            outfile.write(GRAMMAR)
+        keys = ['hue', 'animation']
+        index = grammar.load_index(path, 'command', keys, 'junk', cache_dir)
+        self.assertEqual(len(os.listdir(cache_dir)), 1)
+        cached = grammar.load_index(path, 'command', keys, 'junk', cache_dir)
+        self.assertEqual(cached.actions, index.actions)
+        # Changing the grammar rebuilds the index and replaces the old entry.
+        with open(path, 'w') as outfile:
+            outfile.write(GRAMMAR.replace('blue', 'green'))
+        changed = grammar.load_index(path, 'command', keys, 'junk', cache_dir)
+        self.assertEqual(changed.get('green'), ('hue', 210.5))
+        self.assertIsNone(changed.get('blue'))
+        self.assertEqual(len(os.listdir(cache_dir)), 1)
+
+    def test_commands_gram_index(self):
+        # Enumerate Jackson's whole command language.
+        path = os.path.join(os.path.dirname(__file__), '..', 'commands.gram')
+        index = grammar.build_index(grammar.load(path), 'command',
+            ['animation', 'hue', 'brightness', 'brightness_step'], junk_rule='junk')
+        self.assertEqual(len(index), 116)
+        self.assertEqual(index.get('show me knight rider'), ('animation', 'knight_rider'))
+        self.assertEqual(index.get('set color blue'), ('hue', 210))
+        self.assertEqual(index.get('make brightness max'), ('brightness', 3))
+        self.assertEqual(index.get('dimmer'), ('brightness_step', -1))
+        hues = set(value for key, value in index.actions.values() if key == 'hue')
+        self.assertEqual(len(hues), 11)
+
+    def test_commands_gram_parses(self):
+        path = os.path.join(os.path.dirname(__file__), '..', 'commands.gram')
+        gram = grammar.load(path)
+        self.assertIn('command', gram.public)
+        self.assertEqual(len(list(gram.expand('command', skip=['junk']))), 116)
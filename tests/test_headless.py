@@ -0,0 +1,130 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+import clock
+import config
+import headless
+import scheduler
+import state
+
+
+# Golden frames of every animation: a fixed state, seed, size and length, so
+# any change to how an animation looks shows up as a failing test.  Run
+# python3 -m tests.test_headless --update-golden to render them again after a
+# change that's meant to.
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'golden')
+GOLDEN_STATE = state.State(1, 2, 120.0)
+
+
+def render_golden(name):
+    with mock.patch.object(config, 'CACHE_DIR', None):
+        return headless.render(name, 0.5, n=16, rate_hz=30.0, state=GOLDEN_STATE, seed=0)
+
+
+def update_golden():
+    os.makedirs(GOLDEN_DIR, exist_ok=True)
+    for name in sorted(headless.ANIMATIONS):
+        np.save(os.path.join(GOLDEN_DIR, name + '.npy'), render_golden(name))
+
+
+class HeadlessTests(unittest.TestCase):
+
+    def setUp(self):
+        # Don't cache the grammar index in the working directory.
+        patcher = mock.patch.object(config, 'CACHE_DIR', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_renders_every_animation(self):
+        renderer = headless.Renderer(26, 60.0, seed=1)
+        for name in headless.ANIMATIONS:
+            renderer.play(name)
+            result = renderer.render(0.5)
+            self.assertEqual(result.shape, (30, 26), name)
+            self.assertEqual(result.dtype, np.uint32, name)
+            self.assertTrue(result.any(), name)
+
+    def test_frames_match_live_animation_at_virtual_times(self):
+        # Happiness 3 repeats every half second, a whole number of frames,
+        # so the frames are the baked samples.
+        s = state.State(3, 3, 120.0)
+        renderer = headless.Renderer(10, config.FRAME_RATE_HZ, state=s)
+        renderer.play('idle')
+        result = renderer.render(2.0)
+        with mock.patch.object(config, 'BAKE_ANIMATIONS', False):
+            live = headless.Renderer(10, config.FRAME_RATE_HZ).jackson._idle_animation()
+        t = 0.0
+        for frame in result:
+            t += renderer.clock.dt
+            np.testing.assert_array_equal(frame, live(clock.FrameTime(t, renderer.clock.dt), s))
+
+    def test_frames_match_golden_frames(self):
+        for name in headless.ANIMATIONS:
+            golden = np.load(os.path.join(GOLDEN_DIR, name + '.npy'))
+            result = render_golden(name)
+            self.assertEqual(result.shape, golden.shape, name)
+            # Colors can be off by one from floating point differences
+            # between platforms.
+            np.testing.assert_allclose(result.view(np.uint8), golden.view(np.uint8),
+                                       rtol=0, atol=1, err_msg=name)
+
+    def test_seed_repeats_random_animations(self):
+        first = headless.render('sparkle', 0.25, n=26, seed=5)
+        second = headless.render('sparkle', 0.25, n=26, seed=5)
+        np.testing.assert_array_equal(first, second)
+
+    def test_spectrum_follows_audio(self):
+        renderer = headless.Renderer(26, 60.0, seed=1)
+        renderer.play('spectrum')
+        renderer.render(1.0)
+        # Noise at 16khz in 512 sample blocks, 31.25 blocks a second.
+        self.assertEqual(renderer.jackson._spectrum_analyzer.blocks, 31)
+
+    def test_saves_npy_file(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'pulse.npy')
+        result = headless.render('pulse', 0.1, n=8, rate_hz=50.0, path=path)
+        np.testing.assert_array_equal(np.load(path), result)
+        self.assertEqual(result.shape, (5, 8))
+
+
+class StandInTests(unittest.TestCase):
+
+    def test_null_lights_check_frame_length(self):
+        lights = headless.NullLights(4)
+        self.assertTrue(lights.write_frame(np.zeros(4, dtype=np.uint32)))
+        self.assertEqual(lights.shown, 1)
+        with self.assertRaises(ValueError):
+            lights.write_frame(np.zeros(5, dtype=np.uint32))
+
+    def test_recording_lights_copy_frames(self):
+        lights = headless.RecordingLights(3)
+        frame = np.array([1, 2, 3], dtype=np.uint32)
+        lights.write_frame(frame)
+        frame[0] = 9
+        lights.write_frame(np.zeros((3, 3), dtype=np.uint8))
+        np.testing.assert_array_equal(lights.frames, [[1, 2, 3], [0, 0, 0]])
+        lights.clear()
+        self.assertEqual(lights.frames.shape, (0, 3))
+
+    def test_virtual_clock_drives_scheduler(self):
+        virtual = headless.VirtualClock(10.0)
+        times = []
+        frame_scheduler = scheduler.FrameScheduler(10.0, clock_fn=virtual,
+                                                   sleep=virtual.sleep)
+        frame_scheduler.run(lambda ft: times.append(ft.t), count=3)
+        np.testing.assert_allclose(times, [0.1, 0.2, 0.3])
+
+
+if __name__ == '__main__':
+    if '--update-golden' in sys.argv:
+        update_golden()
+    else:
+        unittest.main()
@@ -0,0 +1,33 @@
+import unittest
+
+import numpy as np
+
+import audio
+import microphone
+
+
+class MicrophoneTests(unittest.TestCase):
+
+    def test_reads_periods_from_source(self):
+        source = audio.ToneSource(440.0, sample_rate=16000, period_size=512,
+                                  realtime=False, duration_s=0.5)
+        mic = microphone.Microphone(source)
+        periods = 0
+        while mic.read(timeout=0.5) is not None:
+            periods += 1
+        self.assertTrue(mic.finished)
+        self.assertEqual(periods, 8000 // 512)
+        self.assertEqual(mic.stats()['dropped'], 0)
+        self.assertEqual(len(mic.latest(1024)), 1024)
+
+    def test_read_reuses_buffer(self):
+        source = audio.ToneSource(440.0, sample_rate=16000, period_size=512,
+                                  realtime=False, duration_s=0.1)
+        mic = microphone.Microphone(source)
+        first = mic.read(timeout=0.5)
+        samples = np.frombuffer(first, dtype=np.int16).copy()
+        self.assertEqual(len(first), 1024)
+        self.assertTrue(first.readonly)
+        second = mic.read(timeout=0.5)
+        self.assertIs(second, first)
+        self.assertFalse(np.array_equal(np.frombuffer(second, dtype=np.int16), samples))
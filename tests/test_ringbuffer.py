@@ -0,0 +1,76 @@
+import threading
+import unittest
+
+import numpy as np
+
+import ringbuffer
+
+
+class RingBufferTests(unittest.TestCase):
+
+    def test_read_written_samples(self):
+        ring = ringbuffer.RingBuffer(8)
+        reader = ring.reader()
+        ring.write(np.arange(3, dtype=np.int16))
+        out = np.zeros(3, dtype=np.int16)
+        self.assertTrue(reader.read_into(out, timeout=0))
+        self.assertEqual(out.tolist(), [0, 1, 2])
+
+    def test_read_bytes(self):
+        ring = ringbuffer.RingBuffer(8)
+        reader = ring.reader()
+        ring.write(np.array([1, -2], dtype=np.int16).tobytes())
+        out = np.zeros(2, dtype=np.int16)
+        reader.read_into(out, timeout=0)
+        self.assertEqual(out.tolist(), [1, -2])
+
+    def test_read_times_out_without_enough_samples(self):
+        ring = ringbuffer.RingBuffer(8)
+        reader = ring.reader()
+        ring.write(np.arange(2, dtype=np.int16))
+        out = np.zeros(3, dtype=np.int16)
+        self.assertFalse(reader.read_into(out, timeout=0.01))
+        self.assertEqual(reader.available, 2)
+
+    def test_read_across_wrap_around(self):
+        ring = ringbuffer.RingBuffer(8)
+        reader = ring.reader()
+        out = np.zeros(3, dtype=np.int16)
+        for i in range(5):
+            ring.write(np.arange(3*i, 3*i+3, dtype=np.int16))
+            self.assertTrue(reader.read_into(out, timeout=0))
+            self.assertEqual(out.tolist(), [3*i, 3*i+1, 3*i+2])
+
+    def test_slow_reader_drops_oldest_samples(self):
+        ring = ringbuffer.RingBuffer(8)
+        reader = ring.reader()
+        ring.write(np.arange(12, dtype=np.int16))
+        out = np.zeros(2, dtype=np.int16)
+        reader.read_into(out, timeout=0)
+        self.assertEqual(out.tolist(), [4, 5])
+        self.assertEqual(reader.dropped, 4)
+
+    def test_latest_is_contiguous_view_across_wrap_around(self):
+        ring = ringbuffer.RingBuffer(8)
+        ring.write(np.arange(6, dtype=np.int16))
+        ring.write(np.arange(6, 11, dtype=np.int16))
+        latest = ring.latest(5)
+        self.assertEqual(latest.tolist(), [6, 7, 8, 9, 10])
+        self.assertFalse(latest.flags.writeable)
+        self.assertEqual(ring.latest(100).tolist(), list(range(3, 11)))
+
+    def test_latest_before_anything_written(self):
+        ring = ringbuffer.RingBuffer(8)
+        self.assertEqual(len(ring.latest(4)), 0)
+
+    def test_blocking_read_wakes_up_on_write(self):
+        ring = ringbuffer.RingBuffer(8)
+        reader = ring.reader()
+        out = np.zeros(4, dtype=np.int16)
+        result = []
+        thread = threading.Thread(target=lambda: result.append(reader.read_into(out, timeout=5.0)))
+        thread.start()
+        ring.write(np.arange(4, dtype=np.int16))
+        thread.join()
+        self.assertEqual(result, [True])
+        self.assertEqual(out.tolist(), [0, 1, 2, 3])
@@ -0,0 +1,88 @@
+import unittest
+
+import scheduler
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class FrameSchedulerTests(unittest.TestCase):
+
+    def test_sleeps_until_absolute_deadlines(self):
+        clock = FakeClock()
+        sched = scheduler.FrameScheduler(10.0, clock_fn=clock, sleep=clock.sleep)
+        def render(t):
+            clock.now += 0.03  # Spend 30ms rendering every frame.
+            return t.t
+        times = []
+        sched.run(render, times.append, count=3)
+        self.assertAlmostEqual(times[0], 100.1)
+        self.assertAlmostEqual(times[1], 100.2)
+        self.assertAlmostEqual(times[2], 100.3)
+        self.assertAlmostEqual(clock.sleeps[1], 0.07)
+
+    def test_skips_frames_when_behind(self):
+        clock = FakeClock()
+        sched = scheduler.FrameScheduler(10.0, clock_fn=clock, sleep=clock.sleep)
+        def render(t):
+            clock.now += 0.25  # Take longer than two frame periods.
+            return t.t
+        times = []
+        sched.run(render, times.append, count=3)
+        self.assertAlmostEqual(times[1], 100.35)
+        self.assertEqual(sched.stats.missed, 2)
+        self.assertEqual(sched.stats.skipped, 3)
+        self.assertEqual(sched.stats.frames, 3)
+
+    def test_slight_overrun_drops_no_frames(self):
+        clock = FakeClock()
+        clock.now = 0.0
+        sched = scheduler.FrameScheduler(100.0, clock_fn=clock, sleep=clock.sleep)
+        times = []
+        def render(t):
+            # The third frame overruns its period by 0.1ms.
+            clock.now += 0.0101 if len(times) == 2 else 0.001
+            return t.t
+        sched.run(render, times.append, count=6)
+        for start, slot in zip(times, (0.01, 0.02, 0.03, 0.0401, 0.05, 0.06)):
+            self.assertAlmostEqual(start, slot)
+        self.assertEqual(sched.stats.missed, 1)
+        self.assertEqual(sched.stats.skipped, 0)
+
+    def test_none_frame_not_pushed(self):
+        clock = FakeClock()
+        sched = scheduler.FrameScheduler(10.0, clock_fn=clock, sleep=clock.sleep)
+        pushed = []
+        sched.run(lambda t: None, pushed.append, count=2)
+        self.assertEqual(pushed, [])
+
+    def test_ticks_report_elapsed_time(self):
+        clock = FakeClock()
+        sched = scheduler.FrameScheduler(4.0, clock_fn=clock, sleep=clock.sleep)
+        ticks = sched.ticks()
+        self.assertEqual(next(ticks), (100.25, 0.0))
+        self.assertEqual(next(ticks), (100.5, 0.25))
+
+    def test_stats_record_stage_times(self):
+        clock = FakeClock()
+        sched = scheduler.FrameScheduler(10.0, clock_fn=clock, sleep=clock.sleep)
+        def render(t):
+            clock.now += 0.003
+            return t
+        def push(frame):
+            clock.now += 0.012
+        sched.run(render, push, count=5)
+        self.assertAlmostEqual(sched.stats.times('render').max(), 0.003)
+        self.assertEqual(dict(sched.stats.histogram('push'))[16.0], 5)
+        self.assertIn('frames 5 missed 0', sched.stats.summary())
@@ -0,0 +1,90 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+
+import config
+import segments
+
+
+class LayoutTests(unittest.TestCase):
+
+    def test_segments_follow_each_other(self):
+        layout = segments.layout([dict(name='left', count=3, pin=18, channel=0),
+                                  dict(count=2, pin=13, channel=1),
+                                  dict(name='back', count=4, pin=21, dma=11)])
+        self.assertEqual([(s.name, s.start, s.count) for s in layout],
+                         [('left', 0, 3), ('segment1', 3, 2), ('back', 5, 4)])
+        self.assertEqual(segments.total(layout), 9)
+        self.assertEqual(layout[1].pin, 13)
+        self.assertEqual(layout[1].dma, config.LED_DMA)
+        self.assertEqual(layout[2].channel, config.LED_CHANNEL)
+        self.assertEqual(layout[2].brightness, config.LED_BRIGHTNESS)
+
+    def test_invalid_segments(self):
+        for specs in ([dict(count=0)],
+                      [dict(count=1, channel=2)],
+                      [dict(count=1, colour='red')],
+                      [dict(count=1, channel=0), dict(count=1, channel=0)],
+                      [dict(name='a', count=1, channel=0), dict(name='a', count=1, channel=1)],
+                      # Only one DMA can use the PWM.
+                      [dict(count=1, pin=18, channel=0, dma=10),
+                       dict(count=1, pin=12, channel=0, dma=11)],
+                      [dict(count=1, pin=18, channel=0, dma=10),
+                       dict(count=1, pin=13, channel=1, dma=11)]):
+            with self.assertRaises(ValueError):
+                segments.layout(specs)
+
+    def test_from_config_defaults_to_one_strip(self):
+        with mock.patch.object(config, 'LED_SEGMENTS', None):
+            layout = segments.from_config()
+        self.assertEqual(len(layout), 1)
+        self.assertEqual(layout[0].count, config.LED_COUNT)
+        self.assertEqual(layout[0].pin, config.LED_PIN)
+
+    def test_controllers_group_by_dma(self):
+        layout = segments.layout([dict(count=1, channel=0, dma=10),
+                                  dict(count=1, pin=21, channel=0, dma=11),
+                                  dict(count=1, pin=13, channel=1, dma=10)])
+        groups = segments.controllers(layout)
+        self.assertEqual(list(groups), [10, 11])
+        self.assertEqual(groups[10], [layout[0], layout[2]])
+
+    def test_controller_segments_need_same_frequency(self):
+        layout = segments.layout([dict(count=1, channel=0, freq_hz=800000),
+                                  dict(count=1, pin=13, channel=1, freq_hz=400000)])
+        with self.assertRaises(ValueError):
+            segments.controllers(layout)
+
+    def test_split_returns_views(self):
+        layout = segments.layout([dict(count=2, channel=0), dict(count=3, channel=1)])
+        frame = np.arange(5, dtype=np.uint32)
+        parts = segments.split(frame, layout)
+        np.testing.assert_array_equal(parts[1], [2, 3, 4])
+        for part in parts:
+            self.assertTrue(np.shares_memory(part, frame))
+
+    def test_find(self):
+        layout = segments.layout([dict(count=2, channel=0), dict(count=3, channel=1)])
+        self.assertEqual(segments.find(layout, 3), (layout[1], 1))
+        with self.assertRaises(IndexError):
+            segments.find(layout, 5)
+
+
+class PushStatsTests(unittest.TestCase):
+
+    def test_records_times_and_skips(self):
+        stats = segments.PushStats(['left', 'right'], window=2)
+        stats.record('left', 0.001)
+        stats.record('left', 0.002)
+        stats.record('left', 0.003)
+        stats.record_skipped('right')
+        np.testing.assert_allclose(stats.times('left'), [0.002, 0.003])
+        self.assertEqual(stats.skipped['right'], 1)
+        summary = stats.summary()
+        self.assertIn('left p50 2.50ms', summary)
+        self.assertNotIn('right', summary)
+
+
+if __name__ == '__main__':
+    unittest.main()
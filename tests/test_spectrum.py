@@ -0,0 +1,49 @@
+import unittest
+
+import numpy as np
+
+import audio
+import spectrum
+
+
+def tone(freq_hz, amplitude=0.5, count=512, sample_rate=16000):
+    source = audio.ToneSource(freq_hz, amplitude=amplitude,
+                              sample_rate=sample_rate, period_size=count,
+                              realtime=False)
+    return np.frombuffer(source.read(), dtype=np.int16)
+
+
+class SpectrumAnalyzerTests(unittest.TestCase):
+
+    def test_tone_lights_up_its_band(self):
+        analyzer = spectrum.SpectrumAnalyzer(10, 16000, smoothing=0.0)
+        low = analyzer.process(tone(150.0)).copy()
+        high = analyzer.process(tone(3000.0))
+        self.assertLess(np.argmax(low), 3)
+        self.assertGreater(np.argmax(high), 7)
+        self.assertEqual(high.max(), 1.0)
+
+    def test_silence_is_dark(self):
+        analyzer = spectrum.SpectrumAnalyzer(10, 16000)
+        bands = analyzer.process(np.zeros(512, dtype=np.int16))
+        self.assertFalse(np.isnan(bands).any())
+        self.assertEqual(bands.max(), 0.0)
+        analyzer.process(tone(1000.0))
+        for _ in range(5):
+            bands = analyzer.process(np.zeros(512, dtype=np.int16))
+        self.assertLess(bands.max(), 0.5)
+
+    def test_auto_gain_turns_up_quiet_audio(self):
+        analyzer = spectrum.SpectrumAnalyzer(10, 16000, smoothing=0.0,
+                                             peak_decay_db_s=100.0)
+        analyzer.process(tone(1000.0, amplitude=0.9))
+        quiet = analyzer.process(tone(1000.0, amplitude=0.01)).max()
+        for _ in range(100):
+            louder = analyzer.process(tone(1000.0, amplitude=0.01)).max()
+        self.assertLess(quiet, louder)
+        self.assertEqual(louder, 1.0)
+
+    def test_more_bands_than_fft_bins(self):
+        analyzer = spectrum.SpectrumAnalyzer(600, 16000)
+        bands = analyzer.process(tone(1000.0))
+        self.assertEqual(bands.shape, (600,))
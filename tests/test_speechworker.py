@@ -0,0 +1,75 @@
+import multiprocessing
+import sys
+import unittest
+
+import numpy as np
+
+import speechworker
+
+
+def _read_in_process(name, capacity, lock, position, count, results):
+    shared = speechworker.SharedAudio(capacity, name=name, lock=lock)
+    out = np.zeros(count, dtype=np.int16)
+    results.put((shared.read_into(out, position, timeout=10.0), out.tolist()))
+    shared.close()
+
+
+@unittest.skipIf(sys.version_info < (3, 8), 'multiprocessing.shared_memory needs Python 3.8')
+class SharedAudioTests(unittest.TestCase):
+
+    def setUp(self):
+        self.shared = speechworker.SharedAudio(8)
+        self.addCleanup(self.shared.close)
+
+    def test_write_and_read_wraps(self):
+        out = np.zeros(3, dtype=np.int16)
+        position = 0
+        for i in range(5):
+            self.shared.write(np.arange(3*i, 3*i + 3, dtype=np.int16))
+            position, dropped = self.shared.read_into(out, position, timeout=0.0)
+            self.assertEqual(out.tolist(), list(range(3*i, 3*i + 3)))
+            self.assertEqual(dropped, 0)
+        self.assertEqual(position, 15)
+        self.assertEqual(self.shared.written, 15)
+
+    def test_read_times_out(self):
+        out = np.zeros(3, dtype=np.int16)
+        self.assertEqual(self.shared.read_into(out, 0, timeout=0.01), (None, 0))
+
+    def test_reader_behind_drops_oldest(self):
+        self.shared.write(np.arange(20, dtype=np.int16))
+        out = np.zeros(2, dtype=np.int16)
+        position, dropped = self.shared.read_into(out, 0, timeout=0.0)
+        # Reads start far enough ahead that a period being written is safe.
+        self.assertEqual(dropped, 14)
+        self.assertEqual(out.tolist(), [14, 15])
+        self.assertEqual(position, 16)
+
+    def test_bytes_write(self):
+        self.shared.write(np.array([1, -2], dtype=np.int16).tobytes())
+        out = np.zeros(2, dtype=np.int16)
+        self.shared.read_into(out, 0, timeout=0.0)
+        self.assertEqual(out.tolist(), [1, -2])
+
+    def test_read_from_other_process(self):
+        context = multiprocessing.get_context('spawn')
+        shared = speechworker.SharedAudio(1024, lock=context.Condition())
+        self.addCleanup(shared.close)
+        results = context.Queue()
+        process = context.Process(target=_read_in_process,
+            args=(shared.name, 1024, shared.lock, 0, 512, results))
+        process.start()
+        # The reader in the other process blocks until the audio is written.
+        shared.write(np.arange(256, dtype=np.int16))
+        shared.write(np.arange(256, 512, dtype=np.int16))
+        (position, dropped), samples = results.get(timeout=30.0)
+        process.join(10.0)
+        self.assertEqual(position, 512)
+        self.assertEqual(dropped, 0)
+        self.assertEqual(samples, list(range(512)))
+
+    def test_shared_microphone(self):
+        mic = speechworker._SharedMicrophone(self.shared, 4)
+        self.assertIsNone(mic.read(timeout=0.0))
+        self.shared.write(np.array([1, 2, 3, 4], dtype=np.int16))
+        self.assertEqual(mic.read(timeout=0.0), np.array([1, 2, 3, 4], dtype=np.int16).tobytes())
@@ -0,0 +1,26 @@
+import unittest
+
+import state
+
+
+class StateTests(unittest.TestCase):
+
+    def test_happiness_freq(self):
+        self.assertEqual(state.State(-3, 2, 0.0).happiness_freq, 0.25)
+        self.assertEqual(state.State(3, 2, 0.0).happiness_freq, 2.0)
+
+    def test_brightness_hsv(self):
+        self.assertEqual(state.State(0, 0, 0.0).brightness_hsv, 0.0)
+        self.assertEqual(state.State(0, 3, 0.0).brightness_hsv, 1.0)
+
+
+class StateStoreTests(unittest.TestCase):
+
+    def test_update_swaps_snapshot(self):
+        store = state.StateStore(state.State(0, 2, 0.0))
+        before = store.snapshot
+        after = store.update(hue=90.0)
+        self.assertIs(store.snapshot, after)
+        self.assertEqual(after, state.State(0, 2, 90.0))
+        # Old snapshots are never modified.
+        self.assertEqual(before, state.State(0, 2, 0.0))
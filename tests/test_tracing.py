@@ -0,0 +1,78 @@
+import io
+import json
+import unittest
+
+import tracing
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 10.0
+
+    def __call__(self):
+        return self.now
+
+
+class TracingTests(unittest.TestCase):
+
+    def test_spans_relative_to_first_span(self):
+        clock = FakeClock()
+        tracer = tracing.Tracer(clock_fn=clock)
+        trace = tracer.start('keyword')
+        trace.add_span('keyword', 10.0, 10.02)
+        clock.now = 10.5
+        with trace.span('dispatch'):
+            clock.now = 10.501
+        clock.now = 10.51
+        trace.mark('first_frame')
+        trace.set(command='wink')
+        trace.finish()
+        result = tracer.traces[0].to_dict()
+        self.assertEqual(result['name'], 'keyword')
+        self.assertEqual(result['start'], 10.0)
+        self.assertAlmostEqual(result['total_ms'], 510.0)
+        self.assertEqual([s['name'] for s in result['spans']],
+                         ['keyword', 'dispatch', 'first_frame'])
+        self.assertAlmostEqual(result['spans'][0]['duration_ms'], 20.0)
+        self.assertAlmostEqual(result['spans'][1]['start_ms'], 500.0)
+        self.assertAlmostEqual(result['spans'][1]['duration_ms'], 1.0)
+        self.assertEqual(result['spans'][2]['duration_ms'], 0.0)
+        self.assertEqual(result['attributes'], {'command': 'wink'})
+
+    def test_ring_is_bounded(self):
+        tracer = tracing.Tracer(capacity=3)
+        for i in range(5):
+            trace = tracer.start(str(i))
+            trace.finish()
+            trace.finish()
+        self.assertEqual([t.name for t in tracer.traces], ['2', '3', '4'])
+
+    def test_unfinished_traces_are_not_kept(self):
+        tracer = tracing.Tracer()
+        tracer.start('keyword')
+        self.assertEqual(tracer.traces, [])
+
+    def test_dump_json_lines(self):
+        tracer = tracing.Tracer()
+        for name in ['a', 'b']:
+            trace = tracer.start(name)
+            trace.mark('first_frame')
+            trace.finish()
+        out = io.StringIO()
+        tracer.dump(out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual([json.loads(line)['name'] for line in lines], ['a', 'b'])
+
+    def test_disabled_records_nothing(self):
+        tracer = tracing.Tracer(enabled=False)
+        trace = tracer.start('keyword')
+        self.assertIs(trace, tracing.NULL_TRACE)
+        self.assertFalse(trace.enabled)
+        with trace.span('dispatch'):
+            pass
+        trace.add_span('keyword', 0.0, 1.0)
+        trace.mark('first_frame')
+        trace.set(command='wink')
+        trace.finish()
+        self.assertEqual(tracer.traces, [])
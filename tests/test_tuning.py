@@ -0,0 +1,79 @@
+import csv
+import os
+import shutil
+import tempfile
+import unittest
+
+import tuning
+
+
+class TuningTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_load_labels(self):
+        recording = os.path.join(self.directory, 'hello.wav')
+        self.assertIsNone(tuning.load_labels(recording))
+        with open(os.path.join(self.directory, 'hello.txt'), 'w') as outfile:
+            outfile.write('yo jackson 1.5\n\nhappiness 4\n')
+        self.assertEqual(tuning.load_labels(recording),
+                         [('yo jackson', 1.5), ('happiness', 4.0)])
+        with open(os.path.join(self.directory, 'hello.txt'), 'w') as outfile:
+            outfile.write('yo jackson\n')
+        with self.assertRaises(ValueError):
+            tuning.load_labels(recording)
+
+    def test_thresholds_round_trip(self):
+        path = os.path.join(self.directory, 'thresholds.json')
+        self.assertEqual(tuning.load_thresholds(path), {})
+        self.assertEqual(tuning.load_thresholds(None), {})
+        tuning.save_thresholds(path, {'yo jackson': '1e-20', 'anger': '1e-05'})
+        self.assertEqual(tuning.load_thresholds(path), {'yo jackson': '1e-20', 'anger': '1e-05'})
+
+    def test_point(self):
+        labels = [[('yo jackson', 2.0), ('yo jackson', 10.0)], [('happiness', 3.0)], []]
+        p = tuning.point('1e-10', [[2.5], [3.0], [1.0, 5.0]], labels, 'yo jackson', 0.5)
+        self.assertEqual(p.detections, 4)
+        self.assertEqual(p.hits, 1)
+        self.assertEqual(p.misses, 1)
+        self.assertEqual(p.false_alarms, 3)
+        self.assertEqual(p.recall, 0.5)
+        self.assertEqual(p.miss_rate, 0.5)
+        self.assertEqual(p.false_alarms_per_hour, 6.0)
+
+    def test_point_matches_detections_in_tolerance(self):
+        labels = [[('anger', 2.0), ('anger', 3.0), ('anger', 20.0)]]
+        # Too late for the first label, so it hits the second, and the
+        # detection far from the third label is a false alarm.
+        p = tuning.point('1e-10', [[3.8, 12.0]], labels, 'anger', 1.0, tolerance_s=1.0)
+        self.assertEqual((p.hits, p.misses, p.false_alarms), (1, 2, 1))
+        # Each label is hit once, a second detection of it is a false alarm.
+        p = tuning.point('1e-10', [[2.1, 2.2, 2.9, 3.3]], labels, 'anger', 1.0, tolerance_s=1.0)
+        self.assertEqual((p.hits, p.misses, p.false_alarms), (2, 1, 2))
+
+    def test_recommend(self):
+        labels = [[('anger', 10.0*i) for i in range(4)], []]
+        def at(hits, false_alarms):
+            return [[10.0*i for i in range(hits)], [5.0]*false_alarms]
+        points = [tuning.point(t, at(*counts), labels, 'anger', 1.0) for t, counts in [
+            ('1e-05', (1, 0)), ('1e-10', (3, 0)), ('1e-15', (3, 0)),
+            ('1e-20', (4, 1)), ('1e-25', (4, 5))]]
+        # Best recall allowed is 1e-20, stricter thresholds lose recall.
+        self.assertEqual(tuning.recommend(points, 1.0).threshold, '1e-20')
+        # With no false alarms allowed 1e-10 and 1e-15 tie, the larger wins.
+        self.assertEqual(tuning.recommend(points, 0.0).threshold, '1e-10')
+        # Nothing meets the limit so the fewest false alarms wins.
+        noisy = [tuning.point(t, [[1.0]*c], [[]], 'anger', 1.0)
+                 for t, c in [('1e-05', 2), ('1e-10', 3)]]
+        self.assertEqual(tuning.recommend(noisy, 1.0).threshold, '1e-05')
+
+    def test_write_curves(self):
+        path = os.path.join(self.directory, 'curves.csv')
+        points = [tuning.point('1e-05', [[1.0]], [[('anger', 1.0)]], 'anger', 1.0)]
+        tuning.write_curves(path, {'anger': points})
+        with open(path) as infile:
+            rows = list(csv.reader(infile))
+        self.assertEqual(rows[0][:3], ['keyword', 'threshold', 'detections'])
+        self.assertEqual(rows[1][:3], ['anger', '1e-05', '1'])
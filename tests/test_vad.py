@@ -0,0 +1,69 @@
+import unittest
+
+import numpy as np
+
+import vad
+
+
+RATE = 16000
+PERIOD = 512
+
+
+def tone(seconds, amplitude, freq=300.0):
+    t = np.arange(int(seconds*RATE)) / float(RATE)
+    return (amplitude*32767*np.sin(2.0*np.pi*freq*t)).astype(np.int16)
+
+
+def noise(seconds, amplitude, seed=0):
+    rng = np.random.RandomState(seed)
+    return rng.uniform(-amplitude*32767, amplitude*32767, int(seconds*RATE)).astype(np.int16)
+
+
+def periods(samples):
+    return [samples[i:i+PERIOD].tobytes() for i in range(0, len(samples) - PERIOD + 1, PERIOD)]
+
+
+class VadTests(unittest.TestCase):
+
+    def test_energy_db(self):
+        self.assertAlmostEqual(vad.energy_db(np.full(100, 32767, dtype=np.int16)), 0.0, places=3)
+        self.assertAlmostEqual(vad.energy_db(tone(0.1, 0.5)), -9.03, places=1)
+        self.assertLess(vad.energy_db(np.zeros(100, dtype=np.int16)), -100.0)
+
+    def test_zero_crossing_rate(self):
+        self.assertEqual(vad.zero_crossing_rate(np.array([1, -1, 1, -1], dtype=np.int16)), 1.0)
+        self.assertEqual(vad.zero_crossing_rate(np.array([1, 2, 3], dtype=np.int16)), 0.0)
+        self.assertAlmostEqual(vad.zero_crossing_rate(tone(1.0, 0.5, 1000.0)), 2000.0/RATE, places=3)
+
+    def test_silence_is_skipped(self):
+        gate = vad.VoiceActivityGate(RATE)
+        passed = [p for buf in periods(noise(2.0, 0.001)) for p in gate.process(buf)]
+        self.assertEqual(passed, [])
+        self.assertEqual(gate.passed_fraction, 0.0)
+
+    def test_speech_passed_with_preroll_and_hangover(self):
+        gate = vad.VoiceActivityGate(RATE, preroll_s=0.1, hangover_s=0.2)
+        quiet = periods(noise(1.0, 0.001))
+        loud = periods(tone(0.5, 0.3))
+        after = periods(noise(1.0, 0.001, seed=1))
+        for buf in quiet:
+            self.assertEqual(gate.process(buf), [])
+        first = gate.process(loud[0])
+        # Pre-roll of at least 0.1 seconds of the quiet audio, then the speech.
+        self.assertTrue(gate.active)
+        self.assertEqual(first[-1], loud[0])
+        self.assertEqual(first[:-1], quiet[-len(first)+1:])
+        self.assertGreaterEqual((len(first) - 1)*PERIOD, 0.1*RATE)
+        self.assertLessEqual((len(first) - 2)*PERIOD, 0.1*RATE)
+        for buf in loud[1:]:
+            self.assertEqual(gate.process(buf), [buf])
+        passed_after = sum(len(gate.process(buf)) for buf in after)
+        self.assertAlmostEqual(passed_after*PERIOD / float(RATE), 0.2, delta=PERIOD/float(RATE))
+        self.assertFalse(gate.active)
+
+    def test_sustained_noise_becomes_background(self):
+        gate = vad.VoiceActivityGate(RATE, noise_rise_db_s=5.0, hangover_s=0.0)
+        bufs = periods(noise(1.0, 0.001)) + periods(noise(10.0, 0.05, seed=2))
+        passed = [len(gate.process(buf)) > 0 for buf in bufs]
+        self.assertTrue(any(passed))
+        self.assertFalse(any(passed[-20:]))
@@ -0,0 +1,158 @@
+# Jackson: Voice-controlled Jacket
+# Lightweight latency tracing.  A trace follows one voice interaction (like a
+# wake word and command) through each stage from keyword detection to the
+# first LED frame shown, as spans with monotonic start and end times.
+# Finished traces are kept in a bounded ring and can be dumped as JSON lines.
+# When tracing is disabled every trace is a shared null trace whose methods do
+# nothing, so the cost is an attribute lookup and call per stage.
+# Author: Tony DiCola
+# License: MIT https://opensource.org/licenses/MIT
+import collections
+import json
+import threading
+import time
+
+
+class _NullSpan:
+    # Context manager that does nothing.
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+class _NullTrace:
+    # Trace that records nothing, used when tracing is disabled.
+    enabled = False
+
+    def span(self, name):
+        return _NULL_SPAN
+
+    def add_span(self, name, start, end):
+        pass
+
+    def mark(self, name):
+        pass
+
+    def set(self, **attributes):
+        pass
+
+    def finish(self):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+NULL_TRACE = _NullTrace()
+
+
+class _Span:
+    # Context manager that records a span of a trace.
+    __slots__ = ('_trace', '_name', '_start')
+
+    def __init__(self, trace, name):
+        self._trace = trace
+        self._name = name
+
+    def __enter__(self):
+        self._start = self._trace._clock_fn()
+        return self
+
+    def __exit__(self, *args):
+        self._trace.add_span(self._name, self._start, self._trace._clock_fn())
+        return False
+
+
+class Trace:
+    enabled = True
+
+    def __init__(self, tracer, name, clock_fn):
+        """Create a trace, use Tracer.start instead."""
+        self.name = name
+        self.spans = []
+        self.attributes = {}
+        self.finished = False
+        self._tracer = tracer
+        self._clock_fn = clock_fn
+
+    def span(self, name):
+        """Return a context manager that records its body as a span."""
+        return _Span(self, name)
+
+    def add_span(self, name, start, end):
+        """Record a span with the specified start and end time."""
+        self.spans.append((name, start, end))
+
+    def mark(self, name):
+        """Record a zero length span at the current time."""
+        now = self._clock_fn()
+        self.spans.append((name, now, now))
+
+    def set(self, **attributes):
+        """Set attributes (like the recognized command) of the trace."""
+        self.attributes.update(attributes)
+
+    def finish(self):
+        """Finish the trace and add it to its tracer's ring of traces.  Later
+        calls do nothing.
+        """
+        if not self.finished:
+            self.finished = True
+            self._tracer._finished(self)
+
+    def to_dict(self):
+        """Return the trace as a dict with span start and duration in
+        milliseconds, relative to the start of the first span.
+        """
+        origin = min(start for _, start, _ in self.spans) if self.spans else 0.0
+        end = max(end for _, _, end in self.spans) if self.spans else 0.0
+        return {
+            'name':       self.name,
+            'start':      origin,
+            'total_ms':   (end - origin)*1000.0,
+            'spans':      [{'name': name,
+                            'start_ms': (start - origin)*1000.0,
+                            'duration_ms': (stop - start)*1000.0}
+                           for name, start, stop in self.spans],
+            'attributes': self.attributes
+        }
+
+
+class Tracer:
+
+    def __init__(self, capacity=100, enabled=True, clock_fn=time.monotonic):
+        """Create a tracer that keeps the last capacity finished traces.  If
+        enabled is False every trace is a null trace that records nothing.
+        """
+        self.enabled = enabled
+        self._clock_fn = clock_fn
+        self._traces = collections.deque(maxlen=capacity)
+        self._lock = threading.Lock()
+
+    def start(self, name):
+        """Start a new trace with the specified name."""
+        if not self.enabled:
+            return NULL_TRACE
+        return Trace(self, name, self._clock_fn)
+
+    def _finished(self, trace):
+        with self._lock:
+            self._traces.append(trace)
+
+    @property
+    def traces(self):
+        """List of the finished traces in the ring, oldest first."""
+        with self._lock:
+            return list(self._traces)
+
+    def dump(self, outfile):
+        """Write the finished traces to a file object, or a path which is
+        appended to, as one JSON object per line.
+        """
+        if isinstance(outfile, str):
+            with open(outfile, 'a', encoding='utf8') as f:
+                return self.dump(f)
+        for trace in self.traces:
+            outfile.write(json.dumps(trace.to_dict(), sort_keys=True))
+            outfile.write('\n')
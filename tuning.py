@@ -0,0 +1,263 @@
+# Jackson: Voice-controlled Jacket
+# Keyword threshold tuning tool.  Sweeps the Pocketsphinx threshold of every
+# keyword over labeled recordings (in parallel, one process per core) and
+# measures how many keywords are missed and how many false alarms there are at
+# each threshold.  Writes the ROC/DET curves of every keyword and recommends
+# the threshold with the best recall under a false alarm rate, saved to a file
+# the speech recognizer loads (KEYWORD_THRESHOLDS_FILE in config.py).
+# Recordings are 16-bit mono WAV files at the configured sample rate.  The
+# keywords spoken in a recording are listed one per line in a text file with
+# the same name (like hello.wav and hello.txt), each followed by the time in
+# seconds from the start of the recording that the keyword ends (like
+# "yo jackson 2.4").  A detection is only a hit if it's within a tolerance of
+# the time of a label of its keyword, anything else is a false alarm.
+# Recordings without a text file are noise with no keywords.  Keywords are
+# spotted through the voice activity gate configured in config.py, like
+# Jackson listens.
+# Usage: python3 tuning.py [options] recording.wav [recording.wav ...]
+# Author: Tony DiCola
+# License: MIT https://opensource.org/licenses/MIT
+import argparse
+import collections
+import csv
+import json
+import logging
+import multiprocessing
+import os
+import wave
+
+import config
+
+
+logger = logging.getLogger(__name__)
+
+
+# Thresholds swept by default, 1e-01 to 1e-50.  Smaller thresholds detect more
+# keywords, and more false alarms.
+THRESHOLDS = ['1e-{0:02d}'.format(k) for k in range(1, 51)]
+
+# Seconds a detection can be from the labeled time of its keyword and still be
+# a hit.  Keywords are detected after they end, as late as the end of the
+# period of audio that completes them (or of the voice activity gate's
+# pre-roll).
+TOLERANCE_S = 1.0
+
+# One point on a keyword's ROC/DET curve.
+Point = collections.namedtuple('Point', ['threshold', 'detections', 'hits',
+                                         'misses', 'false_alarms', 'recall',
+                                         'miss_rate', 'false_alarms_per_hour'])
+
+
+def load_labels(recording):
+    """Return the list of 2-tuples of keyword and the time in seconds it ends
+    spoken in a recording from its text file, or None/null if it has no text
+    file.
+    """
+    path = os.path.splitext(recording)[0] + '.txt'
+    if not os.path.exists(path):
+        return None
+    labels = []
+    with open(path, encoding='utf8') as infile:
+        for number, line in enumerate(infile, 1):
+            if not line.strip():
+                continue
+            try:
+                keyword, time_s = line.rsplit(None, 1)
+                labels.append((keyword.strip(), float(time_s)))
+            except ValueError:
+                raise ValueError('{0}:{1}: expected a keyword and a time in seconds, got {2!r}'
+                                 .format(path, number, line.strip()))
+    return labels
+
+
+def load_thresholds(path):
+    """Load a dict of keyword to threshold string saved by save_thresholds,
+    or return an empty dict if the file doesn't exist.
+    """
+    if path is None or not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf8') as infile:
+        return {k: str(v) for k, v in json.load(infile).items()}
+
+
+def save_thresholds(path, thresholds):
+    """Save a dict of keyword to threshold string."""
+    with open(path, 'w', encoding='utf8') as outfile:
+        json.dump(thresholds, outfile, indent=2, sort_keys=True)
+        outfile.write('\n')
+
+
+def point(threshold, detections, labels, keyword, hours, tolerance_s=TOLERANCE_S):
+    """Score the detection times of a keyword at a threshold (a list of times
+    in seconds per recording) against the list of labels of the recordings
+    (see load_labels).  Each label is hit by at most one detection within
+    tolerance_s seconds of it, the earliest, and detections that hit no label
+    are false alarms.  hours is the total length of the recordings.
+    """
+    hits = misses = false_alarms = 0
+    for times, recording_labels in zip(detections, labels):
+        expected = sorted(t for k, t in recording_labels if k == keyword)
+        matched = 0
+        i = 0
+        for t in sorted(times):
+            # Labels too early for this detection are too early for the later
+            # ones too.
+            while i < len(expected) and expected[i] < t - tolerance_s:
+                i += 1
+            if i < len(expected) and expected[i] <= t + tolerance_s:
+                matched += 1
+                i += 1
+        hits += matched
+        misses += len(expected) - matched
+        false_alarms += len(times) - matched
+    expected = hits + misses
+    recall = hits / float(expected) if expected else 0.0
+    return Point(threshold, sum(len(t) for t in detections), hits, misses,
+                 false_alarms, recall, 1.0 - recall if expected else 0.0,
+                 false_alarms / hours if hours > 0 else 0.0)
+
+
+def recommend(points, max_false_alarms_per_hour=1.0):
+    """Return the recommended point of a keyword's curve: the best recall
+    with at most max_false_alarms_per_hour false alarms, preferring fewer
+    false alarms and then larger thresholds for the same recall.  If no
+    threshold has that few false alarms the one with the fewest is returned.
+    """
+    allowed = [p for p in points if p.false_alarms_per_hour <= max_false_alarms_per_hour]
+    if allowed:
+        return max(allowed, key=lambda p: (p.recall, -p.false_alarms, float(p.threshold)))
+    return min(points, key=lambda p: (p.false_alarms, -p.recall, -float(p.threshold)))
+
+
+def write_curves(path, curves):
+    """Write a CSV file of every keyword's curve points."""
+    with open(path, 'w', newline='') as outfile:
+        writer = csv.writer(outfile)
+        writer.writerow(('keyword',) + Point._fields)
+        for keyword, points in sorted(curves.items()):
+            for p in points:
+                writer.writerow((keyword,) + tuple(p))
+
+
+def plot_curves(path, curves, recommended):
+    """Plot the DET curve (miss rate against false alarms per hour) of every
+    keyword with its recommended threshold marked.  Needs matplotlib,
+    returns False if it isn't installed.
+    """
+    try:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+    except ImportError:
+        return False
+    figure, axes = plt.subplots(figsize=(8, 6))
+    for keyword, points in sorted(curves.items()):
+        line, = axes.plot([p.false_alarms_per_hour for p in points],
+                          [p.miss_rate for p in points], marker='.', label=keyword)
+        best = recommended[keyword]
+        axes.plot([best.false_alarms_per_hour], [best.miss_rate], marker='o',
+                  markersize=10, fillstyle='none', color=line.get_color())
+    axes.set_xscale('symlog', linthresh=1.0)
+    axes.set_xlabel('False alarms per hour')
+    axes.set_ylabel('Miss rate')
+    axes.set_title('Keyword DET curves (circles are recommended thresholds)')
+    axes.legend()
+    figure.savefig(path)
+    plt.close(figure)
+    return True
+
+
+# Speech recognizer of each pool worker process.
+_recognizer = None
+
+def _init_worker():
+    global _recognizer
+    import speech
+    import vad
+    _recognizer = speech.SpeechRecognizer(None, vad=vad.from_config(config.SAMPLE_RATE_HZ))
+
+
+def _detect(job):
+    # Find the times of the detections of one keyword at one threshold in
+    # every recording, the seconds of audio heard when each was detected.
+    import audio
+    keyword, threshold, recordings = job
+    _recognizer.set_keywords({keyword: threshold})
+    rate = float(config.SAMPLE_RATE_HZ)
+    detections = []
+    for recording in recordings:
+        source = audio.FileSource(recording, config.SAMPLE_RATE_HZ,
+                                  config.MIC_PERIOD_SIZE, realtime=False)
+        start = _recognizer.keyword_samples
+        detections.append([(_recognizer.keyword_samples - start) / rate
+                           for _ in _recognizer.spot_keywords(audio.periods(source))])
+    return keyword, threshold, detections
+
+
+def sweep(recordings, keywords, thresholds=THRESHOLDS, processes=None):
+    """Return a dict of keyword to a dict of threshold to the list of
+    detection times in each recording (a list of seconds from its start),
+    running every keyword and threshold in a pool of processes (one per core
+    by default).
+    """
+    jobs = [(k, t, list(recordings)) for k in keywords for t in thresholds]
+    results = collections.defaultdict(dict)
+    with multiprocessing.Pool(processes, initializer=_init_worker) as pool:
+        for i, (keyword, threshold, detections) in enumerate(
+                pool.imap_unordered(_detect, jobs)):
+            results[keyword][threshold] = detections
+            logger.info('{0}/{1}: {2} at {3}: {4} detections'.format(
+                i + 1, len(jobs), keyword, threshold, sum(len(t) for t in detections)))
+    return results
+
+
+def _duration_hours(recordings):
+    total = 0.0
+    for recording in recordings:
+        with wave.open(recording) as infile:
+            total += infile.getnframes() / float(infile.getframerate())
+    return total / 3600.0
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Tune keyword thresholds on labeled recordings.')
+    parser.add_argument('recordings', nargs='+', help='WAV recordings (labels in .txt files)')
+    parser.add_argument('--keywords', nargs='+',
+                        help='keywords to tune (default all in config.py)')
+    parser.add_argument('--thresholds', nargs='+', default=THRESHOLDS,
+                        help='thresholds to sweep (default 1e-01 to 1e-50)')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE_S,
+                        help='seconds a detection can be from its label (default 1.0)')
+    parser.add_argument('--max-false-alarms', type=float, default=1.0,
+                        help='false alarms per hour allowed for recommended thresholds')
+    parser.add_argument('--processes', type=int, help='worker processes (default one per core)')
+    parser.add_argument('--output', default=config.KEYWORD_THRESHOLDS_FILE,
+                        help='recommended thresholds file')
+    parser.add_argument('--curves', default='keyword_curves.csv', help='CSV of the curves')
+    parser.add_argument('--plot', default='keyword_curves.png', help='DET curve plot')
+    args = parser.parse_args(args)
+    logging.basicConfig(level=logging.INFO)
+    keywords = args.keywords or sorted(list(config.WAKE_WORDS) + list(config.HAPPY_WORDS) +
+                                       list(config.SAD_WORDS))
+    labels = [load_labels(r) or [] for r in args.recordings]
+    hours = _duration_hours(args.recordings)
+    results = sweep(args.recordings, keywords, args.thresholds, args.processes)
+    curves = {}
+    recommended = {}
+    for keyword in keywords:
+        curves[keyword] = sorted((point(t, detections, labels, keyword, hours, args.tolerance)
+                                  for t, detections in results[keyword].items()),
+                                 key=lambda p: float(p.threshold), reverse=True)
+        recommended[keyword] = recommend(curves[keyword], args.max_false_alarms)
+        best = recommended[keyword]
+        print('{0}: {1} recall {2:.1%}, {3:.2f} false alarms/hour'.format(
+            keyword, best.threshold, best.recall, best.false_alarms_per_hour))
+    write_curves(args.curves, curves)
+    if not plot_curves(args.plot, curves, recommended):
+        print('Install matplotlib to plot the curves.')
+    save_thresholds(args.output, {k: p.threshold for k, p in recommended.items()})
+    print('Recommended thresholds saved to {0}'.format(args.output))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+# Jackson: Voice-controlled Jacket
+# Voice activity gate for keyword spotting.  Continuous keyword spotting is
+# the biggest constant CPU load, so periods of audio that are clearly silence
+# (low energy compared to the background noise) are skipped instead of being
+# decoded.  A short pre-roll of the audio before speech starts is kept so the
+# start of a wake word isn't clipped, and decoding continues for a while after
+# speech stops so the end isn't either.
+# Author: Tony DiCola
+# License: MIT https://opensource.org/licenses/MIT
+import collections
+
+import numpy as np
+
+import config
+
+
+def energy_db(samples):
+    """Return the RMS energy in decibels (of full scale 16-bit samples) of an
+    array of samples.
+    """
+    if len(samples) == 0:
+        return -120.0
+    x = samples.astype(np.float32)
+    rms = np.sqrt(np.dot(x, x) / len(x))
+    return 20.0*np.log10(max(rms, 1e-3) / 32768.0)
+
+
+def zero_crossing_rate(samples):
+    """Return the fraction of samples (0 to 1.0) where the signal changes
+    sign.
+    """
+    if len(samples) < 2:
+        return 0.0
+    signs = np.signbit(samples)
+    return np.count_nonzero(signs[1:] != signs[:-1]) / float(len(samples) - 1)
+
+
+class VoiceActivityGate:
+
+    def __init__(self, sample_rate, margin_db=10.0, preroll_s=0.3,
+                 hangover_s=0.5, zcr_min=0.25, noise_rise_db_s=1.0,
+                 initial_noise_db=-60.0):
+        """Create a gate for audio of the specified sample rate.  Audio is
+        speech if its energy is margin_db above the background noise level,
+        or half that and has a zero crossing rate over zcr_min (quiet
+        unvoiced sounds like 's' and 'f').  preroll_s seconds of audio before
+        speech and hangover_s seconds after are passed too.  The noise level
+        follows quieter audio down immediately and rises by noise_rise_db_s
+        decibels per second while audio is louder, so sustained noise stops
+        counting as speech.
+        """
+        self.sample_rate = sample_rate
+        self.margin_db = margin_db
+        self.zcr_min = zcr_min
+        self.noise_db = initial_noise_db
+        self._noise_rise_db_s = noise_rise_db_s
+        self._preroll_samples = int(preroll_s*sample_rate)
+        self._hangover_samples = int(hangover_s*sample_rate)
+        self._preroll = collections.deque()
+        self._preroll_length = 0
+        self._hangover = 0
+        self.active = False
+        # Counts of samples heard and passed on.
+        self.samples = 0
+        self.passed = 0
+
+    def is_speech(self, samples):
+        """Classify an array of samples as speech or not, and update the
+        background noise level.
+        """
+        energy = energy_db(samples)
+        above = energy - self.noise_db
+        speech = above >= self.margin_db or \
+            (above >= self.margin_db/2.0 and zero_crossing_rate(samples) >= self.zcr_min)
+        # Rise slowly even during speech so continuous loud noise (like a
+        # crowd) eventually becomes the background level.
+        if energy < self.noise_db:
+            self.noise_db = energy
+        else:
+            self.noise_db = min(energy, self.noise_db +
+                self._noise_rise_db_s*len(samples)/float(self.sample_rate))
+        return speech
+
+    def process(self, buf):
+        """Process a period of signed 16-bit samples (a bytes-like object or
+        array) and return a list of the periods to decode: nothing during
+        silence, the pre-roll and this period when speech starts, and this
+        period while speech continues.
+        """
+        samples = np.frombuffer(buf, dtype=np.int16)
+        self.samples += len(samples)
+        if self.is_speech(samples):
+            self._hangover = self._hangover_samples
+        elif self._hangover > 0:
+            self._hangover -= len(samples)
+        else:
+            self.active = False
+            # Keep a copy for the pre-roll, the caller's buffer may be reused.
+            self._preroll.append(bytes(buf))
+            self._preroll_length += len(samples)
+            while self._preroll and \
+                  self._preroll_length - len(self._preroll[0])//2 >= self._preroll_samples:
+                self._preroll_length -= len(self._preroll.popleft())//2
+            return []
+        periods = []
+        if not self.active:
+            self.active = True
+            periods.extend(self._preroll)
+            self.passed += self._preroll_length
+            self._preroll.clear()
+            self._preroll_length = 0
+        periods.append(buf)
+        self.passed += len(samples)
+        return periods
+
+    @property
+    def passed_fraction(self):
+        """Fraction of the samples heard that were passed on for decoding."""
+        return self.passed / float(self.samples) if self.samples else 0.0
+
+
+def from_config(sample_rate):
+    """Create a VoiceActivityGate configured from config.py, or return
+    None/null if the gate is disabled.
+    """
+    if not config.VAD_ENABLED:
+        return None
+    return VoiceActivityGate(sample_rate, margin_db=config.VAD_MARGIN_DB,
+                             preroll_s=config.VAD_PREROLL_S,
+                             hangover_s=config.VAD_HANGOVER_S)